@@ -0,0 +1,134 @@
+<?php
+/**
+ * Calls/sec of the keyword argument helpers of libpy2php:
+ *
+ *   php benchmarks/kwargs_calls.php [--save FILE] [calls]
+ *
+ * "before" runs copies of the helpers as they were before the signature
+ * cache, which reflect on the callee on every call; "after" runs the
+ * helpers of libpy2php.php.  A direct positional call is timed as well,
+ * which is what the translator emits for the callees it can resolve.
+ * --save writes the results to FILE as JSON, along with the php version,
+ * e.g. to benchmarks/kwargs_calls.json next to baseline.json.
+ */
+require_once( dirname(__DIR__) . DIRECTORY_SEPARATOR . 'libpy2php' . DIRECTORY_SEPARATOR . 'libpy2php.php' );
+
+function info($text1, $text2="World", $spacing=10, $collapse=false) {
+    return $spacing;
+}
+
+class foo {
+    public $spacing;
+
+    function __construct($text1=null, $text2=null, $spacing=6, $collapse=true) {
+        $this->spacing = $spacing;
+    }
+
+    function info($text1, $text2="World", $spacing=10, $collapse=false) {
+        return $spacing;
+    }
+}
+
+function uncached_kwargs_function_call($funcname, $ordered, $named) {
+    $num_ordered = count($ordered);
+    $count = 1;
+
+    if(strstr($funcname, 'new ')) {
+        list($new, $class) = explode(' ', $funcname);
+
+        $refFunc = new ReflectionMethod( $class, '__construct');
+        foreach( $refFunc->getParameters() as $param ){
+            if( $count > $num_ordered ) {
+                $name = $param->name;
+                $default = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
+                $ordered[] = isset($named[$name]) ? $named[$name] : $default;
+            }
+            $count ++;
+        }
+        return call_user_func_array( [ new ReflectionClass($class),
+                                      'newInstance' ], $ordered);
+    }
+
+    $refFunc = new ReflectionFunction($funcname);
+    foreach( $refFunc->getParameters() as $param ){
+        if( $param->isVariadic() ) {
+            $ordered[$count-1] = $named;
+            break;
+        }
+        if( $count > $num_ordered ) {
+            $name = $param->name;
+            $default = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
+            $ordered[] = isset($named[$name]) ? $named[$name] : $default;
+        }
+        $count ++;
+    }
+    return call_user_func_array($funcname, $ordered);
+}
+
+function uncached_kwargs_method_call( $obj, $parent, $method, $ordered, $named ) {
+    $num_ordered = count($ordered);
+    $count = 1;
+
+    $cls = $parent ? get_parent_class($obj) : $obj;
+    $refFunc = new ReflectionMethod( $cls, $method);
+    foreach( $refFunc->getParameters() as $param ){
+        if( $count > $num_ordered ) {
+            $name = $param->name;
+            $default = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
+            $ordered[] = isset($named[$name]) ? $named[$name] : $default;
+        }
+        $count ++;
+    }
+    $callable = $parent ? [$obj, 'parent::' . $method] : [$obj, $method];
+    return call_user_func_array($callable, $ordered);
+}
+
+function calls_per_sec($calls, $call) {
+    $start = microtime(true);
+    for( $i = 0; $i < $calls; $i++ ) {
+        $call();
+    }
+    return $calls / (microtime(true) - $start);
+}
+
+$args = array_slice($argv, 1);
+$save = null;
+if( count($args) >= 2 && $args[0] == '--save' ) {
+    $save = $args[1];
+    $args = array_slice($args, 2);
+}
+$calls = isset($args[0]) ? (int)$args[0] : 200000;
+$f = new foo();
+
+$cases = [
+    'function' => [
+        function() { uncached_kwargs_function_call('info', ['hey'], ["spacing" => 15]); },
+        function() { py2php_kwargs_function_call('info', ['hey'], ["spacing" => 15]); },
+        function() { info('hey', 'World', 15); },
+    ],
+    'constructor' => [
+        function() { uncached_kwargs_function_call('new foo', [], ["text1" => 'hey', "collapse" => false]); },
+        function() { py2php_kwargs_function_call('new foo', [], ["text1" => 'hey', "collapse" => false]); },
+        function() { new foo('hey', null, 6, false); },
+    ],
+    'method' => [
+        function() use ($f) { uncached_kwargs_method_call($f, null, 'info', ['hey'], ["spacing" => 15]); },
+        function() use ($f) { py2php_kwargs_method_call($f, null, 'info', ['hey'], ["spacing" => 15]); },
+        function() use ($f) { $f->info('hey', 'World', 15); },
+    ],
+];
+
+$results = ['php_version' => PHP_VERSION, 'calls' => $calls, 'cases' => []];
+printf("%-12s %14s %14s %8s %14s\n", "call", "before/sec", "after/sec", "speedup", "direct/sec");
+foreach( $cases as $name => $case ) {
+    list($before, $after, $direct) = $case;
+    $before = calls_per_sec($calls, $before);
+    $after = calls_per_sec($calls, $after);
+    $direct = calls_per_sec($calls, $direct);
+    printf("%-12s %14d %14d %7.2fx %14d\n", $name, $before, $after, $after / $before, $direct);
+    $results['cases'][$name] = ['before_per_sec' => $before, 'after_per_sec' => $after,
+                                'speedup' => $after / $before, 'direct_per_sec' => $direct];
+}
+if( $save !== null ) {
+    file_put_contents($save, json_encode($results, JSON_PRETTY_PRINT) . "\n");
+}
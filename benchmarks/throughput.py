@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Throughput and scaling benchmark of the whole translation pipeline.
+
+The workloads are the scripts in tests/ and generated inputs: a large
+module, deeply nested blocks, long elif chains, long string concatenation
+chains and chained slices.  Every generated workload is translated at
+three sizes, each in a fresh process so that its peak RSS can be measured.
+The input grows linearly with the size, so the exponent fitted to the
+times is about 1 as long as the translator scales linearly; 2 means
+quadratic.
+
+The results are compared against a baseline JSON (benchmarks/baseline.json
+by default).  A workload fails when its lines/sec dropped, its peak RSS
+grew by more than the tolerance, or its scaling exponent grew by more than
+--exponent-slack.  Machines differ, so record a baseline on the machine
+the comparison runs on with --save-baseline.
+
+Usage: python3 benchmarks/throughput.py [--scale S] [--baseline FILE] [--save-baseline FILE]
+"""
+
+import os
+import sys
+import glob
+import json
+import math
+import time
+import resource
+import argparse
+import subprocess
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def load_py2php():
+    spec = importlib.util.spec_from_file_location("py2php", os.path.join(ROOT, "py2php.py"))
+    py2php = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(py2php)
+    return py2php
+
+
+class NullStream:
+    def write(self, text):
+        pass
+
+
+def gen_module(lines):
+    """A module of classes and functions with a bit of everything, about lines long."""
+    out = ["# generated module", "import math", ""]
+    i = 0
+    while len(out) < lines:
+        out += [
+            "class Shape%d(object):" % i,
+            "    \"\"\"shape number %d\"\"\"" % i,
+            "    sides = %d" % (i % 7),
+            "    def __init__(self, name, size=1.5):",
+            "        self.name = name",
+            "        self.size = size * %d" % i,
+            "    def area(self, scale=2):",
+            "        # the area grows with the square of the size",
+            "        return math.sqrt(self.size ** 2) * scale",
+            "",
+            "def work%d(items, limit=10, *args, **kw):" % i,
+            "    total = 0",
+            "    names = [str(x).upper() for x in items if x > limit]",
+            "    for n, item in enumerate(items):",
+            "        if item % 2 == 0 and n < limit:",
+            "            total += item",
+            "        elif item in kw:",
+            "            total -= kw[item]",
+            "        else:",
+            "            names.append('odd ' + str(item))",
+            "    while total > 100:",
+            "        total = total // 2",
+            "    try:",
+            "        shape = Shape%d('s%d', total)" % (i, i),
+            "    except ValueError as e:",
+            "        shape = None",
+            "    label = 'work %d: %s' % (total, ', '.join(names))",
+            "    return {'total': total, 'label': label, 'first': items[1:3]}",
+            "",
+        ]
+        i += 1
+    return "\n".join(out) + "\n"
+
+
+def gen_nesting(depth, functions=40):
+    """functions functions, each with blocks nested depth levels deep."""
+    out = []
+    for f in range(functions):
+        out.append("def nested%d(a, b):" % f)
+        for level in range(depth):
+            ind = "    " * (level + 1)
+            out.append(ind + "x%d = a + %d" % (level, level))
+            out.append(ind + ["if x%d > b:", "for i%d in range(b):", "while x%d < b:"][level % 3] % level)
+        out.append("    " * (depth + 1) + "return a")
+    return "\n".join(out) + "\n"
+
+
+def gen_elif(branches, functions=10):
+    """functions functions made of an if statement with branches elif branches."""
+    out = []
+    for f in range(functions):
+        out += ["def dispatch%d(x):" % f, "    if x == 0:", "        y = 'zero'"]
+        for i in range(1, branches):
+            out += ["    elif x == %d:" % i, "        y = 'n%d'" % i]
+        out += ["    else:", "        y = None", "    return y"]
+    return "\n".join(out) + "\n"
+
+
+def gen_concat(terms, statements=100):
+    """statements assignments of a string concatenation chain of terms terms."""
+    out = []
+    for s in range(statements):
+        chain = " + ".join(["'s%d'" % s] + ["v%d" % t for t in range(terms - 1)])
+        out.append("text%d = %s" % (s, chain))
+    return "\n".join(out) + "\n"
+
+
+def gen_slices(depth, statements=200):
+    """statements assignments of depth chained slices, with slices nested in the bounds."""
+    out = []
+    for s in range(statements):
+        expr = "seq"
+        for d in range(depth):
+            expr = "%s[%d:len(seq[%d:])]" % (expr, d, d)
+        out.append("part%d = %s" % (s, expr))
+    return "\n".join(out) + "\n"
+
+
+# workload -> (generator, sizes at scale 1)
+GENERATED = {
+    "module": (gen_module, [25000, 50000, 100000]),
+    "nesting": (gen_nesting, [20, 40, 80]),
+    "elif": (gen_elif, [250, 500, 1000]),
+    "concat": (gen_concat, [40, 80, 160]),
+    "slices": (gen_slices, [8, 16, 32]),
+}
+
+# sizes that can't be exceeded: python's parser refuses deeper indentation
+# and the translator recurses once per nested expression.
+MAX_SIZE = {"nesting": 95, "elif": 2500, "concat": 250, "slices": 120}
+
+
+def workload_sizes(name, scale):
+    sizes = []
+    for size in GENERATED[name][1]:
+        size = max(2, int(round(size * scale)))
+        size = min(size, MAX_SIZE.get(name, size))
+        if size not in sizes:
+            sizes.append(size)
+    return sizes
+
+
+def workload_sources(name, size):
+    """Return the list of (file_name, source) of a workload."""
+    if name == "tests":
+        sources = []
+        for file_name in sorted(glob.glob(os.path.join(ROOT, "tests", "*.py"))):
+            with open(file_name, "rb") as f:
+                sources.append((file_name, f.read()))
+        return sources
+    return [("%s-%d.py" % (name, size), GENERATED[name][0](size))]
+
+
+def run_workload(name, size, repeat):
+    """
+    Translate a workload in this process; returns the best time of repeat
+    runs, the number of files and lines, and the peak RSS.  The test
+    scripts the translator rejects are left out.
+    """
+    py2php = load_py2php()
+    sources = []
+    for file_name, source in workload_sources(name, size):
+        if name == "tests":
+            try:
+                py2php.translate_source(source, None, NullStream())
+            except Exception:
+                continue
+        sources.append(source)
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for source in sources:
+            py2php.translate_source(source, None, NullStream())
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    lines = sum(len(source.splitlines()) for source in sources)
+    # ru_maxrss is in kilobytes on linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {"seconds": best, "files": len(sources), "lines": lines, "peak_rss": rss}
+
+
+def measure(name, size, repeat):
+    """Run a workload in a fresh process, so that the peak RSS is its own."""
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--run", name,
+                                      str(size), "--repeat", str(repeat)])
+    return json.loads(output)
+
+
+def scaling_exponent(points):
+    """Least squares slope of log(seconds) over log(size)."""
+    xs = [math.log(size) for size, seconds in points]
+    ys = [math.log(max(seconds, 1e-9)) for size, seconds in points]
+    mx = sum(xs) / len(xs)
+    my = sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def run_suite(scale, repeat, out=sys.stdout):
+    results = {"scale": scale, "workloads": {}}
+    print("%-8s %7s %5s %8s %9s %10s %10s %8s" % ("workload", "size", "files", "lines", "seconds",
+                                                   "files/sec", "lines/sec", "RSS MB"), file=out)
+    for name in ["tests"] + sorted(GENERATED):
+        sizes = [0] if name == "tests" else workload_sizes(name, scale)
+        runs = []
+        for size in sizes:
+            run = measure(name, size, repeat if name == "tests" or size == sizes[0] else 1)
+            run["size"] = size
+            runs.append(run)
+            print("%-8s %7s %5d %8d %9.3f %10.1f %10.0f %8.1f" % (
+                name, size or "-", run["files"], run["lines"], run["seconds"],
+                run["files"] / run["seconds"], run["lines"] / run["seconds"], run["peak_rss"] / 1048576.0),
+                file=out)
+            out.flush()
+        largest = runs[-1]
+        entry = {"runs": runs,
+                 "files_per_sec": largest["files"] / largest["seconds"],
+                 "lines_per_sec": largest["lines"] / largest["seconds"],
+                 "peak_rss": largest["peak_rss"]}
+        if len(runs) > 1:
+            entry["exponent"] = scaling_exponent([(r["size"], r["seconds"]) for r in runs])
+        results["workloads"][name] = entry
+    print(file=out)
+    for name, entry in sorted(results["workloads"].items()):
+        if "exponent" in entry:
+            print("%-8s time grows with size^%.2f" % (name, entry["exponent"]), file=out)
+    return results
+
+
+def compare(results, baseline, tolerance, exponent_slack, out=sys.stdout):
+    """
+    Print the regressions of results against baseline.  Returns their
+    number.
+    """
+    regressions = 0
+    for name, entry in sorted(results["workloads"].items()):
+        base = baseline["workloads"].get(name)
+        if not base:
+            continue
+        problems = []
+        if entry["lines_per_sec"] < base["lines_per_sec"] * (1 - tolerance):
+            problems.append("lines/sec %.0f, baseline %.0f" % (entry["lines_per_sec"], base["lines_per_sec"]))
+        if entry["peak_rss"] > base["peak_rss"] * (1 + tolerance):
+            problems.append("peak RSS %.1f MB, baseline %.1f MB" % (entry["peak_rss"] / 1048576.0,
+                                                                    base["peak_rss"] / 1048576.0))
+        if "exponent" in entry and "exponent" in base \
+                and entry["exponent"] > max(base["exponent"], 1.0) + exponent_slack:
+            problems.append("SUPERLINEAR: time grows with size^%.2f, baseline size^%.2f" % (
+                entry["exponent"], base["exponent"]))
+        for problem in problems:
+            print("REGRESSION %s: %s" % (name, problem), file=out)
+        regressions += len(problems)
+    return regressions
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="translator throughput and scaling benchmarks")
+    arg_parser.add_argument("--scale", type=float, default=1.0,
+                            help="multiply the sizes of the generated inputs (default: 1)")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=3,
+                            help="runs of the small workloads, the best is reported (default: 3)")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                            help="baseline JSON to compare against (default: benchmarks/baseline.json)")
+    arg_parser.add_argument("--save-baseline", metavar="FILE", default=None,
+                            help="write the results to FILE as the new baseline instead of comparing")
+    arg_parser.add_argument("--json", metavar="FILE", default=None,
+                            help="also write the results to FILE")
+    arg_parser.add_argument("--tolerance", type=float, default=0.3,
+                            help="allowed relative drop of lines/sec and growth of peak RSS (default: 0.3)")
+    arg_parser.add_argument("--exponent-slack", type=float, default=0.25,
+                            help="allowed growth of a scaling exponent (default: 0.25)")
+    arg_parser.add_argument("--run", nargs=2, metavar=("WORKLOAD", "SIZE"), help=argparse.SUPPRESS)
+    options = arg_parser.parse_args(argv[1:])
+
+    if options.run:
+        print(json.dumps(run_workload(options.run[0], int(options.run[1]), options.repeat)))
+        return 0
+
+    results = run_suite(options.scale, options.repeat)
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if options.save_baseline:
+        with open(options.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("Baseline written to:", options.save_baseline)
+        return 0
+    if not os.path.isfile(options.baseline):
+        print("No baseline to compare against, record one with --save-baseline.")
+        return 0
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != results["scale"]:
+        print("The baseline was recorded at scale %s, this run used %s: not compared." % (
+            baseline.get("scale"), results["scale"]))
+        return 2
+    regressions = compare(results, baseline, options.tolerance, options.exponent_slack)
+    if regressions:
+        print("%d regressions against %s" % (regressions, options.baseline))
+        return 1
+    print("No regressions against %s" % options.baseline)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the Translator tree walk over the tests/ corpus.
+
+Every test script is parsed up front, then only the walk and the
+emitting of the php code is timed.  The result is reported in AST nodes
+per second, the best of all rounds.
+
+Usage: python benchmarks/translate_nodes.py [-r ROUNDS] [-n REPEAT]
+"""
+
+import os
+import sys
+import glob
+import ast
+import time
+import argparse
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location("py2php", os.path.join(ROOT, "py2php.py"))
+py2php = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(py2php)
+
+
+class NullStream:
+    def write(self, text):
+        pass
+
+
+def count_nodes(node):
+    return sum(1 for child in ast.walk(node))
+
+
+def load_corpus():
+    """Return [(file_name, comments, tree, nodes)] of the scripts that parse."""
+    corpus = []
+    for file_name in sorted(glob.glob(os.path.join(ROOT, "tests", "*.py"))):
+        with open(file_name, encoding="utf-8") as f:
+            source = f.read()
+        for k, rep in enumerate(py2php.KEEP_STRS):
+            source = source.replace(rep, py2php.KEEP_STRS_REP[k])
+        try:
+            tree = py2php.parse(source)
+            comments = py2php.collect_comments(source)
+            # skip the scripts the translator rejects
+            py2php.Translator(None, tree, NullStream(), comments)
+        except Exception:
+            continue
+        corpus.append((file_name, comments, tree, count_nodes(tree)))
+    return corpus
+
+
+def run_round(corpus, repeat):
+    elapsed = 0.0
+    for file_name, comments, tree, nodes in corpus:
+        for i in range(repeat):
+            start = time.time()
+            py2php.Translator(None, tree, NullStream(), comments)
+            elapsed += time.time() - start
+    return elapsed
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="Translator nodes/sec over tests/")
+    arg_parser.add_argument("-r", "--rounds", type=int, default=5,
+                            help="number of timed rounds, the best is reported (default: 5)")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=20,
+                            help="translations of every script per round (default: 20)")
+    options = arg_parser.parse_args(argv[1:])
+
+    best = None
+    corpus = load_corpus()
+    for i in range(options.rounds):
+        elapsed = run_round(corpus, options.repeat)
+        if best is None or elapsed < best:
+            best = elapsed
+    nodes = sum(entry[3] for entry in corpus) * options.repeat
+    print("%d scripts, %d nodes translated per round" % (len(corpus), nodes))
+    print("best of %d rounds: %.3f s, %.0f nodes/sec" % (options.rounds, best, nodes / best))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
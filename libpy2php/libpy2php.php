@@ -170,6 +170,99 @@ function pyjslib_list($item = null) {
     throw new \Exception("Invalid arg passed to pyjslib_list()");
 }
 
+function pyjslib_iter($item = null) {
+    // what a foreach iterates for python's for loops: unlike pyjslib_list(),
+    // arrays and Traversables (generators, files) are not copied, and the
+    // chars of a string are generated one at a time.
+    if( $item === null ) {
+        return [];
+    }
+    if(is_array($item) || $item instanceof \Traversable) {
+        return $item;
+    }
+    if(is_string($item)) {
+        return pyjslib_iter_str($item);
+    }
+
+    throw new \Exception("Invalid arg passed to pyjslib_iter()");
+}
+
+function pyjslib_in($item, $container) {
+    // python's "in" for a container the translator knows nothing about:
+    // a substring search in strings and a search through the values of
+    // arrays and iterables.  A php array doesn't tell a dict from a list,
+    // so a dict is searched by value too; the translator emits a key
+    // lookup itself for the dicts it knows of.
+    if(is_string($container)) {
+        return strpos($container, $item) !== false;
+    }
+    if(is_array($container)) {
+        return in_array($item, $container);
+    }
+    if(is_object($container) && method_exists($container, '__contains__')) {
+        return (bool)$container->__contains__($item);
+    }
+    if($container instanceof \Traversable) {
+        foreach($container as $val) {
+            if($val == $item) {
+                return true;
+            }
+        }
+        return false;
+    }
+
+    throw new \Exception("Invalid arg passed to pyjslib_in()");
+}
+
+function pyjslib_in_range($item, $start, $stop, $step = 1) {
+    // python's "in" of a range() for an item of unknown type: ints, bools
+    // and floats with an int value are tested, anything else isn't in it.
+    if(is_bool($item) || (is_float($item) && is_finite($item) && floor($item) == $item)) {
+        $item = (int)$item;
+    }
+    if(!is_int($item)) {
+        return false;
+    }
+    if($step > 0 ? ($item < $start || $item >= $stop) : ($item > $start || $item <= $stop)) {
+        return false;
+    }
+    return ($item - $start) % $step == 0;
+}
+
+function pyjslib_len($obj) {
+    // python's len() of a value the translator knows nothing about.
+    if(is_string($obj)) {
+        return strlen($obj);
+    }
+    if(is_array($obj) || $obj instanceof \Countable) {
+        return count($obj);
+    }
+    if(is_object($obj) && method_exists($obj, '__len__')) {
+        return $obj->__len__();
+    }
+
+    throw new \Exception("Invalid arg passed to pyjslib_len()");
+}
+
+function pyjslib_add($a, $b) {
+    // python's + on values the translator knows nothing about: strings
+    // and lists are joined, anything else is added.
+    if(is_string($a)) {
+        return $a . $b;
+    }
+    if(is_array($a)) {
+        return array_merge($a, $b);
+    }
+    return $a + $b;
+}
+
+function pyjslib_iter_str($str) {
+    $len = strlen($str);
+    for( $i = 0; $i < $len; $i++ ) {
+        yield $str[$i];
+    }
+}
+
 function pyjslib_sum(Iterator $list) {
     if(is_array($list)) {
         return array_sum($list);
@@ -356,68 +449,72 @@ function pyjslib_printnl($objs, $multi_arg=false) {
     echo pyjslib_printWorker($objs, true, $multi_arg);
 }
 
+/**
+ * Return the parameter names, their default values (null for parameters
+ * without one) and the position of the variadic parameter, or null, of the
+ * function $method, or of the method $method of $class.  Reflection runs
+ * once per function or method and request, later calls get the cached
+ * signature.
+ */
+function py2php_kwargs_signature($class, $method) {
+    static $signatures = [];
+    $key = $class === null ? $method : $class . '::' . $method;
+    if( isset($signatures[$key]) ) {
+        return $signatures[$key];
+    }
+
+    $refFunc = $class === null ? new ReflectionFunction($method) : new ReflectionMethod($class, $method);
+    $names = [];
+    $defaults = [];
+    $variadic = null;
+    foreach( $refFunc->getParameters() as $param ){
+        if( $param->isVariadic() ) {
+            $variadic = $param->getPosition();
+            break;
+        }
+        $names[] = $param->name;
+        $defaults[] = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
+    }
+    return $signatures[$key] = [$names, $defaults, $variadic];
+}
+
+/**
+ * Append the named arguments, or the defaults, of the parameters after the
+ * ordered ones.
+ */
+function py2php_kwargs_bind($signature, $ordered, $named) {
+    list($names, $defaults) = $signature;
+    for( $i = count($ordered), $n = count($names); $i < $n; $i++ ) {
+        $ordered[] = array_key_exists($names[$i], $named) ? $named[$names[$i]] : $defaults[$i];
+    }
+    return $ordered;
+}
+
 function py2php_kwargs_function_call($funcname, $ordered, $named) {
     
     if( $funcname == 'array' || $funcname == 'pyjslib_dict' ) {
         return $named;
     }
     
-    $num_ordered = count($ordered);
-    $count = 1;
-    
     if(strstr($funcname, 'new ')) {
         list($new, $class) = explode(' ', $funcname);
         
-        $refFunc = new ReflectionMethod( $class, '__construct');
-        foreach( $refFunc->getParameters() as $param ){
-            //invokes ReflectionParameter::__toString
-            if( $count > $num_ordered ) {
-                $name = $param->name;
-                $default = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
-                $ordered[] = isset($named[$name]) ? $named[$name] : $default;
-            }    
-            $count ++;
-        }
-        return call_user_func_array( [ new ReflectionClass($class),
-                                      'newInstance' ], $ordered);
+        $ordered = py2php_kwargs_bind(py2php_kwargs_signature($class, '__construct'), $ordered, $named);
+        return new $class(...$ordered);
     }
     
-    $refFunc = new ReflectionFunction($funcname);
-    foreach( $refFunc->getParameters() as $param ){
-        if( $param->isVariadic() ) {
-            $ordered[$count-1] = $named;
-            break;
-        }
-        //invokes ReflectionParameter::__toString
-        if( $count > $num_ordered ) {
-            $name = $param->name;
-            $default = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
-            $ordered[] = isset($named[$name]) ? $named[$name] : $default;
-        }
-        
-        $count ++;
+    $signature = py2php_kwargs_signature(null, $funcname);
+    $ordered = py2php_kwargs_bind($signature, $ordered, $named);
+    if( $signature[2] !== null ) {
+        $ordered[$signature[2]] = $named;
     }
-    //var_dump($ordered);
-    return call_user_func_array($funcname, $ordered);
+    return $funcname(...$ordered);
 }
 
 function py2php_kwargs_method_call( $obj, $parent, $method, $ordered, $named ) {
     
-    $num_ordered = count($ordered);
-    $count = 1;
-
-    $cls = $parent ? get_parent_class($obj) : $obj;
-    $refFunc = new ReflectionMethod( $cls, $method);
-    foreach( $refFunc->getParameters() as $param ){
-        //invokes ReflectionParameter::__toString
-        if( $count > $num_ordered ) {
-            $name = $param->name;
-            $default = $param->isDefaultValueAvailable() ? $param->getDefaultValue() : null;
-            $ordered[] = isset($named[$name]) ? $named[$name] : $default;
-        }
-        
-        $count ++;
-    }
+    $cls = $parent ? get_parent_class($obj) : (is_object($obj) ? get_class($obj) : $obj);
+    $ordered = py2php_kwargs_bind(py2php_kwargs_signature($cls, $method), $ordered, $named);
    
     $callable = $parent ? [$obj, 'parent::' . $method] : [$obj, $method]; 
     return call_user_func_array($callable, $ordered);
@@ -1,5 +1,4 @@
-#!/usr/bin/env python
-from types import StringType
+#!/usr/bin/env python3
 
 # Copyright 2006 James Tauber and contributors
 #
@@ -18,47 +17,617 @@ from types import StringType
 # limitations under the License.
 
 # Note:  AST types are documented at:
-#  https://docs.python.org/2/library/compiler.html
+#  https://docs.python.org/3/library/ast.html
 
 
-import compiler
-from compiler import ast
+import ast
+import io
+import re
+import warnings
 import os
+import sys
 import copy
-import codecs
-import locale
+import glob
+import time
+import argparse
+import tempfile
+import tokenize
+import multiprocessing
+import hashlib
+import shutil
+import functools
+import contextlib
+import collections
+import json
+import socket
+import threading
+import weakref
+import socketserver
 
 # this is the python function used to wrap native javascript
 NATIVE_JS_FUNC_NAME = "PHP"
 
+# bump this whenever the generated code changes, it is part of the
+# translation cache key.
+VERSION = "1.1"
+
 from pprint import pprint
 
 def print_r(obj):
     pprint (vars(obj))
 
-class Klass:
+# the python builtins translated to a php function of another name
+PHP_BUILTINS = {
+    "callable": "is_function",
+    "dict": "pyjslib_dict",
+    "zip": "pyjslib_zip",
+    "dir": "pyjslib_dir",
+    "getattr": "pyjslib_getattr",
+    "hasattr": "method_exists",
+    "int": "pyjslib_int",
+    "str": "pyjslib_str",
+    "range": "pyjslib_range",
+    "sum": "pyjslib_sum",
+    "min": "pyjslib_min",
+    "max": "pyjslib_max",
+    "list": "pyjslib_list",
+    "hash": "pyjslib_hash",
+    "repr": "pyjslib_repr",
+    "isinstance": "isinstance",
+    "open": "pyjslib_open",
+    "globals": "pyjslib_globals",
+    "float": "floatval",
+}
+
+# builtins whose call on a generator expression or list comprehension is
+# translated to a single accumulating loop
+REDUCTIONS = frozenset(["sum", "min", "max", "any", "all"])
+
+# the types of values the translator tells apart, see Translator._type()
+NUMERIC_TYPES = frozenset(["int", "float", "bool"])
+
+# builtins and string methods by the type of what they return
+BUILTIN_TYPES = {
+    "str": ["str", "repr", "chr", "unichr", "hex", "oct", "bin", "format", "input", "raw_input"],
+    "int": ["int", "len", "ord", "hash"],
+    "float": ["float"],
+    "bool": ["bool", "isinstance", "issubclass", "callable", "hasattr"],
+    "list": ["list", "tuple", "sorted", "range", "xrange"],
+    "dict": ["dict"],
+}
+BUILTIN_TYPES = dict((name, kind) for kind, names in BUILTIN_TYPES.items() for name in names)
+STRING_METHOD_TYPES = {
+    "str": ["upper", "lower", "strip", "lstrip", "rstrip", "replace", "join", "zfill", "center",
+            "capitalize", "swapcase", "format", "ljust", "rjust", "title"],
+    "int": ["find", "rfind", "index", "rindex", "count"],
+    "bool": ["startswith", "endswith", "islower", "isupper", "isspace", "isalnum", "isalpha", "isdigit"],
+    "list": ["split", "splitlines", "rsplit"],
+}
+STRING_METHOD_TYPES = dict((name, kind) for kind, names in STRING_METHOD_TYPES.items() for name in names)
+
+PYTHON_BUILTINS = frozenset(['abs', 'divmod', 'input', 'open', 'staticmethod', 'all', 'enumerate', 'int', 'ord', 'str', 'any', 'eval', 'isinstance', 'pow', 'sum', 'basestring', 'execfile', 'issubclass', 'print', 'super', 'bin', 'file', 'iter', 'property', 'tuple', 'bool', 'filter', 'len', 'range', 'type', 'bytearray', 'float', 'list', 'raw_input', 'unichr', 'callable', 'format', 'locals', 'reduce', 'unicode', 'chr', 'frozenset', 'long', 'reload', 'vars', 'classmethod', 'getattr', 'map', 'repr', 'xrange', 'cmp', 'globals', 'max', 'reversed', 'zip', 'compile', 'hasattr', 'memoryview', 'round', '__import__', 'complex', 'hash', 'min', 'set', 'delattr', 'help', 'next', 'setattr', 'dict', 'hex', 'object', 'slice', 'dir', 'id', 'oct', 'sorted'])
+
+# python string methods and their php counterparts.  %(var)s is the string
+# the method is called on, %(args)s are the call arguments and %(var_args)s
+# is the string followed by the arguments.
+STRING_METHODS = {
+    "zfill": "str_pad(%(var_args)s, '0', STR_PAD_LEFT)",
+    "startswith": "(strpos(%(var_args)s) === 0)",
+    "endswith": "(substr(%(var)s, -strlen(%(args)s)) === %(args)s)",
+    "upper": "strtoupper(%(var)s)",
+    "lower": "strtolower(%(var)s)",
+    "count": "substr_count(%(var_args)s)",
+    "center": "str_pad(%(var_args)s, STR_PAD_BOTH)",
+    "capitalize": "ucfirst(%(var)s)",
+    "find": "strpos(%(var_args)s)",
+    "rfind": "strrpos(%(var_args)s)",
+    "index": "strpos(%(var_args)s)",
+    "rindex": "strrpos(%(var_args)s)",
+    "islower": "ctype_lower(%(var)s)",
+    "isupper": "ctype_upper(%(var)s)",
+    "isspace": "ctype_space(%(var)s)",
+    "isalnum": "ctype_alnum(%(var)s)",
+    "isalpha": "ctype_alpha(%(var)s)",
+    "isdigit": "ctype_digit(%(var)s)",
+    "join": "join(%(var_args)s)",
+    "replace": "str_replace(%(args)s, %(var)s)",
+    "split": "explode(%(args)s, %(var)s)",
+    "splitlines": "explode('!#dblsl_n#!', %(var)s)",
+    "strip": "trim(%(var_args)s)",
+    "rstrip": "rtrim(%(var_args)s)",
+    "lstrip": "ltrim(%(var_args)s)",
+    "swapcase": "strtr(%(var)s, 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz', 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')",
+}
+
+# string methods called without arguments that need another php function
+STRING_METHODS_NOARGS = {
+    "split": "preg_split('/\\s+/', trim(%(var)s), -1, PREG_SPLIT_NO_EMPTY)",
+}
 
-    klasses = {}
+class Klass:
+    __slots__ = ("name", "functions", "base")
 
     def __init__(self, name):
         self.name = name
-        self.klasses[name] = self
         self.functions = set()
+        self.base = None
         
-    def set_base(self, base_name):
-        self.base = self.klasses.get(base_name)
+    def set_base(self, base):
+        self.base = base
         
     def add_function(self, function_name):
         self.functions.add(function_name)
 
 
+class TranslationContext:
+    """
+    The symbol tables of a single translation.  Nothing is shared between
+    two translations, so any number of them can run side by side in one
+    process, and everything a translation learned is freed with its
+    Translator.
+    """
+    __slots__ = ("imported_modules", "imported_js", "top_level_functions", "top_level_classes",
+                 "top_level_vars", "imported_classes", "method_imported_globals", "method_self",
+                 "klasses", "definitions", "temps")
+
+    def __init__(self):
+        self.imported_modules = set()
+        self.imported_js = set()
+        self.top_level_functions = set()
+        self.top_level_classes = set()
+        self.top_level_vars = set()
+        self.imported_classes = {}
+        self.method_imported_globals = set()
+        self.method_self = None
+        # class name -> Klass, of the classes translated so far
+        self.klasses = {}
+        # name -> FunctionDef or ClassDef, of the top-level definitions
+        self.definitions = {}
+        # number of temporary variables made up so far, see Translator._temp()
+        self.temps = 0
+
+
+class ScopeIndex:
+    """
+    Where the names of a function (or module) are used, relative to the for
+    loops of its body, built in one pass when a loop needs it.  Nested
+    functions are indexed as part of it.
+    """
+
+    def __init__(self, scope):
+        # for loop -> the for loop whose body it is in, or None
+        self.parents = {}
+        # name -> list of (innermost for loop whose body it is in, Name
+        # node), leaving out the names bound by a comprehension around them
+        self.names = collections.defaultdict(list)
+        # names declared global or nonlocal somewhere in the scope
+        self.globals = set()
+        pending = [(scope, None, frozenset())]
+        while pending:
+            node, loop, bound = pending.pop()
+            if isinstance(node, ast.For):
+                self.parents[node] = loop
+                pending.extend([(child, node, bound) for child in node.body])
+                pending.extend([(child, loop, bound) for child in [node.target, node.iter] + node.orelse])
+                continue
+            if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+                # the first iterable is evaluated in the enclosing scope
+                first = node.generators[0].iter
+                pending.append((first, loop, bound))
+                inner = bound | comprehension_targets(node)
+                pending.extend([(child, loop, inner) for child in ast.iter_child_nodes(node)
+                                if child is not node.generators[0]])
+                pending.extend([(child, loop, inner) for child in ast.iter_child_nodes(node.generators[0])
+                                if child is not first])
+                continue
+            if isinstance(node, ast.Name):
+                if node.id not in bound:
+                    self.names[node.id].append((loop, node))
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                self.globals.update(node.names)
+            pending.extend([(child, loop, bound) for child in ast.iter_child_nodes(node)])
+
+    def loops(self, loop):
+        """
+        Return loop and the loops it is nested in, innermost first.
+        """
+        loops = []
+        while loop is not None:
+            loops.append(loop)
+            loop = self.parents.get(loop)
+        return loops
+
+    def stored_in(self, name, loop):
+        """
+        Whether name is assigned in the body of loop, or may be assigned
+        by a function through a global statement.
+        """
+        if name in self.globals:
+            return True
+        for owner, node in self.names.get(name, ()):
+            if not isinstance(node.ctx, ast.Load) and loop in self.loops(owner):
+                return True
+        return False
+
+    def counted_loop_var(self, name, loop):
+        """
+        Whether the variable of a for loop over name can be a php counter:
+        the body doesn't assign it, and it is not read where python would
+        see the last value of the loop.  Reads in the body of a later loop
+        over the same name don't count, it assigns name before them.
+        """
+        if self.stored_in(name, loop):
+            return False
+        outer = self.loops(loop)
+        for owner, node in self.names.get(name, ()):
+            if not isinstance(node.ctx, ast.Load):
+                continue
+            loops = self.loops(owner)
+            if loop in loops:
+                continue
+            binding = None
+            for other in loops:
+                if isinstance(other.target, ast.Name) and other.target.id == name:
+                    binding = other
+                    break
+            if binding is None or binding in outer:
+                return False
+        return True
+
+class TypeIndex:
+    """
+    What the names of a function (or module, or class body) are bound to,
+    wherever that is in its body: assigned expressions, for loops and
+    comprehensions whose variable they are, and the defaults of the
+    parameters.  A binding that can't be typed is None.  Nested functions
+    and classes are scopes of their own.
+    """
+
+    def __init__(self, scope):
+        # name -> list of bindings: an expression, a For or comprehension
+        # binding its variable, a function or class definition, a type or
+        # None
+        self.bindings = collections.defaultdict(list)
+        # name -> type, of the names Translator._type() resolved so far
+        self.types = {}
+        # names being resolved
+        self.pending = set()
+        # expression -> type, of the expressions typed so far
+        self.nodes = {}
+        if isinstance(scope, ast.FunctionDef):
+            args = scope.args
+            named = args.posonlyargs + args.args
+            defaults = dict(zip([arg.arg for arg in named[len(named) - len(args.defaults):]], args.defaults))
+            defaults.update(zip([arg.arg for arg in args.kwonlyargs], args.kw_defaults))
+            for arg in named + args.kwonlyargs:
+                default = defaults.get(arg.arg)
+                if isinstance(default, ast.Constant) and default.value is None:
+                    default = None
+                self.bindings[arg.arg].append(default)
+            if args.vararg:
+                self.bindings[args.vararg.arg].append("list")
+            if args.kwarg:
+                self.bindings[args.kwarg.arg].append("dict")
+        handled = set()
+        pending = list(scope.body)
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.bindings[node.name].append(node)
+                # they may assign names of this scope through global or nonlocal
+                for child in ast.walk(node):
+                    if isinstance(child, (ast.Global, ast.Nonlocal)):
+                        for name in child.names:
+                            self.bindings[name].append(None)
+                continue
+            if isinstance(node, ast.Lambda):
+                args = node.args
+                for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+                    if arg is not None:
+                        self.bindings[arg.arg].append(None)
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.bindings[target.id].append(node.value)
+                        handled.add(target)
+            elif isinstance(node, (ast.AnnAssign, ast.NamedExpr)):
+                if isinstance(node.target, ast.Name) and node.value is not None:
+                    self.bindings[node.target.id].append(node.value)
+                    handled.add(node.target)
+            elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+                self.bindings[node.target.id].append(ast.BinOp(ast.Name(node.target.id, ast.Load()),
+                                                               node.op, node.value))
+                handled.add(node.target)
+            elif isinstance(node, (ast.For, ast.comprehension)) and isinstance(node.target, ast.Name):
+                self.bindings[node.target.id].append(node)
+                handled.add(node.target)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    self.bindings[(alias.asname or alias.name).split(".")[0]].append(None)
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                self.bindings[node.name].append(None)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                for name in node.names:
+                    self.bindings[name].append(None)
+            elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load) and node not in handled:
+                self.bindings[node.id].append(None)
+            pending.extend(ast.iter_child_nodes(node))
+
 class TranslationError(Exception):
     def __init__(self, message, node):
-        self.message = "line %s:\n%s\n%s" % (node.lineno, message, node)
+        self.lineno = getattr(node, "lineno", None)
+        self.message = "line %s:\n%s\n%s" % (self.lineno, message, ast.dump(node))
 
     def __str__(self):
         return self.message
 
+class Emitter:
+    """
+    Collects the code emitted by the Translator handlers as a list of
+    chunks.  Whenever a top-level statement is finished the chunks are
+    flushed to the output stream, so memory use is bounded by the largest
+    top-level statement instead of the size of the module.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chunks = []
+        self.captured = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+    def capture(self):
+        """
+        Start collecting the emitted code separately, until release() is
+        called.
+        """
+        self.captured.append(self.chunks)
+        self.chunks = []
+
+    def release(self):
+        """
+        Stop capturing and return the code emitted since capture().
+        """
+        buf = ''.join(self.chunks)
+        self.chunks = self.captured.pop()
+        return buf
+
+    def flush(self):
+        if self.chunks:
+            self.stream.write(''.join(self.chunks))
+            self.chunks = []
+
+class FragmentCache:
+    """
+    In-memory cache of the code emitted for top-level functions and
+    classes.  A long running process (--watch, --server) re-emits a module
+    by splicing the cached code of unchanged definitions around the ones
+    that changed.  The least recently used entries are dropped once there
+    are more than max_entries.  The cache can be shared by translations
+    running in several threads.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            fragment = self.entries.pop(key, None)
+            if fragment is not None:
+                self.entries[key] = fragment
+            return fragment
+
+    def put(self, key, fragment):
+        with self.lock:
+            self.entries[key] = fragment
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class TranslationProfile:
+    """
+    Call counts and times of the Translator handlers and of the stages of
+    a translation, for --profile.  The total time of a handler counts
+    only its outermost call when it recurses; its self time leaves out
+    the handlers it called.  The time of a stage leaves out the stages
+    nested in it, e.g. the translate stage doesn't include the post-pass
+    and write stages the streamed code goes through.
+    """
+
+    # dispatchers, their time belongs to the handlers they call
+    untimed = frozenset(["_stmt", "_stmts", "_captured"])
+    pipeline = ["read", "comments", "parse", "translate", "post-pass", "write"]
+
+    def __init__(self):
+        self.handlers = {}
+        self.stages = {}
+        self.calls = []
+        self.stage_calls = []
+        self.active = collections.Counter()
+
+    def instrument(self, translator):
+        """
+        Replace the handlers of a Translator instance by timed ones.  The
+        dispatch tables get instance copies calling the timed handlers.
+        """
+        for name in dir(Translator):
+            if name.startswith("_") and not name.startswith("__") and name not in self.untimed:
+                method = getattr(translator, name)
+                if callable(method):
+                    setattr(translator, name, self.timed(name, method))
+        for table_name in ("stmt_handlers", "expr_handlers", "binop_handlers", "unaryop_handlers"):
+            table = {}
+            for node_type, handler in getattr(Translator, table_name).items():
+                if handler.__name__ in self.untimed or not handler.__name__.startswith("_"):
+                    table[node_type] = handler
+                else:
+                    table[node_type] = self.timed(handler.__name__, handler)
+            setattr(translator, table_name, table)
+
+    def timed(self, name, handler):
+        def timed_handler(*args, **kwargs):
+            self.active[name] += 1
+            frame = [0.0]
+            self.calls.append(frame)
+            start = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.calls.pop()
+                if self.calls:
+                    self.calls[-1][0] += elapsed
+                self.active[name] -= 1
+                entry = self.handlers.get(name)
+                if entry is None:
+                    entry = self.handlers[name] = [0, 0.0, 0.0]
+                entry[0] += 1
+                if not self.active[name]:
+                    entry[1] += elapsed
+                entry[2] += elapsed - frame[0]
+        return timed_handler
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        frame = [0.0]
+        self.stage_calls.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_calls.pop()
+            if self.stage_calls:
+                self.stage_calls[-1][0] += elapsed
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - frame[0]
+
+    def as_dict(self):
+        return {"stages": dict(self.stages),
+                "handlers": dict((name, {"calls": calls, "total": total, "self": own})
+                                 for name, (calls, total, own) in self.handlers.items())}
+
+    def report(self, out=None):
+        """
+        Print the stages in pipeline order and the handlers sorted by
+        their self time.
+        """
+        out = out or sys.stdout
+        print("%-24s %12s" % ("stage", "time ms"), file=out)
+        for name in sorted(self.stages, key=lambda name: (self.pipeline + [name]).index(name)):
+            print("%-24s %12.3f" % (name, self.stages[name] * 1000), file=out)
+        print("%-24s %12.3f" % ("total", sum(self.stages.values()) * 1000), file=out)
+        print("", file=out)
+        print("%-24s %8s %12s %12s" % ("handler", "calls", "total ms", "self ms"), file=out)
+        for name, (calls, total, own) in sorted(self.handlers.items(), key=lambda item: -item[1][2]):
+            print("%-24s %8d %12.3f %12.3f" % (name, calls, total * 1000, own * 1000), file=out)
+
+def profile_stage(profile, name):
+    """
+    Time a stage of the translation in profile, if there is one.
+    """
+    if profile is None:
+        return contextlib.nullcontext()
+    return profile.stage(name)
+
+# a slice with an empty step, like a[1:2:], leaves no trace in the tree
+SLICE_STEP_COLON = re.compile(r":[^\[\]:\n]*:\s*\]|:\s*:")
+
+def parse(source, file_name="<string>"):
+    """
+    Parse python source with the ast module.  Slices written with an
+    empty step, like a[1:2:], get a None constant as their step, so that
+    they can be told apart from a[1:2].
+    """
+    with warnings.catch_warnings():
+        # e.g. "is" with a literal, the translator doesn't care
+        warnings.simplefilter("ignore")
+        mod = ast.parse(source, file_name)
+    if SLICE_STEP_COLON.search(source):
+        lines = source.splitlines()
+        for node in ast.walk(mod):
+            if (isinstance(node, ast.Slice) and node.step is None
+                    and node.lineno == node.end_lineno):
+                line = lines[node.lineno - 1].encode("utf-8")
+                last = node.upper or node.lower
+                start = last.end_col_offset if last else node.col_offset
+                colons = line[start:node.end_col_offset].count(b":")
+                if colons >= (1 if node.upper else 2):
+                    node.step = ast.copy_location(ast.Constant(None), node)
+    return mod
+
+def parse_file(file_name):
+    """
+    Parse a python file, decoded as its coding declaration says.
+    """
+    with tokenize.open(file_name) as f:
+        return parse(f.read(), file_name)
+
+def split_docstring(node):
+    """
+    Return the statements of a module, class or function without its
+    docstring, and the docstring (None if there is none).
+    """
+    body = node.body
+    if (body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)):
+        return body[1:], body[0].value.value
+    return body, None
+
+def is_const(node):
+    """
+    Whether node is a literal number or string.  True, False and None are
+    constants too, but they are translated like names.
+    """
+    return (isinstance(node, ast.Constant) and node.value is not None
+            and node.value is not Ellipsis and not isinstance(node.value, bool))
+
+BINARY_OPERATORS = {
+    ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/", ast.FloorDiv: "//",
+    ast.Mod: "%", ast.Pow: "**", ast.LShift: "<<", ast.RShift: ">>",
+    ast.BitOr: "|", ast.BitXor: "^", ast.BitAnd: "&", ast.MatMult: "@",
+}
+
+COMPARE_OPERATORS = {
+    ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+    ast.Is: "is", ast.IsNot: "is not", ast.In: "in", ast.NotIn: "not in",
+}
+
+# the type of a name while its own bindings are typed
+PENDING = "pending"
+
+# the type of a value that is a string or a list in some places and
+# something else, or unknown, in others
+MIXED = "mixed"
+
+def merge_types(types):
+    """
+    Return the type of a value that may have any of the types, or None.
+    """
+    if not types:
+        return None
+    if len(types) > 1 and types & set(["str", "list", MIXED]):
+        return MIXED
+    if None in types:
+        return None
+    if len(types) == 1:
+        return next(iter(types))
+    if types <= set(["int", "bool"]):
+        return "int"
+    if types <= NUMERIC_TYPES:
+        return "float"
+    return None
+
+def comprehension_targets(node):
+    """
+    Return the names the for clauses of a comprehension assign.
+    """
+    names = set()
+    for generator in node.generators:
+        names.update(child.id for child in ast.walk(generator.target) if isinstance(child, ast.Name))
+    return names
+
 def strip_py(name):
     if name[2:10] == 'pyjamas.':
         return "__"+name[10:]
@@ -68,171 +637,330 @@ def strip_py(name):
         return name[8:]
     return name
 
+def imported_names(node):
+    """
+    Return the modules and the php files imported by an Import or From
+    statement, the way the Translator records them.
+    """
+    modules = []
+    php_files = []
+    if isinstance(node, ast.Import):
+        importName = node.names[0].name
+        if importName == '__pyjamas__': # special module to help make pyjamas modules loadable in the python interpreter
+            pass
+        elif importName.endswith('.php'):
+            php_files.append(importName)
+        else:
+            modules.append(strip_py(importName))
+    elif isinstance(node, ast.ImportFrom):
+        modname = node.module or ""
+        if modname == '__pyjamas__': # special module to help make pyjamas modules loadable in the python interpreter
+            pass
+        else:
+            modules.append(modname)
+            if modname == 'pyjamas':
+                modules.extend([name.name for name in node.names])
+    return modules, php_files
+
 class Translator:
 
-    def __init__(self, module_name, mod, output):
+    def __init__(self, module_name, mod, output, comments=None, fragment_cache=None, profile=None,
+                 source_map=False):
         if module_name:
             self.module_prefix = ""
         else:
             self.module_prefix = ""
-        self.imported_modules = set()
-        self.imported_js = set()
-        self.top_level_functions = set()
-        self.top_level_classes = set()
-        self.top_level_vars = set()
-        self.imported_classes = {}
-        self.method_imported_globals = set()
-        self.method_self = None
+        self.context = TranslationContext()
         self.depth = 0
         self.eol = "\n"
+        self.comments = sorted((comments or {}).items())
+        self.comment_pos = 0
+        self.out = Emitter(output)
+        self.fragment_cache = fragment_cache
+        self.source_map = source_map
+        self.line_base = 0
+        # the function (or module) the statements being translated are in
+        self.scope = mod
+        self.scope_indexes = {}
+        self.type_indexes = {}
+        # the ClassDef whose body is being translated
+        self.klass = None
+        self.signature_digest = None
+        if profile:
+            profile.instrument(self)
         
-        buf = u''
         if module_name != "eval":
-            buf += "set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');\n"
-            buf += "require_once('libpy2php.php');" + self.eol
-        for child in mod.node:
-            if isinstance(child, ast.Function):
-                self.top_level_functions.add(child.name)
-            elif isinstance(child, ast.Class):
-                self.top_level_classes.add(child.name)
-
-        for child in mod.node:
-            if isinstance(child, ast.Function):
-                buf += self._function(child, False)
-            elif isinstance(child, ast.Class):
-                buf += self._class(child)
+            self.emit("set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');\n")
+            self.emit("require_once('libpy2php.php');" + self.eol)
+        children = split_docstring(mod)[0]
+        for child in children:
+            if isinstance(child, ast.FunctionDef):
+                self.context.top_level_functions.add(child.name)
+                self.context.definitions[child.name] = child
+            elif isinstance(child, ast.ClassDef):
+                self.context.top_level_classes.add(child.name)
+                self.context.definitions[child.name] = child
+
+        for i, child in enumerate(children):
+            self._comments(child.lineno)
+            self.mark(child.lineno)
+            if isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                next_lineno = None
+                if i + 1 < len(children):
+                    next_lineno = children[i + 1].lineno
+                self._definition(child, next_lineno)
             elif isinstance(child, ast.Import):
-                importName = child.names[0][0]
-                if importName == '__pyjamas__': # special module to help make pyjamas modules loadable in the python interpreter
-                    pass
-                elif importName.endswith('.php'):
-                   self.imported_js.add(importName)
-                else:
-                   self.imported_modules.add(strip_py(importName))
-                buf += self._import(child)
-            elif isinstance(child, ast.From):
-                if child.modname == '__pyjamas__': # special module to help make pyjamas modules loadable in the python interpreter
-                    pass
-                else:
-                    self.imported_modules.add(child.modname)
+                modules, php_files = imported_names(child)
+                self.context.imported_modules.update(modules)
+                self.context.imported_js.update(php_files)
+                self.emit(self._import(child))
+            elif isinstance(child, ast.ImportFrom):
+                modules, php_files = imported_names(child)
+                if modules:
+                    self.context.imported_modules.update(modules)
                     self._from(child)
-            elif isinstance(child, ast.Discard):
-                buf += self._discard(child, None)
-            elif isinstance(child, ast.Assign):
-                buf += self._assign(child, None, True)
+            elif isinstance(child, ast.Expr):
+                self._discard(child, None)
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)):
+                self._assign(child, None, True)
             else:
-                buf += self._stmt(child, None)
+                self._stmt(child, None)
                 # raise TranslationError("unsupported AST type " + child.__class__.__name__, child)
-        
-        print >>output, buf
+            self.out.flush()
+        self._comments(None)
+        self.emit(self.eol)
+        self.out.flush()
         
         # Initialize all classes for this module
-        #for className in self.top_level_classes:
+        #for className in self.context.top_level_classes:
         #    print >> self.output, "__"+strip_py(self.module_prefix)+className+"_initialize();"
     
+    def _definition(self, node, next_lineno):
+        """
+        Emit a top-level function or class.  With a fragment cache, the
+        code of an identical definition translated in an identical module
+        context is reused instead of translating it again.
+        """
+        if self.source_map:
+            # the line marks in the code of the definition are relative to
+            # its first line, so the code can be reused at another place.
+            self.emit(SOURCE_MARK % ("=", node.lineno))
+            self.line_base = node.lineno
+        try:
+            self._cached_definition(node, next_lineno)
+        finally:
+            if self.source_map:
+                self.emit(SOURCE_MARK % ("=", 0))
+                self.line_base = 0
+
+    def _cached_definition(self, node, next_lineno):
+        if self.fragment_cache is None:
+            self._toplevel_definition(node)
+            return
+        key = self._fragment_key(node, next_lineno)
+        fragment = self.fragment_cache.get(key)
+        if fragment is None:
+            # imports in the body of the definition are module wide, so
+            # they are recorded to be replayed on a cache hit.
+            comment_pos = self.comment_pos
+            imported_js = set(self.context.imported_js)
+            imported_modules = set(self.context.imported_modules)
+            imported_classes = dict(self.context.imported_classes)
+            code = self._captured(self._toplevel_definition, node)
+            fragment = (code, self.comment_pos - comment_pos,
+                        self.context.imported_js - imported_js,
+                        self.context.imported_modules - imported_modules,
+                        dict(item for item in self.context.imported_classes.items()
+                             if imported_classes.get(item[0]) != item[1]),
+                        set(self.context.method_imported_globals))
+            self.fragment_cache.put(key, fragment)
+        else:
+            code, comment_count, imported_js, imported_modules, imported_classes, \
+                method_imported_globals = fragment
+            self.comment_pos += comment_count
+            self.context.imported_js.update(imported_js)
+            self.context.imported_modules.update(imported_modules)
+            self.context.imported_classes.update(imported_classes)
+            self.context.method_imported_globals = set(method_imported_globals)
+        self.emit(code)
+
+    def _toplevel_definition(self, node):
+        # a definition numbers its temporaries on its own, so its code
+        # doesn't depend on the module code translated before it.
+        temps = self.context.temps
+        self.context.temps = 0
+        try:
+            if isinstance(node, ast.FunctionDef):
+                self._function(node, False)
+            else:
+                self._class(node)
+        finally:
+            self.context.temps = temps
+
+    def _temp(self, name):
+        """
+        Return a php variable for a temporary named after name, which no
+        other temporary of the definition or module code uses.
+        """
+        self.context.temps += 1
+        return "$__%s%d" % (name, self.context.temps)
+
+    def _fragment_key(self, node, next_lineno):
+        """
+        Hash everything the code emitted for a top-level definition depends
+        on: the structure of its subtree, what the module knows about the
+        names it uses and the comments up to the next top-level statement.
+        """
+        names = set()
+        lines = []
+        for child in ast.walk(node):
+            if isinstance(child, ast.stmt):
+                lines.append(child.lineno - node.lineno)
+            if isinstance(child, ast.Name):
+                names.add(child.id)
+            elif isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name):
+                names.add(child.value.id + "." + child.attr)
+        symbols = [(name, name in self.context.top_level_functions, name in self.context.top_level_classes,
+                    name in self.context.imported_modules, self.context.imported_classes.get(name),
+                    name in self.context.top_level_vars)
+                   for name in sorted(names)]
+        digest = hashlib.sha1(ast.dump(node).encode("utf-8"))
+        digest.update(("\0" + repr(symbols) + repr(sorted(self.context.method_imported_globals))).encode("utf-8"))
+        # keyword arguments are bound to the signatures of the module
+        digest.update(self._signature_digest().encode("utf-8"))
+        if self.source_map:
+            digest.update(("\0map" + repr(lines)).encode("utf-8"))
+        comments = []
+        pos = self.comment_pos
+        while pos < len(self.comments) and (next_lineno is None or self.comments[pos][0] < next_lineno):
+            line, text = self.comments[pos]
+            comments.append((line - node.lineno, text))
+            pos += 1
+        if comments:
+            # where a comment ends up depends on the lines of the statements
+            # around it, which the dump of the subtree doesn't show.
+            digest.update(("\0" + repr(comments) + repr(lines)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _signature_digest(self):
+        """
+        Hash the signatures of the top-level functions and of the methods
+        of the top-level classes.
+        """
+        if self.signature_digest is None:
+            signatures = []
+            for name, node in sorted(self.context.definitions.items()):
+                if isinstance(node, ast.FunctionDef):
+                    signatures.append((name, ast.dump(node.args)))
+                else:
+                    signatures.append((name, [ast.dump(base) for base in node.bases],
+                                       [(child.name, ast.dump(child.args), [ast.dump(d) for d in child.decorator_list])
+                                        for child in node.body if isinstance(child, ast.FunctionDef)]))
+            self.signature_digest = "\0" + hashlib.sha1(repr(signatures).encode("utf-8")).hexdigest()
+        return self.signature_digest
+
+    @staticmethod
+    def module_imports(mod):
+        """
+        Return the modules a parsed module imports, i.e. what the
+        imported_modules of its Translator will be, without translating it.
+        """
+        modules = set()
+        for child in mod.body:
+            modules.update(imported_names(child)[0])
+        return modules
+
+    def _arguments(self, node):
+        """
+        Return the parameter names of a function or lambda, followed by the
+        names of its *args and **kwargs, and a dict mapping the parameters
+        that have a default to their default value.  Keyword-only
+        parameters become ordinary parameters.
+        """
+        args = node.args
+        named = args.posonlyargs + args.args
+        defaults = dict(zip([arg.arg for arg in named[len(named) - len(args.defaults):]], args.defaults))
+        for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+            if default is not None:
+                defaults[arg.arg] = default
+        argnames = [arg.arg for arg in named + args.kwonlyargs]
+        if args.vararg:
+            argnames.append(args.vararg.arg)
+        if args.kwarg:
+            argnames.append(args.kwarg.arg)
+        return argnames, defaults
+
     def _default_args_handler(self, node, current_klass):
         arg_list = []
 
-        if len(node.defaults):
-            default_pos = len(node.argnames) - len(node.defaults)
-        else:
-            default_pos = 99999999
-        
-        end = 0
-        normal_args = node.argnames
-        if node.varargs != None:
-            end = node.varargs
-            normal_args = node.argnames[:-end]
+        argnames, defaults = self._arguments(node)
+        normal_args = argnames
+        if node.args.vararg:
+            normal_args = argnames[:-1]
 
-        cnt = 0
         for argname in normal_args:
             if( argname != 'self'):   # weed out those silly python 'self' args
-                if type(argname) in [tuple, list]:
-                    for n in argname:
-                        arg_list.append( '$' + n )
+                if argname in defaults:
+                    default_value = self.expr( defaults[argname], current_klass )
+                    
+                    arg_list.append( '$' + argname + "=" + default_value )
                 else:
-                    argname = '$' + argname
-                    if cnt >= default_pos:
-                        default_node = node.defaults[cnt-default_pos]
-                        
-                        default_value = self.expr( default_node, current_klass )
-                        
-                        arg_list.append( argname + "=" + default_value )
-                    else:
-                        arg_list.append( argname  )
-            cnt = cnt + 1
+                    arg_list.append( '$' + argname  )
         
-        if end > 0:
-            varargs = node.argnames[-end:]
-            args = []
-            for arg in varargs:
-                arg_list.append( "...$" + arg )
+        if node.args.vararg:
+            arg_list.append( "...$" + argnames[-1] )
 
         return ",".join(arg_list)
     
     def ind(self):
         return "    " * self.depth
+
+    def emit(self, chunk):
+        self.out.write(chunk)
+
+    def mark(self, lineno):
+        """
+        Record that the code emitted next comes from python line lineno.
+        """
+        if self.source_map:
+            self.emit(SOURCE_MARK % ("", lineno - self.line_base))
+
+    def _captured(self, handler, *args):
+        """
+        Call the statement handler and return the code it emitted instead of
+        emitting it.
+        """
+        self.out.capture()
+        try:
+            handler(*args)
+        finally:
+            buf = self.out.release()
+        return buf
+
+    def _comments(self, lineno, prefix=None):
+        """
+        Emit the python comments found before line lineno, or all comments
+        that are left if lineno is None.
+        """
+        while self.comment_pos < len(self.comments):
+            line, text = self.comments[self.comment_pos]
+            if lineno is not None and line >= lineno:
+                break
+            self.mark(line)
+            if prefix:
+                self.emit(self.ind() + prefix + " " + text.strip() + self.eol)
+            else:
+                self.emit(self.ind() + "/*" + text.replace("*/", "* /") + "*/" + self.eol)
+            self.comment_pos += 1
         
     
                 
-    def _kwargs_parser(self, node, function_name, arg_names, current_klass):
-        buf = u''
-        if len(node.defaults) or node.kwargs:
-            default_pos = len(arg_names) - len(node.defaults)
-            if arg_names and arg_names[0] == self.method_self:
-                default_pos -= 1
-            buf += self.ind() + "function " + function_name+'(', ", ".join(["__kwargs"]+arg_names), ") {" + self.eol
-            self.depth += 1
-            for default_node in node.defaults:
-                default_value = self.expr(default_node, current_klass)
-#                if isinstance(default_node, ast.Const):
-#                    default_value = self._const(default_node)
-#                elif isinstance(default_node, ast.Name):
-#                    default_value = self._name(default_node)
-#                elif isinstance(default_node, ast.UnarySub):
-#                    default_value = self._unarysub(default_node, current_klass)
-#                else:
-#                    raise TranslationError("unsupported type (in _method)", default_node)
-                
-                default_name = arg_names[default_pos]
-                buf += self.ind() + "if (typeof %s == 'undefined')"%(default_name) + self.eol
-                self.depth += 1
-                buf += self.ind() + "%s=__kwargs.%s;"% (default_name, default_name) + self.eol
-                self.depth -= 1 
-                default_pos += 1
-            
-            #self._default_args_handler(node, arg_names, current_klass)
-            if node.kwargs: arg_names += ["pyjslib_Dict(__kwargs)"]
-            buf += self.ind() + "var __r = "+"".join(["[", ", ".join(arg_names), "]"])+";" + self.eol
-            buf += self.ind() + "return __r;" + self.eol
-            self.depth -= 1
-            buf += self.ind() + "};" + self.eol
-        return buf
-        
-    def _function(self, node, local=False, static=False):
-        function_name = ''
-        buf = u''
-        if local: function_name = node.name
-        else: function_name = strip_py(self.module_prefix) + node.name
+    def _function(self, node, local=False, static=False, name=None):
+        function_name = name or node.name
+        if not local: function_name = strip_py(self.module_prefix) + function_name
             
-        argnames = []
-        for argname in node.argnames:
-            if( argname != 'self'):   # weed out those silly python 'self' args
-                if type(argname) in [tuple, list]:
-                    for n in argname:
-                        argnames.append( "$" + n )
-                else:
-                    argnames.append( "$" + argname )
-        
-        arg_names = list(argnames)
-        normal_arg_names = list(arg_names)
-        if node.kwargs: kwargname = normal_arg_names.pop()
-        if node.varargs: varargname = normal_arg_names.pop()        
-        
-        declared_arg_names = list(normal_arg_names)
-        if node.kwargs: declared_arg_names.append(kwargname)
-
-        buf += self._doc(node.doc)
+        body, doc = split_docstring(node)
+        self.emit(self._doc(doc))
         
         #function_args = "(" + ", ".join(declared_arg_names) + ")"
         ordered_args = self._default_args_handler(node, None)
@@ -240,20 +968,24 @@ class Translator:
         static_buf = ""
         if static:
             static_buf = "static "
-        buf += self.ind() + "%sfunction %s%s {" % (static_buf, function_name, function_args) + self.eol
+        self.emit(self.ind() + "%sfunction %s%s {" % (static_buf, function_name, function_args) + self.eol)
             
         self.depth += 1
+        scope = self.scope
+        self.scope = node
         
-        for child in node.code:
-            buf += self._stmt(child, None)
+        for child in body:
+            self._stmt(child, None)
 
+        self.scope_indexes.pop(node, None)
+        self.type_indexes.pop(node, None)
+        self.scope = scope
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        return buf
+        self.emit(self.ind() + "}" + self.eol)
     
     
     def _doc(self, node):
-        buf = u''
+        buf = ''
         if node != None and len(node):
             lines = node.strip().split("\n")
             buf += self.ind() + "/**" + self.eol
@@ -267,21 +999,32 @@ class Translator:
         
     
     def _return(self, node, current_klass):
-        buf = u''
-        expr = self.expr(node.value, current_klass)
+        expr = "null"
+        if isinstance(node.value, ast.ListComp) and self._inline_listcomp(node.value):
+            var = self._temp("listcomp")
+            self._listcomp_stmt(var, node.value, current_klass)
+            self.emit(self.ind() + "return " + var + ";" + self.eol)
+            return
+        reduction = self._reduction_call(node.value)
+        if reduction and self._inline_listcomp(reduction[1]):
+            var = self._temp(reduction[0])
+            self._reduction_stmt(var, node.value, current_klass)
+            self.emit(self.ind() + "return " + var + ";" + self.eol)
+            return
+        if node.value is not None:
+            expr = self.expr(node.value, current_klass)
         if expr != "null":
-            buf += self.ind() + "return " + expr + ";" + self.eol
+            self.emit(self.ind() + "return " + expr + ";" + self.eol)
         else:
-            buf += self.ind() + "return;" + self.eol
-        return buf
+            self.emit(self.ind() + "return;" + self.eol)
 
 
     def _break(self, node, current_klass):
-        return self.ind() + "break;" + self.eol
+        self.emit(self.ind() + "break;" + self.eol)
 
 
     def _continue(self, node, current_klass):
-        return self.ind() + "continue;" + self.eol
+        self.emit(self.ind() + "continue;" + self.eol)
 
     def _customcallargs(self, args, position_map, current_klass):
         
@@ -308,120 +1051,94 @@ class Translator:
         omit_call_args = False
         omit_call_parens = False
         
-        python_builtins = ['abs', 'divmod', 'input', 'open', 'staticmethod', 'all', 'enumerate', 'int', 'ord', 'str', 'any', 'eval', 'isinstance', 'pow', 'sum', 'basestring', 'execfile', 'issubclass', 'print', 'super', 'bin', 'file', 'iter', 'property', 'tuple', 'bool', 'filter', 'len', 'range', 'type', 'bytearray', 'float', 'list', 'raw_input', 'unichr', 'callable', 'format', 'locals', 'reduce', 'unicode', 'chr', 'frozenset', 'long', 'reload', 'vars', 'classmethod', 'getattr', 'map', 'repr', 'xrange', 'cmp', 'globals', 'max', 'reversed', 'zip', 'compile', 'hasattr', 'memoryview', 'round', '__import__', 'complex', 'hash', 'min', 'set', 'delattr', 'help', 'next', 'setattr', 'dict', 'hex', 'object', 'slice', 'dir', 'id', 'oct', 'sorted']
+        if self._reduction_call(v):
+            return self._reduction(v, current_klass)
+
         # print_r(v)
-        if isinstance(v.node, ast.Name):
-            if v.node.name in self.top_level_functions:
-                call_name = v.node.name
-            elif v.node.name in self.top_level_classes:
-                call_name = "new " + v.node.name
-            elif self.imported_classes.has_key(v.node.name):
+        if isinstance(v.func, ast.Name):
+            if v.func.id in self.context.top_level_functions:
+                call_name = v.func.id
+            elif v.func.id in self.context.top_level_classes:
+                call_name = "new " + v.func.id
+            elif v.func.id in self.context.imported_classes:
                 # BUG: imported_classes may contain imported function names
                 # also.  But python AST doesn't seem to provide any way to
                 # distinguish between a class and a function when importing
                 # or when calling.  :-(
-                call_name = "new " + v.node.name
-            elif v.node.name == "super":
+                call_name = "new " + v.func.id
+            elif v.func.id == "super":
                 call_name = "parent"
                 omit_call_args = True
                 omit_call_parens = True
-            elif v.node.name == "callable":
-                call_name = "is_function"
-            elif v.node.name == "dict":
-                call_name = "pyjslib_dict"
-            elif v.node.name == "map":
+            elif v.func.id == "map":
                 call_name = "pyjslib_map"
                 call_args = self._customcallargs(v.args, ['callable'], current_klass)
-            elif v.node.name == "zip":
-                call_name = "pyjslib_zip"
-            elif v.node.name == "dir":
-                call_name = "pyjslib_dir"
-            elif v.node.name == "getattr":
-                call_name = "pyjslib_getattr"
-            elif v.node.name == "hasattr":
-                call_name = "method_exists"
-            elif v.node.name == "int":
-                call_name = "pyjslib_int"
-            elif v.node.name == "str":
-                call_name = "pyjslib_str"
-            elif v.node.name == "range":
-                call_name = "pyjslib_range"
-            elif v.node.name == "len":
-                call_name = "strlen"
-            elif v.node.name == "sum":
-                call_name = "pyjslib_sum"
-            elif v.node.name == "min":
-                call_name = "pyjslib_min"
-            elif v.node.name == "max":
-                call_name = "pyjslib_max"
-            elif v.node.name == "list":
-                call_name = "pyjslib_list"
-            elif v.node.name == "hash":
-                call_name = "pyjslib_hash"
-            elif v.node.name == "repr":
-                call_name = "pyjslib_repr"
-            elif v.node.name == "isinstance":
-                call_name = "isinstance"
-            elif v.node.name == "open":
-                call_name = "pyjslib_open"
-            elif v.node.name == "globals":
-                call_name = "pyjslib_globals"
-            elif v.node.name == "filter":
+            elif v.func.id == "filter":
                 call_args = self._customcallargs(v.args, ['callable'], current_klass)
                 call_name = "pyjslib_filter"
-            elif v.node.name == "float":
-                call_name = "floatval"
-            elif v.node.name in python_builtins:
-                call_name = v.node.name
+            elif v.func.id == "len":
+                kind = None
+                if len(v.args) == 1 and not isinstance(v.args[0], ast.Starred):
+                    kind = self._type(v.args[0])
+                call_name = {"str": "strlen", "list": "count", "dict": "count"}.get(kind, "pyjslib_len")
+            elif v.func.id in PHP_BUILTINS:
+                call_name = PHP_BUILTINS[v.func.id]
+            elif v.func.id in PYTHON_BUILTINS:
+                call_name = v.func.id
             else:
                 # none of the above, so it must be a variable, right?
-                call_name = "$" + v.node.name
+                call_name = "$" + v.func.id
             #print "call_name: " + call_name
             
-        elif isinstance(v.node, ast.Getattr):
-            attr_name = v.node.attrname
-            if isinstance(v.node.expr, ast.Name):
-                call_name = self._name2(v.node.expr, current_klass, attr_name, True)
+        elif isinstance(v.func, ast.Attribute):
+            attr_name = v.func.attr
+            if isinstance(v.func.value, ast.Name):
+                call_name = self._name2(v.func.value, current_klass, attr_name, True)
                 call_args = []
-            elif isinstance(v.node.expr, ast.Getattr):
-                call_name = self._getattr2(v.node.expr, current_klass, attr_name)
+            elif isinstance(v.func.value, ast.Attribute):
+                call_name = self._getattr2(v.func.value, current_klass, attr_name)
                 call_args = []
-            elif isinstance(v.node.expr, ast.CallFunc):
-                method = v.node.attrname
+            elif isinstance(v.func.value, ast.Call):
+                method = v.func.attr
                 if method == "__init__":
                     method = "__construct"
-                call_name = self._callfunc(v.node.expr, current_klass) + "->" + method
+                call_name = self._callfunc(v.func.value, current_klass) + "->" + method
                 call_args = []
-            elif isinstance(v.node.expr, ast.Subscript):
-                call_name = self._subscript(v.node.expr, current_klass) + "->" + v.node.attrname
+            elif isinstance(v.func.value, ast.Subscript):
+                call_name = self._subscript(v.func.value, current_klass) + "->" + v.func.attr
                 call_args = []
-            elif isinstance(v.node.expr, ast.Const):
-                call_name = self.expr(v.node.expr, current_klass) + "->" + v.node.attrname
+            elif isinstance(v.func.value, ast.Constant):
+                call_name = self.expr(v.func.value, current_klass) + "->" + v.func.attr
                 call_args = []
             else:
-                call_name = self.expr(v.node.expr, current_klass) + "->" + v.node.attrname
-                #raise TranslationError("unsupported type (in _callfunc)", v.node.expr)
+                call_name = self.expr(v.func.value, current_klass) + "->" + v.func.attr
+                #raise TranslationError("unsupported type (in _callfunc)", v.func.value)
+            if (attr_name in STRING_METHODS and call_name.endswith("->" + attr_name)
+                    and not (isinstance(v.func.value, ast.Name) and v.func.value.id == "self")
+                    and not v.keywords
+                    and not [arg for arg in v.args if isinstance(arg, ast.Starred)]):
+                return self._strmethod(call_name[:-len(attr_name) - 2], attr_name, v.args, current_klass)
             if call_name.endswith( "->append"):
                 call_name = call_name.replace( "->append", "")
                 is_append = True
             if call_name.endswith( "__construct"):
                 is_constructor = True
 
-        elif isinstance(v.node, ast.Subscript):
-            call_name = self._subscript(v.node, current_klass)
+        elif isinstance(v.func, ast.Subscript):
+            call_name = self._subscript(v.func, current_klass)
             call_args = []
 
-        elif isinstance(v.node, ast.CallFunc):
-            call_name = self._callfunc(v.node, current_klass)
+        elif isinstance(v.func, ast.Call):
+            call_name = self._callfunc(v.func, current_klass)
             call_args = []
 
         # apparently this will "compile" in python but generate runtime error
         # TypeError: 'tuple' object is not callable
-        elif isinstance(v.node, ast.Tuple):
-            return self._tuple( v.node, current_klass )
+        elif isinstance(v.func, ast.Tuple):
+            return self._tuple( v.func, current_klass )
 
-        elif isinstance(v.node, ast.Lambda):
-            call_name = self._lambda(v.node, current_klass)
+        elif isinstance(v.func, ast.Lambda):
+            call_name = self._lambda(v.func, current_klass)
             call_args = []
             is_user_func = True
 
@@ -429,41 +1146,46 @@ class Translator:
             # python allows some weird stuff as function calls.
             # examples I've seen in the wild:
             #     and/or,  multiplication, tuples, etc.
-            call_name = "(" + self.expr(v.node, current_klass) + ")"
+            call_name = "(" + self.expr(v.func, current_klass) + ")"
 
         # else:
-        #    raise TranslationError("unsupported type (in _callfunc)", v.node)
+        #    raise TranslationError("unsupported type (in _callfunc)", v.func)
          
         call_name = strip_py(call_name)
 
         kwargs = []
+        kwarg_code = {}
         
         if len(call_args) == 0 and omit_call_args == False:
             cnt = 0
             for ch4 in v.args:
-                if isinstance(ch4, ast.Keyword):
-                    kwarg = '"' + ch4.name + '"' + " => " + self.expr(ch4.expr, current_klass)
-                    kwargs.append(kwarg)
+                if isinstance(ch4, ast.Starred):
+                    call_args.append( "..." + self.expr(ch4.value, current_klass) )
                 else:
                     arg = self.expr(ch4, current_klass)
                     if arg == "$this" and is_constructor and cnt == 0:
                         continue
-                    #print "ARG: " + arg + ', ' + str(ch4)
-                    #no_dollar = [ast.Class, ast.Const]
-                    if isinstance(ch4, ast.Name):
-                        arg = arg
                     if( arg != None):
                         call_args.append(arg)
                 cnt = cnt + 1
+            for ch4 in v.keywords:
+                if ch4.arg is not None:
+                    kwarg_code[ch4.arg] = self.expr(ch4.value, current_klass)
+                    kwarg = '"' + ch4.arg + '"' + " => " + kwarg_code[ch4.arg]
+                    kwargs.append(kwarg)
 
-        if v.star_args != None:
-            arg = "..." + self.expr(v.star_args, current_klass)
-            call_args.append( arg )
-            
-        if v.dstar_args != None:
-            dstar_arg = self.expr(v.dstar_args, current_klass)
-            if v.star_args:
-                cargs = self.expr(v.star_args, current_klass)
+        dstar_args = [kw.value for kw in v.keywords if kw.arg is None]
+        if kwargs and not dstar_args and not is_user_func:
+            bound = self._bound_arguments(v, call_name)
+            if bound is not None:
+                call_args += [kwarg_code[arg] if isinstance(arg, str) else self.expr(arg, current_klass)
+                              for arg in bound]
+                return call_name + "(" + ", ".join(call_args) + ")"
+        if dstar_args:
+            dstar_arg = self.expr(dstar_args[0], current_klass)
+            star_args = [arg.value for arg in v.args if isinstance(arg, ast.Starred)]
+            if star_args:
+                cargs = self.expr(star_args[0], current_klass)
             else:
                 cargs = "[" + ",".join( call_args ) + "]"
             try: call_this, method_name = call_name.rsplit("->", 1)
@@ -509,10 +1231,149 @@ class Translator:
             else:
                 return call_name
     
+    def _callee(self, v, call_name):
+        """
+        Return the FunctionDef a call with keyword arguments binds them to
+        and whether it is a method called on an instance, or None if the
+        callee is not known at translate time.
+        """
+        definitions = self.context.definitions
+        func = v.func
+        if isinstance(func, ast.Name):
+            node = definitions.get(func.id)
+            if isinstance(node, ast.FunctionDef) and call_name == func.id:
+                return node, False
+            if isinstance(node, ast.ClassDef) and call_name == "new " + func.id:
+                method = self._method_def(node, "__init__", set())
+                return method and (method, True)
+        elif (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self"
+                and call_name == "$this->" + func.attr and self.klass is not None
+                and self.scope in self.klass.body and not self.scope.decorator_list
+                and self.scope.args.args and self.scope.args.args[0].arg == "self"):
+            method = self._method_def(self.klass, func.attr, set())
+            if method is None:
+                return None
+            # a subclass may override the method, so every class of the
+            # module defining it must agree on the signature.
+            signature = (ast.dump(method.args), [ast.dump(d) for d in method.decorator_list])
+            for node in definitions.values():
+                if isinstance(node, ast.ClassDef):
+                    for child in node.body:
+                        if (isinstance(child, ast.FunctionDef) and child.name == func.attr
+                                and (ast.dump(child.args), [ast.dump(d) for d in child.decorator_list]) != signature):
+                            return None
+            static = [d for d in method.decorator_list if isinstance(d, ast.Name) and d.id == "staticmethod"]
+            return method, not static
+        elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) \
+                and call_name == self._name(func.value) + "->" + func.attr:
+            # an instance the function created: its class is known exactly,
+            # so no subclass can override the method
+            klass = self._type(func.value)
+            if not isinstance(klass, ast.ClassDef):
+                return None
+            method = self._method_def(klass, func.attr, set())
+            if method is None:
+                return None
+            static = [d for d in method.decorator_list if isinstance(d, ast.Name) and d.id == "staticmethod"]
+            return method, not static
+        return None
+
+    def _method_def(self, klass, name, seen):
+        """
+        Return the FunctionDef of the method name of the ClassDef klass or
+        of the base class it inherits it from, or None if it can't be told.
+        """
+        seen.add(klass.name)
+        for child in reversed(klass.body):
+            if isinstance(child, ast.FunctionDef) and child.name == name:
+                for d in child.decorator_list:
+                    if not (isinstance(d, ast.Name) and d.id == "staticmethod"):
+                        return None
+                return child
+        bases = [base for base in klass.bases if not (isinstance(base, ast.Name) and base.id == "object")]
+        if len(bases) != 1 or not isinstance(bases[0], ast.Name) or bases[0].id in seen:
+            return None
+        base = self.context.definitions.get(bases[0].id)
+        if not isinstance(base, ast.ClassDef):
+            return None
+        return self._method_def(base, name, seen)
+
+    def _bound_arguments(self, v, call_name):
+        """
+        Bind the keyword arguments of the call v to the parameters of its
+        callee.  Return what to pass after the positional arguments: the
+        names of keyword arguments and the literal defaults of parameters
+        left out in between, or None if the call needs the reflection
+        helpers.
+        """
+        callee = self._callee(v, call_name)
+        if callee is None:
+            return None
+        function, method = callee
+        args = function.args
+        if args.vararg or args.kwarg or [arg for arg in v.args if isinstance(arg, ast.Starred)]:
+            return None
+        params = [arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs]
+        positional = len(args.posonlyargs + args.args)
+        if method:
+            if not positional or params[0] != "self":
+                return None
+            params = params[1:]
+            positional -= 1
+        if "self" in params:
+            # the translated function has no such parameter
+            return None
+        defaults = self._arguments(function)[1]
+        keywords = [kw.arg for kw in v.keywords]
+        free = params[len(v.args):]
+        posonly = [arg.arg for arg in args.posonlyargs]
+        if len(v.args) > positional or [kw for kw in keywords if kw not in free or kw in posonly]:
+            return None
+        last = max(params.index(kw) for kw in keywords)
+        bound = []
+        for param in params[len(v.args):]:
+            if param in keywords:
+                bound.append(param)
+            elif param not in defaults:
+                # python raises a TypeError
+                return None
+            elif params.index(param) < last:
+                default = defaults[param]
+                if isinstance(default, ast.UnaryOp) and isinstance(default.op, (ast.USub, ast.UAdd)):
+                    default = default.operand
+                if not isinstance(default, ast.Constant):
+                    return None
+                bound.append(defaults[param])
+        # php evaluates the arguments in the order of the parameters.
+        values = dict((kw.arg, kw.value) for kw in v.keywords)
+        if [arg for arg in bound if isinstance(arg, str)] != keywords \
+                and len([kw for kw in keywords if not self._pure(values[kw])]) > 1:
+            return None
+        return bound
+
+    @staticmethod
+    def _pure(node):
+        """
+        Whether evaluating node has no side effects.
+        """
+        while isinstance(node, (ast.Attribute, ast.UnaryOp)):
+            node = node.value if isinstance(node, ast.Attribute) else node.operand
+        return isinstance(node, (ast.Constant, ast.Name))
+
+    def _strmethod(self, var, method, args, current_klass):
+        """
+        Lower the call of a python string method on var to the php string
+        function doing the same.
+        """
+        args = [self.expr(arg, current_klass) for arg in args]
+        template = STRING_METHODS[method]
+        if not args:
+            template = STRING_METHODS_NOARGS.get(method, template)
+        return template % {"var": var, "args": ", ".join(args), "var_args": ", ".join([var] + args)}
+
     def _print(self, node, current_klass, nl = False):
-        buf = u''
         call_args = []
-        for ch4 in node.nodes:
+        for ch4 in node.args:
             arg = self.expr(ch4, current_klass)
             call_args.append(arg)
             
@@ -521,82 +1382,82 @@ class Translator:
             func = "pyjslib_printnl"
         
         if len(call_args) == 1:
-            buf += self.ind() + func + "(" + ''.join(call_args) + ");" + self.eol
+            self.emit(self.ind() + func + "(" + ''.join(call_args) + ");" + self.eol)
         else:
-            buf += self.ind() + func + "([" + ', '.join(call_args) + "], true);" + self.eol
-        return buf
+            self.emit(self.ind() + func + "([" + ', '.join(call_args) + "], true);" + self.eol)
         
 
     def _getattr(self, v, as_callable=False):
-        attr_name = v.attrname
-        if isinstance(v.expr, ast.Name):
-            obj = self._name(v.expr, return_none_for_module=True)
-            if obj == None and v.expr.name in self.imported_modules:
+        attr_name = v.attr
+        if isinstance(v.value, ast.Name):
+            obj = self._name(v.value, return_none_for_module=True)
+            if obj == None and v.value.id in self.context.imported_modules:
                 if as_callable:
-                    return "['" + v.expr.name + "', '" + attr_name + "']"
+                    return "['" + v.value.id + "', '" + attr_name + "']"
                 else:
-                    return v.expr.name+'::'+ attr_name
+                    return v.value.id+'::'+ attr_name
             scope = "->"
-            if v.expr.name in self.top_level_classes or v.expr.name in self.imported_classes:
+            if v.value.id in self.context.top_level_classes or v.value.id in self.context.imported_classes:
                 scope = "::"
                 attr_name = "$" + attr_name
             if as_callable:
                 if obj[0] != '$':
                     obj = "'" + obj + "'"
-                return "[" + obj + ", '" + v.attrname + "']"
+                return "[" + obj + ", '" + v.attr + "']"
             else:
                 return obj + scope + attr_name
-        elif isinstance(v.expr, ast.Getattr):
-            return self._getattr(v.expr) + "->" + attr_name
-        elif isinstance(v.expr, ast.Subscript):
-            return self._subscript(v.expr, attr_name ) + "->" + attr_name
-        elif isinstance(v.expr, ast.CallFunc):
-            return self._callfunc(v.expr, attr_name )
+        elif isinstance(v.value, ast.Attribute):
+            return self._getattr(v.value) + "->" + attr_name
+        elif isinstance(v.value, ast.Subscript):
+            return self._subscript(v.value, attr_name ) + "->" + attr_name
+        elif isinstance(v.value, ast.Call):
+            return self._callfunc(v.value, attr_name )
         else:
-            return self.expr(v.expr, None) + "::" + attr_name
-            # raise TranslationError("unsupported type (in _getattr)", v.expr)
+            return self.expr(v.value, None) + "::" + attr_name
+            # raise TranslationError("unsupported type (in _getattr)", v.value)
     
     def _arg_as_phptype(self, node, phptype):
         if phptype == "string":
-            return "'" + node.name + "'"
+            return "'" + node.id + "'"
         elif phptype == "callable":
             if isinstance( node, ast.Name):
-                return "'" + node.name + "'"
-            elif isinstance( node, ast.Getattr):
+                return "'" + node.id + "'"
+            elif isinstance( node, ast.Attribute):
                 return self._getattr( node, True )
             elif isinstance( node, ast.Lambda):
                 return self._lambda( node, None )
         elif phptype == "variable":
-            return "$" + node.name
+            return "$" + node.id
         elif phptype == "literal":
-            return node.name
+            return node.id
         else:
             raise TranslationError("unsupported phptype (in _name_as_phptype)", node)
     
     
     def _name(self, v, return_none_for_module=False):
-        if v.name == "True":
+        context = self.context
+        if v.id == "True":
             return "true"
-        elif v.name == "False":
+        elif v.id == "False":
             return "false"
-        elif v.name == "None":
+        elif v.id == "None":
             return "null"
-        elif v.name == self.method_self:
+        elif v.id == context.method_self:
             return "$this"
-        elif v.name in self.method_imported_globals:
-            return "$" + self._self(v.name)
-        elif self.imported_classes.has_key(v.name):
-            return self._self(v.name)
-        elif v.name in self.top_level_classes:
-            return self._self(v.name)
-        elif v.name in self.imported_modules and return_none_for_module:
+        elif v.id in context.method_imported_globals:
+            return "$" + self._self(v.id)
+        elif v.id in context.imported_classes:
+            return self._self(v.id)
+        elif v.id in context.top_level_classes:
+            return self._self(v.id)
+        elif v.id in context.imported_modules and return_none_for_module:
             return None
         else:
-            return "$" + self._self(v.name)
+            return "$" + self._self(v.id)
 
 
     def _name2(self, v, current_klass, attr_name, is_call=False):
-        obj = v.name
+        obj = v.id
         
         dollar = "$"
         if is_call:
@@ -605,13 +1466,13 @@ class Translator:
         if attr_name == "__init__":
             attr_name = "__construct"
 
-        if obj in self.method_imported_globals:
+        if obj in self.context.method_imported_globals:
             call_name = self._name(v) + "->" + attr_name
-        elif self.imported_classes.has_key(obj):
+        elif obj in self.context.imported_classes:
             #attr_str = ""
             #if attr_name != "__init__":
             call_name = obj + "::" + dollar + attr_name
-        elif obj in self.imported_modules:
+        elif obj in self.context.imported_modules:
             # PHP has no concept of modules.
             # This could be using PHP namespaces, in PHP6.
             # For now we just pretend the module is a class.  Often it should be anyway.
@@ -625,15 +1486,15 @@ class Translator:
 
 
     def _getattr2(self, v, current_klass, attr_name):
-        if isinstance(v.expr, ast.Getattr):
-            call_name = self._getattr2(v.expr, current_klass, v.attrname + "->" + attr_name)
-        elif isinstance(v.expr, ast.Name) and v.expr.name in self.imported_modules:
-            call_name = v.expr.name + "::" + v.attrname + "::" + attr_name
-        elif isinstance(v.expr, ast.Name) and v.expr.name + "." + v.attrname in self.imported_modules:
-            call_name = self._import_name(v.expr.name + "." + v.attrname) + "::" + attr_name
+        if isinstance(v.value, ast.Attribute):
+            call_name = self._getattr2(v.value, current_klass, v.attr + "->" + attr_name)
+        elif isinstance(v.value, ast.Name) and v.value.id in self.context.imported_modules:
+            call_name = v.value.id + "::" + v.attr + "::" + attr_name
+        elif isinstance(v.value, ast.Name) and v.value.id + "." + v.attr in self.context.imported_modules:
+            call_name = self._import_name(v.value.id + "." + v.attr) + "::" + attr_name
         else:
-            obj = self.expr(v.expr, current_klass)
-            call_name = obj + "->" + v.attrname + "->" + attr_name
+            obj = self.expr(v.value, current_klass)
+            call_name = obj + "->" + v.attr + "->" + attr_name
             
         return call_name
     
@@ -667,109 +1528,116 @@ class Translator:
         
         Much of this work is done in pyjs_extend, is pyjslib.py
         """
-        buf = u''
         class_name = strip_py(self.module_prefix) + node.name
         current_klass = Klass(class_name)
+        self.context.klasses[class_name] = current_klass
         
-        init_method = None
-        for child in node.code:
-            if isinstance(child, ast.Function):
+        body, doc = split_docstring(node)
+        for child in body:
+            if isinstance(child, ast.FunctionDef):
                 current_klass.add_function(child.name)
-                if child.name == "__init__":
-                    child.name = "__construct"
-                    init_method = child
 
         bases = []
         base_class = None
         
         for base in node.bases:
             if isinstance(base, ast.Name):
-                basename = base.name
+                basename = base.id
                 if basename == 'object':
                     basename = 'stdClass'
                 bases.append(basename)
-            elif isinstance(base, ast.Getattr):
-                bases.append( base.attrname )
-            elif isinstance(base, ast.CallFunc):
-                buf += self.ind() + self.eol
-                buf += self.ind() + "/* py2php : Monkey Patching is not supported in PHP" + self.eol
-                buf += self.ind() + " * " + self.eol
-                buf += self.ind() + self._callfunc(base, None) + self.eol
-                buf += self.ind() + " */" + self.eol + self.eol
+            elif isinstance(base, ast.Attribute):
+                bases.append( base.attr )
+            elif isinstance(base, ast.Call):
+                self.emit(self.ind() + self.eol)
+                self.emit(self.ind() + "/* py2php : Monkey Patching is not supported in PHP" + self.eol)
+                self.emit(self.ind() + " * " + self.eol)
+                self.emit(self.ind() + self._callfunc(base, None) + self.eol)
+                self.emit(self.ind() + " */" + self.eol + self.eol)
             else:
                 raise TranslationError("unsupported type (in _class)", base)
 
         if len(bases) == 1:
             base_class = bases[0]
-            current_klass.set_base(base_class)
+            current_klass.set_base(self.context.klasses.get(base_class))
         
-        buf += self._doc( node.doc )
+        self.emit(self._doc( doc ))
         
         line = self.ind() + "class " + class_name
         if base_class != None:
             line += " extends " + base_class
         line += " {" + self.eol
 
-        buf += line
+        self.emit(line)
         self.depth += 1
         
         if len(bases) > 1:
-            buf += self.ind() + "/* py2php : PHP does not support multiple inheritance." + self.eol
-            buf += self.ind() + " * Consider defining the referenced classes as traits instead." + self.eol
-            buf += self.ind() + " * See: http://php.net/manual/en/language.oop5.traits.php" + self.eol
-            buf += self.ind() + " */" + self.eol
-            buf += self.ind() + "use " + ", ".join(bases) + " {" + self.eol
-            buf += self.ind() + "}" + self.eol
+            self.emit(self.ind() + "/* py2php : PHP does not support multiple inheritance." + self.eol)
+            self.emit(self.ind() + " * Consider defining the referenced classes as traits instead." + self.eol)
+            self.emit(self.ind() + " * See: http://php.net/manual/en/language.oop5.traits.php" + self.eol)
+            self.emit(self.ind() + " */" + self.eol)
+            self.emit(self.ind() + "use " + ", ".join(bases) + " {" + self.eol)
+            self.emit(self.ind() + "}" + self.eol)
         
 
-        for child in node.code:
+        klass = self.klass
+        self.klass = node
+        scope = self.scope
+        self.scope = node
+        for child in body:
+            self._comments(child.lineno, "//")
+            self.mark(child.lineno)
             if isinstance(child, ast.Pass):
                 pass
-            elif isinstance(child, ast.Function):
-                buf += self._method(child, current_klass, class_name)
-            elif isinstance(child, ast.Assign):
-                buf += self.classattr(child, current_klass)
-            elif isinstance(child, ast.Discard) and isinstance(child.expr, ast.Const):
+            elif isinstance(child, ast.FunctionDef):
+                self._method(child, current_klass, class_name)
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)):
+                self.classattr(child, current_klass)
+            elif isinstance(child, ast.Expr) and is_const(child.value):
                 # Probably a docstring, turf it
-                lines = str(child.expr.value).strip().split("\n")
+                lines = str(child.value.value).strip().split("\n")
                 for line in lines:
-                    buf += self.ind() + "// " + line.lstrip() + self.eol
-            elif isinstance(child, ast.Discard):
-                buf += self.ind() + self.expr( child.expr, current_klass ) + self.eol;
-            elif isinstance(child, ast.Class):
-                buf += self._class(child)
+                    self.emit(self.ind() + "// " + line.lstrip() + self.eol)
+            elif isinstance(child, ast.Expr):
+                self.emit(self.ind() + self.expr( child.value, current_klass ) + self.eol);
+            elif isinstance(child, ast.ClassDef):
+                self._class(child)
             else:
                 # python allows arbitrary statements inside class.  weird!
-                buf += self.eol
-                buf += "/* py2php : python allows arbitrary statements inside class" + self.eol
-                buf += " *          but PHP (sensibly) does not." + self.eol
-                buf += " *          commenting out this code block." + self.eol
-                buf += self._stmt(child, current_klass)
-                buf += " */" + self.eol + self.eol
+                self.emit(self.eol)
+                self.emit("/* py2php : python allows arbitrary statements inside class" + self.eol)
+                self.emit(" *          but PHP (sensibly) does not." + self.eol)
+                self.emit(" *          commenting out this code block." + self.eol)
+                self._stmt(child, current_klass)
+                self.emit(" */" + self.eol + self.eol)
                 # raise TranslationError("unsupported type (in _class)", child)
+        self.type_indexes.pop(node, None)
+        self.scope_indexes.pop(node, None)
+        self.scope = scope
+        self.klass = klass
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        return buf
+        self.emit(self.ind() + "}" + self.eol)
         
 
     def _assert(self, node, current_klass):
         buf = self.ind() + 'assert('
         buf += self.expr( node.test, current_klass )
-        if node.fail:
-            buf += ", " + self.expr( node.fail, current_klass )
+        if node.msg:
+            buf += ", " + self.expr( node.msg, current_klass )
         buf += ");" + self.eol
         
-        return buf
+        self.emit(buf)
 
     def _exec(self, node, current_klass):
-        output = StringIO.StringIO()
+        output = io.StringIO()
 
-        if isinstance(node.expr, ast.Name):
-            buf = self.ind() + "eval(" + self.expr(node.expr, current_klass) + ");" + self.eol
-        elif isinstance(node.expr, ast.Const):
+        code = node.args[0]
+        if isinstance(code, ast.Name):
+            buf = self.ind() + "eval(" + self.expr(code, current_klass) + ");" + self.eol
+        elif isinstance(code, ast.Constant) and isinstance(code.value, str):
             try:
-                code_in = node.expr.value
-                mod = compiler.parse(code_in)
+                code_in = code.value
+                mod = parse(code_in)
                 t = Translator("eval", mod, output)
                 code_out = output.getvalue()
                 buf = self.ind() + "eval("
@@ -788,444 +1656,357 @@ class Translator:
                     buf += " <<< 'PY2PHP_EVAL_END'\n" + code_in.strip() + "\nPY2PHP_EVAL_END\n"
                 buf += ");" + self.eol
         else:
-            buf = self.ind() + "eval(" + self.expr( node.expr, current_klass ) + ");" + self.eol
+            buf = self.ind() + "eval(" + self.expr( code, current_klass ) + ");" + self.eol
             
-        return buf
+        self.emit(buf)
     
     def classattr(self, node, current_klass):
-        return self._assign(node, current_klass, True)
+        self._assign(node, current_klass, True)
     
         
     def _method(self, node, current_klass, class_name):
         # reset global var scope
-        self.method_imported_globals = set()
-        buf = u''
-        
-        arg_names = list(node.argnames)
+        self.context.method_imported_globals = set()
         
-        classmethod = False
         staticmethod = False
-        if node.decorators:
-            for d in node.decorators:
-                if hasattr( d, 'name'):
-                    if d.name == "classmethod":
-                        classmethod = True
-                    elif d.name == "staticmethod":
-                        staticmethod = True
-
-        buf += self._function(node, True, staticmethod)
-        return buf
-       
-        if staticmethod:
-            staticfunc = ast.Function([], class_name+"_"+node.name, node.argnames, node.defaults, node.flags, node.doc, node.code, node.lineno)
-            self._function(staticfunc, True)
-            return
-        else: 
-            if len(arg_names) == 0:
-                raise TranslationError("methods must take an argument 'self' (in _method)", node)
-            self.method_self = arg_names[0]
-            
-            #if not classmethod and arg_names[0] != "self":
-            #    raise TranslationError("first arg not 'self' (in _method)", node)
+        for d in node.decorator_list:
+            if isinstance(d, ast.Name) and d.id == "staticmethod":
+                staticmethod = True
 
-        normal_arg_names = arg_names[1:]
-        for arg in normal_arg_names:
-            arg = "$" + arg
-            
-        if node.kwargs: kwargname = normal_arg_names.pop()
-        if node.varargs: varargname = normal_arg_names.pop()        
-        declared_arg_names = list(normal_arg_names)
-        if node.kwargs: declared_arg_names.append(kwargname)
-        
-        function_args = "(" + ", ".join(declared_arg_names) + ")"
-    
-        if classmethod:
-            fexpr = "__" + class_name + ".prototype.__class__." + node.name
-        else:
-            fexpr = "__" + class_name + ".prototype." + node.name
-        buf += self.ind() + "function "+ node.name +  function_args + "{" + self.eol
-        self.depth += 1
-
-        # default arguments
-        self._default_args_handler(node, normal_arg_names, current_klass)
-        
-        for child in node.code:
-            self._stmt(child, current_klass)
-
-        self.depth -= 1
-        buf += self.ind() + "};" + self.eol
-            
-        self._kwargs_parser(node, fexpr, normal_arg_names, current_klass)
-        
-        if classmethod:
-            # Have to create a version on the instances which automatically passes the
-            # class as "self"
-            altexpr = "__" + class_name + ".prototype." + node.name
-            buf += self.ind() + "function "+node.name + "() {" + self.eol
-            self.depth += 1
-            buf += self.ind() + "return " + fexpr + ".apply(this.__class__, arguments);" + self.eol
-            self.depth -= 1
-            buf += self.ind() + "};" + self.eol
-            buf += self.ind() + fexpr+".class_method = true;" + self.eol
-            buf += self.ind() + altexpr+".instance_method = true;" + self.eol
-        else:
-            # For instance methods, we need an unbound version in the class object
-            altexpr = "__" + class_name + ".prototype.__class__." + node.name
-            buf += self.ind() + altexpr + " = function() {" + self.eol
-            self.depth += 1
-            buf += self.ind() + "return " + fexpr + ".call.apply("+fexpr+", arguments);" + self.eol
-            self.depth -= 1
-            buf += self.ind() + "};" + self.eol
-            buf += self.ind() + altexpr+".unbound_method = true;" + self.eol
-            buf += self.ind() + fexpr+".instance_method = true;" + self.eol
-            
-        if node.kwargs or len(node.defaults):
-            buf += self.ind() + altexpr + ".parse_kwargs = " + fexpr + ".parse_kwargs;" + self.eol
-        
-        self.method_self = None
-        self.method_imported_globals = set()
-        return buf
+        name = node.name
+        if name == "__init__":
+            name = "__construct"
+        self._function(node, True, staticmethod, name)
 
     def _stmt(self, node, current_klass):
-        buf = u''
-        if isinstance(node, ast.Stmt):
-            for n in node.nodes:
-                buf += self._stmt(n, current_klass)
-        elif isinstance(node, ast.Assert):
-            buf += self._assert(node, current_klass)
-        elif isinstance(node, ast.Return):
-            buf += self._return(node, current_klass)
-        elif isinstance(node, ast.Break):
-            buf += self._break(node, current_klass)
-        elif isinstance(node, ast.Continue):
-            buf += self._continue(node, current_klass)
-        elif isinstance(node, ast.Assign):
-            buf += self._assign(node, current_klass)
-        elif isinstance(node, ast.AugAssign):
-            buf += self._augassign(node, current_klass)
-        elif isinstance(node, ast.Discard):
-            buf += self._discard(node, current_klass)
-        elif isinstance(node, ast.If):
-            buf += self._if(node, current_klass)
-        elif isinstance(node, ast.For):
-            buf += self._for(node, current_klass)
-        elif isinstance(node, ast.While):
-            buf += self._while(node, current_klass)
-        elif isinstance(node, ast.Subscript):
-            buf += self._subscript_stmt(node, current_klass)
-        elif isinstance(node, ast.Global):
-            buf += self._global(node, current_klass)
-        elif isinstance(node, ast.Pass):
-            buf += ''
-        elif isinstance(node, ast.Function):
-            buf += self._function(node, True)
-        elif isinstance(node, ast.Exec):
-            buf += self._exec(node, True)
-        elif isinstance(node, ast.Printnl):
-            buf += self._print(node, current_klass, nl=True)
-        elif isinstance(node, ast.Print):
-            buf += self._print(node, current_klass, nl=False)
-        elif isinstance(node, ast.TryFinally):
-            buf += self._tryfinally(node, current_klass)
-        elif isinstance(node, ast.TryExcept):
-            buf += self._tryexcept(node, current_klass)            
-        elif isinstance(node, ast.Raise):
-            buf += self._raise(node, current_klass)
-        elif isinstance(node, ast.Getattr):
-            buf += self._getattr(node)
-        elif isinstance(node, ast.Import):
-            buf += self._import(node)
-        elif isinstance(node, ast.With):
-            buf += self._with(node, current_klass)
-        elif isinstance(node, ast.From):
-            buf += self._from(node)
-            
+        self._comments(node.lineno)
+        self.mark(node.lineno)
+        handler = self.stmt_handlers.get(node.__class__)
+        if handler is not None:
+            handler(self, node, current_klass)
         else:
-            buf += self.ind() + self.expr( node, current_klass) + ";" + self.eol
-        return buf
-        
-    
+            self.emit(self.ind() + self.expr( node, current_klass) + ";" + self.eol)
+
+
     def _raise(self, node, current_klass):
         name = ''
-        if isinstance(node.expr1, ast.Name):
-            name = node.expr1.name
-        elif node.expr1 == None:
+        if isinstance(node.exc, ast.Name):
+            name = node.exc.id
+        elif node.exc == None:
             name = "Exception('py2php: python code would raise pre-existing exception here.')"
         else:
-            name = self.expr( node.expr1, current_klass )
-        return self.ind() + "throw new " + name + ";" + self.eol
+            name = self.expr( node.exc, current_klass )
+        self.emit(self.ind() + "throw new " + name + ";" + self.eol)
 
     def _tryexcept(self, node, current_klass):
-        buf = self.ind() + 'try {' + self.eol
+        self.emit(self.ind() + 'try {' + self.eol)
         self.depth += 1
-        buf += self._stmt( node.body, current_klass )
+        self._stmts( node.body, current_klass )
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        
+        self.emit(self.ind() + "}" + self.eol)
+
         for e in node.handlers:
-            buf += self.ind() + "catch("
-            if hasattr(e[0], 'name') and e[0].name:
-                buf += e[0].name
+            buf = self.ind() + "catch("
+            if isinstance(e.type, ast.Name):
+                buf += e.type.id
             else:
                 buf += 'Exception'
             buf += " $e) {" + self.eol
+            self.emit(buf)
             self.depth += 1
-            buf += self.ind() + self._stmt(e[2], current_klass)
+            self.emit(self.ind())
+            self._stmts(e.body, current_klass)
             self.depth -= 1
-            buf += self.ind() + "}" + self.eol
-            
-        if node.else_:
-            buf += "//" + self.ind() + "py2php: else block not supported in PHP." + self.eol
-            buf += "//" + self.ind() + "else {" + self.eol
+            self.emit(self.ind() + "}" + self.eol)
+
+        if node.orelse:
+            self.emit("//" + self.ind() + "py2php: else block not supported in PHP." + self.eol)
+            self.emit("//" + self.ind() + "else {" + self.eol)
             self.depth += 1
-            buf += "//" + self._stmt( node.else_, current_klass )
+            self.emit("//")
+            self._stmts( node.orelse, current_klass )
             self.depth -= 1
-            buf += "//" + self.ind() + "}" + self.eol
-            
-        return buf
-        
+            self.emit("//" + self.ind() + "}" + self.eol)
+
 
     def _tryfinally(self, node, current_klass):
-        
-        buf = u''
-        if( isinstance( node.body, ast.TryExcept ) ):
-            buf += self._tryexcept( node.body, current_klass )
-        elif( isinstance( node.body, ast.Stmt ) ):
-            buf += self.ind() + "try {" + self.eol
+
+        if node.handlers:
+            self._tryexcept( node, current_klass )
+        else:
+            self.emit(self.ind() + "try {" + self.eol)
             self.depth += 1
-            buf += self._stmt( node.body, current_klass )
+            self._stmts( node.body, current_klass )
             self.depth -= 1
-            buf += self.ind() + "}" + self.eol
-        else:
-            raise TranslationError("unexpected type (in _tryfinally)", node.body)
-        
-        buf += self.ind() + "finally {" + self.eol
+            self.emit(self.ind() + "}" + self.eol)
+
+        self.emit(self.ind() + "finally {" + self.eol)
         self.depth += 1
-        buf += self._stmt( node.final, current_klass )
+        self._stmts( node.finalbody, current_klass )
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        return buf
-    
+        self.emit(self.ind() + "}" + self.eol)
+
+    def _try(self, node, current_klass):
+        if node.finalbody:
+            self._tryfinally(node, current_klass)
+        else:
+            self._tryexcept(node, current_klass)
+
     def _augassign(self, node, current_klass):
-        v = node.node
-        if isinstance(v, ast.Getattr):
+        v = node.target
+        if isinstance(v, ast.Attribute):
             lhs = self._getattr(v)
+        elif isinstance(v, ast.Name):
+            lhs = self._name(v)
         else:
-            lhs = self.expr(node.node, current_klass)
-        #op = '.='
-        #if isinstance(node.expr, ast.Name):
-        #    op = node.op
-        op = node.op
-        if self.use_dot( node.expr ):
-            op = ".="
-        rhs = self.expr(node.expr, current_klass)
-        return self.ind() + lhs + " " + op + " " + rhs + ";" + self.eol
+            lhs = self.expr(v, current_klass)
+        op = BINARY_OPERATORS[node.op.__class__] + "="
+        rhs = self.expr(node.value, current_klass)
+        if isinstance(node.op, ast.FloorDiv):
+            # php has no //=, // starts a comment
+            op, rhs = "=", "floor(" + lhs + " / " + rhs + ")"
+        elif isinstance(node.op, ast.Add):
+            kind = self._add_kind(v, node.value)
+            if kind == "str":
+                op = ".="
+            elif kind == "list":
+                op, rhs = "=", "array_merge(" + lhs + ", " + rhs + ")"
+            elif kind is None and self._pure(v):
+                op, rhs = "=", "pyjslib_add(" + lhs + ", " + rhs + ")"
+        self.emit(self.ind() + lhs + " " + op + " " + rhs + ";" + self.eol)
+
 
-    
     def _assign(self, node, current_klass, top_level = False):
-        buf = u''
-        if len(node.nodes) != 1:
+        if isinstance(node, ast.AnnAssign):
+            if node.value is None:
+                # a bare annotation declares nothing php needs to know about
+                return
+            targets = [node.target]
+        else:
+            targets = node.targets
+        if len(targets) != 1:
             tempvar = '__temp'+str(node.lineno)
-            tnode = ast.Assign([ast.AssName(tempvar, "OP_ASSIGN", node.lineno)], node.expr, node.lineno)
-            buf += self._assign(tnode, current_klass, top_level)
-            for v in node.nodes:
-               tnode2 = ast.Assign([v], ast.Name(tempvar, node.lineno), node.lineno)
-               buf += self._assign(tnode2, current_klass, top_level)
-            return buf
-
-        v = node.nodes[0]
-        if isinstance(v, ast.AssAttr):
-            attr_name = v.attrname
-            if isinstance(v.expr, ast.Name):
-                obj = v.expr.name
-                lhs = self.ind() + self._name(v.expr) + "->" + attr_name
-                #print "LHS: " + lhs
-
-            elif isinstance(v.expr, ast.Getattr):
+            tnode = ast.Assign([ast.Name(tempvar, ast.Store())], node.value, lineno=node.lineno)
+            self._assign(tnode, current_klass, top_level)
+            for v in targets:
+               tnode2 = ast.Assign([v], ast.Name(tempvar, ast.Load()), lineno=node.lineno)
+               self._assign(tnode2, current_klass, top_level)
+            return
+
+        v = targets[0]
+        if isinstance(v, ast.Attribute):
+            attr_name = v.attr
+            if isinstance(v.value, ast.Name):
+                lhs = self.ind() + self._name(v.value) + "->" + attr_name
+
+            elif isinstance(v.value, ast.Attribute):
                 lhs = self.ind() + self._getattr(v)
-            elif isinstance(v.expr, ast.Subscript):
-                lhs = self.ind() + self._subscript(v.expr, current_klass) + "->" + attr_name
-            elif isinstance(v.expr, ast.CallFunc):
-                lhs = self.ind() + self._callfunc(v.expr, current_klass)
-            else:
-                raise TranslationError("unsupported type (in _assign)", v.expr)
-            if v.flags == "OP_ASSIGN":
-                op = "="
+            elif isinstance(v.value, ast.Subscript):
+                lhs = self.ind() + self._subscript(v.value, current_klass) + "->" + attr_name
+            elif isinstance(v.value, ast.Call):
+                lhs = self.ind() + self._callfunc(v.value, current_klass)
             else:
-                raise TranslationError("unsupported flag (in _assign)", v)
+                raise TranslationError("unsupported type (in _assign)", v.value)
+            op = "="
 
-        elif isinstance(v, ast.AssTuple):
+        elif isinstance(v, ast.Tuple):
             lhs = self.ind() + self._asstuple(v, current_klass)
             op = "="
 
-        elif isinstance(v, ast.AssList):
+        elif isinstance(v, ast.List):
             lhs = self.ind() + self._asslist(v, current_klass)
             op = "="
-    
-        elif isinstance(v, ast.AssName):
+
+        elif isinstance(v, ast.Name):
             if top_level:
                 if current_klass:
-                    lhs = self.ind() + "public $" + v.name
+                    lhs = self.ind() + "public $" + v.id
                 else:
-                    self.top_level_vars.add(v.name)
+                    self.context.top_level_vars.add(v.id)
                     lhs = self.ind() + self._name(v)
             else:
-                if v.name in self.method_imported_globals:
-                    lhs = self.ind() + self._name(v)
+                lhs = self.ind() + self._name(v)
+            op = "="
+            var = self._name(v)
+            if isinstance(node.value, ast.ListComp) and not (top_level and current_klass) \
+                    and var.startswith("$") and self._inline_listcomp(node.value):
+                if self._inline_listcomp(node.value, var):
+                    self._listcomp_stmt(var, node.value, current_klass)
                 else:
-                    lhs = self.ind() + self._name(v)
-            if v.flags == "OP_ASSIGN":
-                op = "="
-            else:
-                raise TranslationError("unsupported flag (in _assign)", v)
-        elif isinstance(v, ast.Subscript):
-            if v.flags == "OP_ASSIGN":
-                obj = self.expr(v.expr, current_klass)
-                idx = self.expr(v.subs[0], current_klass)
-                value = self.expr(node.expr, current_klass)
-                if len(v.subs) == 1:
-                    buf += self.ind() +  obj + "[" + idx + "] = " + value + ";" + self.eol
+                    # the list is built aside when the comprehension reads
+                    # the variable it is assigned to
+                    temp = self._temp("listcomp")
+                    self._listcomp_stmt(temp, node.value, current_klass)
+                    self.emit(lhs + " = " + temp + ";" + self.eol)
+                return
+            reduction = self._reduction_call(node.value)
+            if reduction and not (top_level and current_klass) and var.startswith("$") \
+                    and self._inline_listcomp(reduction[1]):
+                if self._inline_listcomp(reduction[1], var):
+                    self._reduction_stmt(var, node.value, current_klass)
                 else:
-                    buf += self.ind() +  obj + "[/* py2php : PHP does not support non-scalar array keys */] = " + value + ";" + self.eol
-                return buf
-            else:
-                raise TranslationError("unsupported flag (in _assign)", v)
-        elif isinstance(v, ast.Slice):
-            expr = self.expr(v.expr, current_klass)
-            lower = "0" if v.lower == None else self.expr(v.lower, current_klass)
-            upper = "count(" + expr + ")" if v.upper == None else self.expr(v.upper, current_klass)
+                    temp = self._temp(reduction[0])
+                    self._reduction_stmt(temp, node.value, current_klass)
+                    self.emit(lhs + " = " + temp + ";" + self.eol)
+                return
+        elif isinstance(v, ast.Subscript) and isinstance(v.slice, ast.Slice) and v.slice.step is None:
+            expr = self.expr(v.value, current_klass)
+            lower = "0" if v.slice.lower == None else self.expr(v.slice.lower, current_klass)
+            upper = "count(" + expr + ")" if v.slice.upper == None else self.expr(v.slice.upper, current_klass)
             upper = upper if lower == "0" else upper + "-" + lower
-            rhs = self.expr(node.expr, current_klass)
-            buf = self.ind() + "array_splice(" + expr + ", " + lower + ", " + upper + ", " + rhs + ");" + self.eol
-            return buf
+            rhs = self.expr(node.value, current_klass)
+            self.emit(self.ind() + "array_splice(" + expr + ", " + lower + ", " + upper + ", " + rhs + ");" + self.eol)
+            return
+        elif isinstance(v, ast.Subscript):
+            obj = self.expr(v.value, current_klass)
+            value = self.expr(node.value, current_klass)
+            if not isinstance(v.slice, ast.Tuple):
+                idx = self.expr(v.slice, current_klass)
+                self.emit(self.ind() +  obj + "[" + idx + "] = " + value + ";" + self.eol)
+            else:
+                self.emit(self.ind() +  obj + "[/* py2php : PHP does not support non-scalar array keys */] = " + value + ";" + self.eol)
+            return
         else:
             raise TranslationError("unsupported type (in _assign)", v)
-    
 
-        rhs = self.expr(node.expr, current_klass)
-        buf += lhs + " " + op + " " + rhs + ";" + self.eol
-        return buf
-    
+
+        rhs = self.expr(node.value, current_klass)
+        self.emit(lhs + " " + op + " " + rhs + ";" + self.eol)
+
     def _self(self, str):
         if str == 'self':
             return 'this'
         return str
-    
+
+    def _delete(self, node, current_klass):
+        for target in node.targets:
+            if isinstance(target, ast.Subscript):
+                self.emit(self._subscript_stmt(target, current_klass))
+            else:
+                self.emit(self.ind() + self.expr(target, current_klass) + ";" + self.eol)
+
     def _discard(self, node, current_klass):
-        buf = u''
-        if isinstance(node.expr, ast.CallFunc):
-            if isinstance(node.expr.node, ast.Name) and node.expr.node.name == NATIVE_JS_FUNC_NAME:
-                if len(node.expr.args) != 1:
-                    raise TranslationError("native php function %s must have one arg" % NATIVE_JS_FUNC_NAME, node.expr)
-                if not isinstance(node.expr.args[0], ast.Const):
-                    raise TranslationError("native php function %s must have constant arg" % NATIVE_JS_FUNC_NAME, node.expr)
-                buf += self.ind() + node.expr.args[0].value + self.eol
+        if isinstance(node.value, ast.Call):
+            func = node.value.func
+            if isinstance(func, ast.Name) and func.id == NATIVE_JS_FUNC_NAME:
+                if len(node.value.args) != 1:
+                    raise TranslationError("native php function %s must have one arg" % NATIVE_JS_FUNC_NAME, node.value)
+                if not is_const(node.value.args[0]):
+                    raise TranslationError("native php function %s must have constant arg" % NATIVE_JS_FUNC_NAME, node.value)
+                self.emit(self.ind() + node.value.args[0].value + self.eol)
+            elif isinstance(func, ast.Name) and func.id == "print":
+                end = [kw.value for kw in node.value.keywords if kw.arg == "end"]
+                nl = not end or (isinstance(end[0], ast.Constant) and end[0].value in ("\n", None))
+                self._print(node.value, current_klass, nl)
+            elif isinstance(func, ast.Name) and func.id == "exec" and node.value.args:
+                self._exec(node.value, current_klass)
             else:
-                expr = self._callfunc(node.expr, current_klass)
-                buf += self.ind() + expr + ";" + self.eol
-        elif isinstance(node.expr, ast.Const):
-            if node.expr.value is not None: # Empty statements generate ignore None
-                buf += self.ind() + self._const(node.expr, discard=True) + self.eol
-        elif isinstance(node.expr, ast.Yield):
-            buf += self._yield( node.expr, current_klass )
-        elif isinstance(node.expr, ast.Name) and node.expr.name == 'XXX':
-            buf += self.ind() + "// XXX" + self.eol
+                expr = self._callfunc(node.value, current_klass)
+                self.emit(self.ind() + expr + ";" + self.eol)
+        elif is_const(node.value):
+            self.emit(self.ind() + self._const(node.value, discard=True) + self.eol)
+        elif isinstance(node.value, ast.Constant) and node.value.value is Ellipsis:
+            pass
+        elif isinstance(node.value, ast.Yield):
+            self.emit(self._yield( node.value, current_klass ))
+        elif isinstance(node.value, ast.Name) and node.value.id == 'XXX':
+            self.emit(self.ind() + "// XXX" + self.eol)
         else:
-            buf += self.ind() + self.expr(node.expr, current_klass) + ";" + self.eol
-            # raise TranslationError("unsupported type (in _discard)", node.expr)
-        return buf
-    
+            self.emit(self.ind() + self.expr(node.value, current_klass) + ";" + self.eol)
+            # raise TranslationError("unsupported type (in _discard)", node.value)
+
     def _if(self, node, current_klass):
-        buf = u''
-        for i in range(len(node.tests)):
-            test, consequence = node.tests[i]
-            if i == 0:
-                keyword = "if"
-            else:
+        keyword = "if"
+        while True:
+            self._if_test(keyword, node.test, node.body, current_klass)
+            # an elif is an if statement alone in the else branch, at the
+            # same indentation as the if it belongs to.
+            if (len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If)
+                    and node.orelse[0].col_offset == node.col_offset):
+                node = node.orelse[0]
                 keyword = "else if"
+            else:
+                break
 
-            buf += self._if_test(keyword, test, consequence, current_klass)
-            
-        if node.else_:
+        if node.orelse:
             keyword = "else"
             test = None
-            consequence = node.else_
+            consequence = node.orelse
+
+            self._if_test(keyword, test, consequence, current_klass)
 
-            buf += self._if_test(keyword, test, consequence, current_klass)
-        return buf            
-        
     def _if_test(self, keyword, test, consequence, current_klass):
-        buf = u''
-    
         if test:
             expr = self.expr(test, current_klass)
-    
-            buf += self.ind() + keyword + " (" + expr + ") {" + self.eol
+
+            self.emit(self.ind() + keyword + " (" + expr + ") {" + self.eol)
         else:
-            buf += self.ind() + keyword + " {" + self.eol
+            self.emit(self.ind() + keyword + " {" + self.eol)
         self.depth += 1
 
-        if isinstance(consequence, ast.Stmt):
-            for child in consequence.nodes:
-                buf += self._stmt(child, current_klass)
-        else:
-            raise TranslationError("unsupported type (in _if_test)", consequence)
+        for child in consequence:
+            self._stmt(child, current_klass)
 
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        return buf
+        self.emit(self.ind() + "}" + self.eol)
 
     def _ifexp(self, node, current_klass):
         buf = self.expr( node.test, current_klass ) + " ? "
-        buf += self.expr( node.then, current_klass ) + " : "
-        buf += self.expr( node.else_, current_klass )
+        buf += self.expr( node.body, current_klass ) + " : "
+        buf += self.expr( node.orelse, current_klass )
         return buf
 
+    def _namedexpr(self, node, current_klass):
+        return "(" + self._name(node.target) + " = " + self.expr(node.value, current_klass) + ")"
+
     def _yield( self, node, current_klass):
-        buf = self.ind() + "yield(" + self.expr(node.value, current_klass) + ");" + self.eol
+        value = "null"
+        if node.value is not None:
+            value = self.expr(node.value, current_klass)
+        buf = self.ind() + "yield(" + value + ");" + self.eol
         return buf
-    
+
     def _import_name(self, python_name):
         return python_name.replace('.', '_')
 
     def _import( self, node):
-        importName = self._import_name(node.names[0][0])
+        importName = self._import_name(node.names[0].name)
         return self.ind() + "require_once( '" + importName + ".php');" + self.eol
 
     def _from(self, node):
-        buf = u''
+        buf = ''
+        modname = node.module or ""
         for name in node.names:
-            if node.modname == 'pyjamas':
-                self.imported_modules.add(name[0])
-            elif node.modname[:8] == 'pyjamas.':
-                buf += "require_once( '" + node.modname[8:] + ".php');" 
-                self.imported_classes[name[0]] = node.modname[8:]
+            if modname == 'pyjamas':
+                self.context.imported_modules.add(name.name)
+            elif modname[:8] == 'pyjamas.':
+                buf += "require_once( '" + self._import_name(modname[8:]) + ".php');"
+                self.context.imported_classes[name.name] = modname[8:]
             else:
-                buf += "require_once( '" + node.modname + ".php');" 
-                self.imported_classes[name[0]] = node.modname
+                buf += "require_once( '" + self._import_name(modname) + ".php');"
+                self.context.imported_classes[name.name] = modname
         return buf
 
 
     def _compare(self, node, current_klass):
-        lhs = self.expr(node.expr, current_klass)
+        lhs = self.expr(node.left, current_klass)
         buf = "(" + lhs
-        
+
         rhs_last = None
-        
-        for nodeop in node.ops:
-            op = nodeop[0]
-            rhs_node = nodeop[1]
+
+        for nodeop, rhs_node in zip(node.ops, node.comparators):
+            op = COMPARE_OPERATORS[nodeop.__class__]
             rhs = self.expr(rhs_node, current_klass)
 
             if op == "in":
-                return "in_array(" + lhs + ", " + rhs + ")"
+                return self._membership(node.left, lhs, rhs_node, rhs, current_klass)
             elif op == "not in":
-                return "!in_array(" + lhs + ", " + rhs + ")"
+                return "!" + self._membership(node.left, lhs, rhs_node, rhs, current_klass)
             elif op == "is":
                 op = "=="
             elif op == "is not":
                 op = "!="
-                
+
             if rhs_last != None:
                 buf += " && (" + rhs_last
             buf += " " + op + " " + rhs + ")"
@@ -1234,26 +2015,92 @@ class Translator:
         return buf
 
 
+    def _membership(self, lhs_node, lhs, rhs_node, rhs, current_klass):
+        """
+        Return the code testing whether lhs is in rhs, picked by what the
+        right operand is known to be: a key lookup in a dict, a substring
+        search in a string, a bounds check of a range() and a search through
+        the values of a list or tuple.  Anything else goes through
+        pyjslib_in(), which searches strings and the values of arrays, i.e.
+        a dict of unknown type by its values.
+        """
+        if isinstance(rhs_node, ast.Call):
+            func = rhs_node.func
+            if isinstance(func, ast.Attribute) and func.attr == "keys" and not rhs_node.args \
+                    and not rhs_node.keywords:
+                return "array_key_exists(" + lhs + ", " + self.expr(func.value, current_klass) + ")"
+            if isinstance(func, ast.Name) and not self._shadowed(func.id) \
+                    and not [arg for arg in rhs_node.args if isinstance(arg, ast.Starred)]:
+                if func.id in ("range", "xrange") and not rhs_node.keywords and self._pure(lhs_node):
+                    bounds = self._range_bounds(lhs_node, lhs, rhs_node.args, current_klass)
+                    if bounds is not None:
+                        return bounds
+        kind = self._type(rhs_node)
+        if kind == "dict":
+            return "array_key_exists(" + lhs + ", " + rhs + ")"
+        if kind == "str":
+            return "(strpos(" + rhs + ", " + lhs + ") !== false)"
+        if kind == "list":
+            return "in_array(" + lhs + ", " + rhs + ")"
+        return "pyjslib_in(" + lhs + ", " + rhs + ")"
+
+    def _range_bounds(self, value_node, value, args, current_klass):
+        """
+        Return the code testing whether value is one of the ints of
+        range(*args), or None if the step of the range is not a constant
+        or a bound may have side effects: the test reads the start twice
+        and may skip the stop.  A value not known to be an int goes through
+        pyjslib_in_range(), as python finds True and 1.0 in a range too.
+        """
+        step = 1
+        if len(args) == 3:
+            step = self._int_const(args[2])
+        if not step or not 1 <= len(args) <= 3:
+            return None
+        if len(args) == 1:
+            bounds = [ast.Constant(0), args[0]]
+        else:
+            bounds = args[:2]
+        for bound in bounds:
+            if self._int_const(bound) is None and not isinstance(bound, ast.Name) and not (
+                    isinstance(bound, ast.Call) and isinstance(bound.func, ast.Name) and bound.func.id == "len"
+                    and len(bound.args) == 1 and not bound.keywords and not self._shadowed("len")
+                    and self._pure(bound.args[0])):
+                return None
+        start, stop = [self.expr(bound, current_klass) for bound in bounds]
+        if self._type(value_node) != "int":
+            # php compares numeric strings with ints and bools as bools
+            args = [value, start, stop] + ([str(step)] if step != 1 else [])
+            return "pyjslib_in_range(" + ", ".join(args) + ")"
+        if step > 0:
+            test = "%s >= %s && %s < %s" % (value, start, value, stop)
+        else:
+            test = "%s <= %s && %s > %s" % (value, start, value, stop)
+        if abs(step) != 1:
+            test += " && (%s - %s) %% %d == 0" % (value, start, step)
+        return "(" + test + ")"
+
     def _not(self, node, current_klass):
-        expr = self.expr(node.expr, current_klass)
+        expr = self.expr(node.operand, current_klass)
 
         return "!(" + expr + ")"
 
     def _or(self, node, current_klass):
-        expr = " || ".join([self.expr(child, current_klass) for child in node.nodes])
+        expr = " || ".join([self.expr(child, current_klass) for child in node.values])
         return expr
 
     def _and(self, node, current_klass):
-        expr = " && ".join([self.expr(child, current_klass) for child in node.nodes])
+        expr = " && ".join([self.expr(child, current_klass) for child in node.values])
         return expr
 
     def _for(self, node, current_klass):
+        if self._range_for(node, current_klass):
+            return
         assign_name = ""
         assign_tuple = ""
-        buf = u''
         dollar = "$"
 
-        list_expr = self.expr(node.list, current_klass)
+        list_expr = self.expr(node.iter, current_klass)
 
         # python calls iteritems() (2.x) or iter() (3.x)
         # for iteration over dictionaries, but php doesn't need that.
@@ -1265,17 +2112,17 @@ class Translator:
                 list_expr = list_expr.replace(needle, "")
 
         # based on Bob Ippolito's Iteration in Javascript code
-        if isinstance(node.assign, ast.AssName):
-            assign_name = node.assign.name
-        elif isinstance(node.assign, ast.AssTuple):
+        if isinstance(node.target, ast.Name):
+            assign_name = node.target.id
+        elif isinstance(node.target, (ast.Tuple, ast.List)):
             if is_dict:
-                assign_name = self._asstuple_foreachdict(node.assign, current_klass)
+                assign_name = self._asstuple_foreachdict(node.target, current_klass)
             else:
-                assign_name = self._asstuple(node.assign, current_klass)
+                assign_name = self._asstuple(node.target, current_klass)
             dollar = ''
         else:
-            raise TranslationError("unsupported type (in _for)", node.assign)
-        
+            raise TranslationError("unsupported type (in _for)", node.target)
+
         lhs = "var " + assign_name
         iterator_name = "__" + assign_name
         if "enumerate" in list_expr:
@@ -1287,86 +2134,333 @@ class Translator:
             assign_names = assign_names.split(", ")
             assign_name = [list_expr1]
             assign_name.extend(assign_names)
-            buf += self.ind() + "foreach( pyjslib_list(%s) as %s => %s) {\n" % tuple(assign_name)
+            self.emit(self.ind() + "foreach( pyjslib_iter(%s) as %s => %s) {\n" % tuple(assign_name))
         else:
-            buf += self.ind() + "foreach( pyjslib_list(%(list_expr)s) as %(dollar)s%(assign_name)s ) {\n" % locals()
+            list_expr = self._iterable(node.iter, list_expr)
+            self.emit(self.ind() + "foreach( %(list_expr)s as %(dollar)s%(assign_name)s ) {\n" % locals())
         self.depth += 1
-        for node in node.body.nodes:
-            buf += self._stmt(node, current_klass)
+        for child in node.body:
+            self._stmt(child, current_klass)
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        return buf
+        self.emit(self.ind() + "}" + self.eol)
+
+
+    def _iterable(self, node, code):
+        """
+        Return the code to iterate over the value of node, translated to
+        code, in a foreach.  Lists and generators are iterated as they are,
+        dicts over their keys and strings over their chars.  Anything whose
+        type is not known goes through pyjslib_iter(), which only wraps
+        strings.
+        """
+        if isinstance(node, ast.GeneratorExp):
+            return code
+        kind = self._type(node)
+        if kind == "list":
+            return code
+        if kind == "dict":
+            return "array_keys(%s)" % code
+        if kind == "str":
+            return "pyjslib_iter_str(%s)" % code
+        return "pyjslib_iter(%s)" % code
+
+    def _range_for(self, node, current_klass):
+        """
+        Emit a loop over range() or xrange() as a counted php for loop
+        instead of iterating over the array pyjslib_range() builds.  Returns
+        False if the loop is not one of those, if its step is not a constant
+        or if the loop variable is assigned in the body or read where the
+        value it is left with after the loop would differ.
+        """
+        call = node.iter
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name)
+                and call.func.id in ("range", "xrange") and 1 <= len(call.args) <= 3
+                and not call.keywords and isinstance(node.target, ast.Name)):
+            return False
+        if call.func.id in self.context.top_level_functions or call.func.id in self.context.top_level_vars:
+            return False
+        if any(isinstance(arg, ast.Starred) for arg in call.args):
+            return False
+        step = 1
+        if len(call.args) == 3:
+            step = self._int_const(call.args[2])
+            if not step:
+                return False
+        name = node.target.id
+        # the bounds are evaluated before the loop variable is set
+        if any(isinstance(child, ast.Name) and child.id == name for child in ast.walk(call)):
+            return False
+        index = self._scope_index()
+        if not index.counted_loop_var(name, node):
+            return False
+
+        var = "$" + name
+        if len(call.args) == 1:
+            start, stop = "0", call.args[0]
+        else:
+            start, stop = self.expr(call.args[0], current_klass), call.args[1]
+        init = "%s = %s" % (var, start)
+        if self._int_const(stop) is not None or (isinstance(stop, ast.Name)
+                                                 and not index.stored_in(stop.id, node)):
+            end = self.expr(stop, current_klass)
+        else:
+            # range() evaluates its arguments once, so the bound is hoisted
+            # out of the loop condition.
+            end = "$__%s_end" % name
+            init += ", %s = %s" % (end, self.expr(stop, current_klass))
+        if step > 0:
+            cond = "%s < %s" % (var, end)
+            incr = var + "++" if step == 1 else "%s += %d" % (var, step)
+        else:
+            cond = "%s > %s" % (var, end)
+            incr = var + "--" if step == -1 else "%s -= %d" % (var, -step)
+        self.emit(self.ind() + "for (%s; %s; %s) {" % (init, cond, incr) + self.eol)
+        self.depth += 1
+        for child in node.body:
+            self._stmt(child, current_klass)
+        self.depth -= 1
+        self.emit(self.ind() + "}" + self.eol)
+        return True
 
+    def _int_const(self, node):
+        """
+        Return the value of an int literal, possibly negated, or None.
+        """
+        negate = False
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            negate = isinstance(node.op, ast.USub)
+            node = node.operand
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return -node.value if negate else node.value
+        return None
+
+    def _scope_index(self):
+        index = self.scope_indexes.get(self.scope)
+        if index is None:
+            index = self.scope_indexes[self.scope] = ScopeIndex(self.scope)
+        return index
 
     def _while(self, node, current_klass):
-        buf = u''
         test = self.expr(node.test, current_klass)
-        buf += self.ind() + "while (" + test + ") {" + self.eol
+        self.emit(self.ind() + "while (" + test + ") {" + self.eol)
         self.depth += 1
-        if isinstance(node.body, ast.Stmt):
-            for child in node.body.nodes:
-                buf += self._stmt(child, current_klass)
-        else:
-            raise TranslationError("unsupported type (in _while)", node.body)
+        for child in node.body:
+            self._stmt(child, current_klass)
         self.depth -= 1
-        buf += self.ind() + "}" + self.eol
-        return buf
+        self.emit(self.ind() + "}" + self.eol)
 
 
     def _const(self, node, discard=False):
-        if isinstance(node.value, int):
-            return unicode(node.value)
-        elif isinstance(node.value, float):
-            return unicode(node.value)
-        elif isinstance(node.value, str):
-#            return "\"" + node.value.encode('string_escape') + "\""
+        value = node.value
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        elif isinstance(value, int):
+            return str(value)
+        elif isinstance(value, float):
+            return str(value)
+        elif isinstance(value, (str, bytes)):
+            if isinstance(value, bytes):
+                value = value.decode("latin-1")
             try:
-                val = node.value.decode("unicode-escape", 'backslashreplace')
-            except:
+                # escapes in the literal are kept in the php string
+                val = value.encode("latin-1", "backslashreplace").decode("unicode-escape")
+            except UnicodeDecodeError:
                 val = '?'
-            
+
             buf = val.replace( "'", "\\'" )
             buf = buf.replace( "\r", "\\r" )
             if discard:
                 return "/*" + buf + "*/"
             else:
                 return "'" + buf + "'"
-        elif node.value is None:
+        elif value is None:
             return "null"
         else:
-            return unicode(node.value)
-            raise TranslationError("unsupported type (in _const)", node)
+            return str(value)
 
     def _unarysub(self, node, current_klass):
-        return "-" + self.expr(node.expr, current_klass)
+        return "-" + self.expr(node.operand, current_klass)
 
     def _unaryadd(self, node, current_klass):
-        return "+" + self.expr(node.expr, current_klass)
+        return "+" + self.expr(node.operand, current_klass)
 
     def _add(self, node, current_klass):
-        op = " + "
-        paren_left = "("
-        paren_right = ")"
-        if self.use_dot(node.left) or self.use_dot(node.right):
-            op = " . "
-            paren_left = ""
-            paren_right = ""
-        return paren_left + self.expr(node.left, current_klass) + op + self.expr(node.right, current_klass) + paren_right
-        
-    def use_dot(self, node):
-        if isinstance(node, ast.Const):
-            if isinstance(node.value, str):
-                return True
-            
-        # return True if variable name contains 'str'
-        elif isinstance(node, ast.Name):
-            if( node.name.lower().find('str') != -1 or node.name.lower().find('buf') != -1 ):
-                return True
-            
-        elif isinstance( node, ast.Add):
-            if self.use_dot(node.left) or self.use_dot(node.right):
-                return True
-        return False
+        left = self.expr(node.left, current_klass)
+        right = self.expr(node.right, current_klass)
+        kind = self._add_kind(node.left, node.right)
+        if kind == "str":
+            return left + " . " + right
+        if kind == "list":
+            return "array_merge(" + left + ", " + right + ")"
+        if kind is None:
+            return "pyjslib_add(" + left + ", " + right + ")"
+        return "(" + left + " + " + right + ")"
+
+    def _add_kind(self, left, right):
+        """
+        Return what python's + does with left and right: "str" joins
+        strings, "list" joins lists and "int" adds numbers, when either of
+        them is known to be a number.  None if neither type tells.
+        """
+        types = (self._type(left), self._type(right))
+        if "str" in types:
+            return "str"
+        if "list" in types:
+            return "list"
+        if types[0] in NUMERIC_TYPES or types[1] in NUMERIC_TYPES:
+            return "int"
+        return None
+
+    def _type(self, node):
+        """
+        Return the type the value of node is known to have: "str", "int",
+        "float", "bool", "list" (tuples too), "dict", "none" or the ClassDef
+        of a top-level class for its instances, or None if it can't be told.
+        A name has the type all its bindings in the function agree on,
+        wherever they are.
+        """
+        index = self._type_index()
+        kind = index.nodes.get(node, PENDING)
+        if kind == PENDING:
+            kind = self._node_type(node)
+            if not index.pending:
+                # while a name is resolved, types may depend on it
+                index.nodes[node] = kind
+        return kind
+
+    def _node_type(self, node):
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if isinstance(value, (str, bytes)):
+                return "str"
+            if isinstance(value, bool):
+                return "bool"
+            if isinstance(value, (int, float)):
+                return type(value).__name__
+            if value is None:
+                return "none"
+            return None
+        if isinstance(node, ast.Name):
+            return self._name_type(node.id)
+        if isinstance(node, ast.BinOp):
+            return self._binop_type(node)
+        if isinstance(node, ast.JoinedStr):
+            return "str"
+        if isinstance(node, (ast.List, ast.Tuple, ast.ListComp)):
+            return "list"
+        if isinstance(node, ast.Dict):
+            return "dict"
+        if isinstance(node, ast.Compare) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+            return "bool"
+        if isinstance(node, ast.UnaryOp):
+            kind = self._type(node.operand)
+            if kind == "bool":
+                return "int"
+            return kind if kind in NUMERIC_TYPES or kind == PENDING else None
+        if isinstance(node, ast.IfExp):
+            kind = self._type(node.body)
+            return kind if kind == self._type(node.orelse) else None
+        if isinstance(node, ast.Subscript):
+            kind = self._type(node.value)
+            if kind == "str" or (kind == "list" and isinstance(node.slice, ast.Slice)):
+                return kind
+            return None
+        if isinstance(node, ast.Call) and not [arg for arg in node.args if isinstance(arg, ast.Starred)]:
+            func = node.func
+            if isinstance(func, ast.Name) and func.id in BUILTIN_TYPES and not self._shadowed(func.id) \
+                    and func.id not in self._type_index().bindings:
+                return BUILTIN_TYPES[func.id]
+            if isinstance(func, ast.Name) and func.id in self.context.top_level_classes:
+                klass = self.context.definitions[func.id]
+                # the class itself is a binding of the module
+                if all(binding is klass for binding in self._type_index().bindings.get(func.id, ())):
+                    return klass
+            if isinstance(func, ast.Name) and func.id == "abs" and len(node.args) == 1 and not self._shadowed("abs"):
+                kind = self._type(node.args[0])
+                return kind if kind in ("int", "float") else None
+            if isinstance(func, ast.Attribute) and func.attr in STRING_METHOD_TYPES \
+                    and self._type(func.value) == "str":
+                return STRING_METHOD_TYPES[func.attr]
+        return None
+
+    def _name_type(self, name):
+        index = self._type_index()
+        if name in index.types:
+            return index.types[name]
+        if name in index.pending:
+            # a binding using the name itself, like i = i + 1, tells
+            # nothing about it
+            return PENDING
+        bindings = index.bindings.get(name)
+        if not bindings:
+            return None
+        index.pending.add(name)
+        types = set()
+        for binding in bindings:
+            if binding is None:
+                kind = None
+            elif isinstance(binding, str):
+                kind = binding
+            elif isinstance(binding, (ast.For, ast.comprehension)):
+                kind = self._element_type(binding.iter)
+            else:
+                kind = self._type(binding)
+            if kind != PENDING:
+                types.add(kind)
+        index.pending.discard(name)
+        index.types[name] = kind = merge_types(types)
+        return kind
+
+    def _element_type(self, node):
+        """
+        Return the type of the values a for loop over node gets.
+        """
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("range", "xrange") \
+                and not self._shadowed(node.func.id):
+            return "int"
+        if self._type(node) == "str":
+            return "str"
+        return None
+
+    def _binop_type(self, node):
+        left = self._type(node.left)
+        right = self._type(node.right)
+        if PENDING in (left, right):
+            # i = i + 1 or s += t: python only adds values of one kind
+            if not isinstance(node.op, (ast.Add, ast.Sub)):
+                return None
+            if left == PENDING:
+                left = right
+            if right == PENDING:
+                right = left
+            if left in (PENDING, None) or right is None:
+                return PENDING
+        types = set([left, right])
+        if isinstance(node.op, ast.Add):
+            if "str" in types or "list" in types:
+                return "str" if "str" in types else "list"
+            if MIXED in types:
+                return MIXED
+        elif isinstance(node.op, ast.Mod):
+            if left == "str":
+                return "str"
+        elif isinstance(node.op, ast.Mult):
+            for kind in ("str", "list"):
+                if kind in types and (left in NUMERIC_TYPES or right in NUMERIC_TYPES):
+                    return kind
+        elif isinstance(node.op, ast.Div):
+            return "float" if types <= NUMERIC_TYPES else None
+        elif isinstance(node.op, ast.Pow):
+            return None
+        if types <= NUMERIC_TYPES:
+            return merge_types(types)
+        return None
+
+    def _type_index(self):
+        index = self.type_indexes.get(self.scope)
+        if index is None:
+            index = self.type_indexes[self.scope] = TypeIndex(self.scope)
+        return index
 
     def _sub(self, node, current_klass):
         return "(" + self.expr(node.left, current_klass) + " - " + self.expr(node.right, current_klass) + ")"
@@ -1381,8 +2475,8 @@ class Translator:
         return "(" + self.expr(node.left, current_klass) + " * " + self.expr(node.right, current_klass) + ")"
 
     def _mod(self, node, current_klass):
-        if isinstance(node.left, ast.Const) and isinstance(node.left.value, StringType):
-            self.imported_js.add("sprintf.js") # Include the sprintf functionality if it is used
+        if isinstance(node.left, ast.Constant) and isinstance(node.left.value, str):
+            self.context.imported_js.add("sprintf.js") # Include the sprintf functionality if it is used
             if isinstance(node.right, ast.Tuple):
                 return "sprintf("+self.expr(node.left, current_klass) + ", " + self._tuple(node.right, current_klass, brackets=False)+")"
             else:
@@ -1390,16 +2484,16 @@ class Translator:
         return "(" + self.expr(node.left, current_klass) + " % " + self.expr(node.right, current_klass) + ")"
 
     def _invert(self, node, current_klass):
-        return "~" + self.expr(node.expr, current_klass)
+        return "~" + self.expr(node.operand, current_klass)
 
     def _bitand(self, node, current_klass):
-        return " & ".join([self.expr(child, current_klass) for child in node.nodes])
+        return self.expr(node.left, current_klass) + " & " + self.expr(node.right, current_klass)
 
     def _bitor(self, node, current_klass):
-        return " | ".join([self.expr(child, current_klass) for child in node.nodes])
+        return self.expr(node.left, current_klass) + " | " + self.expr(node.right, current_klass)
 
     def _bitxor(self, node, current_klass):
-        return " ^ ".join([self.expr(child, current_klass) for child in node.nodes])
+        return self.expr(node.left, current_klass) + " ^ " + self.expr(node.right, current_klass)
 
     def _power(self, node, current_klass):
         return "pow(" + self.expr(node.left, current_klass) + ", " + self.expr(node.right, current_klass) + ")"
@@ -1410,335 +2504,543 @@ class Translator:
     def _rightshift(self, node, current_klass):
         return self.expr(node.left, current_klass) + " >> " + self.expr(node.right, current_klass)
 
+    def _binop(self, node, current_klass):
+        handler = self.binop_handlers.get(node.op.__class__)
+        if handler is None:
+            raise TranslationError("unsupported operator (in _binop)", node)
+        return handler(self, node, current_klass)
+
+    def _unaryop(self, node, current_klass):
+        return self.unaryop_handlers[node.op.__class__](self, node, current_klass)
+
+    def _boolop(self, node, current_klass):
+        if isinstance(node.op, ast.And):
+            return self._and(node, current_klass)
+        return self._or(node, current_klass)
+
     def _subscript(self, node, current_klass):
-        if node.flags in ["OP_APPLY", "OP_ASSIGN"]:
-            if len(node.subs) == 1:
-                if isinstance(node.subs[0], ast.Sliceobj):
-                    return "pyjslib_array_slice(" + self.expr(node.expr, current_klass) + ", " + self.expr(node.subs[0], current_klass) + ")" 
-                else:
-                    return self.expr(node.expr, current_klass) + "[" + self.expr(node.subs[0], current_klass) + "]"
-            else:
-                return self.expr(node.expr, current_klass) + "[/* py2php : PHP does not support non-scalar array keys */]"
-                # raise TranslationError("must have one sub (in _subscript)", node)
-        elif node.flags == "OP_DELETE":
-            # assumption: OP_DELETE always implies a statement.
+        if isinstance(node.ctx, ast.Del):
+            # assumption: del always implies a statement.
             return self._subscript_stmt( node, current_klass )
+        if isinstance(node.slice, ast.Slice):
+            if node.slice.step is None:
+                return self._slice(node, current_klass)
+            return "pyjslib_array_slice(" + self.expr(node.value, current_klass) + ", " + self.expr(node.slice, current_klass) + ")"
+        elif isinstance(node.slice, ast.Tuple):
+            return self.expr(node.value, current_klass) + "[/* py2php : PHP does not support non-scalar array keys */]"
+            # raise TranslationError("must have one sub (in _subscript)", node)
         else:
-            raise TranslationError("unsupported flag (in _subscript)", node)
+            return self.expr(node.value, current_klass) + "[" + self.expr(node.slice, current_klass) + "]"
 
     def _subscript_stmt(self, node, current_klass):
-        buf = u''
-        if node.flags == "OP_DELETE":
-            buf += self.ind() + "unset(" + self.expr(node.expr, current_klass) + "[" + self.expr(node.subs[0], current_klass) + "]);" + self.eol
+        buf = ''
+        if isinstance(node.slice, ast.Slice):
+            buf += self.ind() + self._slice(node, current_klass) + ";" + self.eol
         else:
-            raise TranslationError("unsupported flag (in _subscript)", node)
+            buf += self.ind() + "unset(" + self.expr(node.value, current_klass) + "[" + self.expr(node.slice, current_klass) + "]);" + self.eol
         return buf
 
     def _list(self, node, current_klass):
+        if isinstance(node.ctx, ast.Store):
+            return self._asslist(node, current_klass)
         inners = []
-        for x in node.nodes:
+        for x in node.elts:
             buf = self.expr(x, current_klass)
-            if buf.startswith( ' ('):
-                print "PAREN: " + str(x)
-                print "BUF: " + buf
             inners.append( buf )
         inner = ", ".join(inners)
-            
+
         return "[" + inner + "]"
 
     def _dict(self, node, current_klass):
         items = []
-        for x in node.items:
-            key = self.expr(x[0], current_klass)
-            value = self.expr(x[1], current_klass)
+        for k, v in zip(node.keys, node.values):
+            if k is None:
+                raise TranslationError("unsupported dict unpacking (in _dict)", v)
+            key = self.expr(k, current_klass)
+            value = self.expr(v, current_klass)
             items.append(key + " => " + value)
         return "[" + ", ".join(items) + "]"
 
     def _asstuple_foreachdict(self, node, current_klass):
-        return " => ".join([self.expr(x, current_klass) for x in node.nodes])
-    
+        return " => ".join([self.expr(x, current_klass) for x in node.elts])
+
     def _asstuple(self, node, current_klass):
-        return "list(" + ", ".join([self.expr(x, current_klass) for x in node.nodes]) + ")"
+        return "list(" + ", ".join([self.expr(x, current_klass) for x in node.elts]) + ")"
 
     def _asslist(self, node, current_klass):
-        return "list(" + ", ".join([self.expr(x, current_klass) for x in node.nodes]) + ")"
-    
+        return "list(" + ", ".join([self.expr(x, current_klass) for x in node.elts]) + ")"
+
     def _assname( self, node, current_klass):
-        buf = u''
-        var = "$" + node.name
-        if node.flags == 'OP_DELETE':
+        buf = ''
+        var = "$" + node.id
+        if isinstance(node.ctx, ast.Del):
             buf = "unset(" + var + ")"
         else:
             buf = var
         return buf
-            
+
 
     def _assattr( self, node, current_klass):
-        return self.expr(node.expr, current_klass) + "->" + node.attrname
+        if isinstance(node.ctx, ast.Del):
+            return "unset(" + self.expr(node.value, current_klass) + "->" + node.attr + ")"
+        return self.expr(node.value, current_klass) + "->" + node.attr
 
     def _tuple(self, node, current_klass, brackets=True):
+        if isinstance(node.ctx, ast.Store):
+            return self._asstuple(node, current_klass)
         if brackets:
-            return u"[" + u", ".join([self.expr(x, current_klass) for x in node.nodes]) + u"]"
+            return "[" + ", ".join([self.expr(x, current_klass) for x in node.elts]) + "]"
         else:
-            return u", ".join([self.expr(x, current_klass) for x in node.nodes])
+            return ", ".join([self.expr(x, current_klass) for x in node.elts])
+
+    def _starred(self, node, current_klass):
+        return "..." + self.expr(node.value, current_klass)
 
     def _slice(self, node, current_klass):
-        if node.flags in ["OP_APPLY", "OP_DELETE"]:
-            lower = "null"
-            upper = "null"
-            upper_apply = "null"
-            if node.lower != None:
-                lower = self.expr(node.lower, current_klass)
-            if node.upper != None:
-                upper = upper_apply = self.expr(node.upper, current_klass)
-                if  node.lower != None:
-                     upper_apply = upper + " - " + lower
-                     
-            expr_apply = self.expr(node.expr, current_klass) + ", " + lower + ", " + upper_apply
-            expr_del = self.expr(node.expr, current_klass) + ", " + lower + ", " + upper
-                     
-            if node.flags == "OP_APPLY":
-                return  "array_slice(" + expr_apply + ")"
-            elif node.flags == "OP_DELETE":
-                return  "pyjslib_del_slice(" + expr_del + ")"
+        lower = "null"
+        upper = "null"
+        upper_apply = "null"
+        if node.slice.lower != None:
+            lower = self.expr(node.slice.lower, current_klass)
+        if node.slice.upper != None:
+            upper = upper_apply = self.expr(node.slice.upper, current_klass)
+            if  node.slice.lower != None:
+                 upper_apply = upper + " - " + lower
+
+        value = self.expr(node.value, current_klass)
+        expr_apply = value + ", " + lower + ", " + upper_apply
+        expr_del = value + ", " + lower + ", " + upper
+
+        if isinstance(node.ctx, ast.Del):
+            return  "pyjslib_del_slice(" + expr_del + ")"
         else:
-            raise TranslationError("unsupported flag (in _slice)", node)
+            return  "array_slice(" + expr_apply + ")"
 
     def _sliceobj(self, node, current_klass):
-        step = ast.Const(1)
-        start = node.nodes[0]
-        stop = node.nodes[1]
-        if len(node.nodes) > 2:
-            step = node.nodes[2]
-        
-        lower = self.expr(start, current_klass)
-        upper = self.expr(stop, current_klass)
-        step = self.expr(step, current_klass)
-                
-        return u'' + lower + ", " + upper + ", " + step
-        
+        lower = upper = "null"
+        step = "1"
+        if node.lower is not None:
+            lower = self.expr(node.lower, current_klass)
+        if node.upper is not None:
+            upper = self.expr(node.upper, current_klass)
+        if node.step is not None:
+            step = self.expr(node.step, current_klass)
+
+        return lower + ", " + upper + ", " + step
+
     def _lambda(self, node, current_klass):
-        buf = u''
-            
-        argnames = []
-        for argname in node.argnames:
-            if isinstance(argname, tuple):
-                for a in argname:
-                    argnames.append( "$" + a )
-            else:
-                argnames.append( "$" + argname )
-        
-        arg_names = list(argnames)
-        normal_arg_names = list(arg_names)
-        if node.kwargs: kwargname = normal_arg_names.pop()
-        if node.varargs: varargname = normal_arg_names.pop()        
-        
-        declared_arg_names = list(normal_arg_names)
-        if node.kwargs: declared_arg_names.append(kwargname)
+        buf = ''
 
         function_args = "(" + self._default_args_handler(node, None) + ")"
-        buf += "function %s {" % (function_args) 
+        buf += "function %s {" % (function_args)
 
-        buf += "return " + self.expr(node.code, None) + ";}"
+        buf += "return " + self.expr(node.body, None) + ";}"
         return buf
 
     def _global(self, node, current_klass):
         buf = self.ind() + 'global '
         names = []
         for name in node.names:
-            self.method_imported_globals.add(name)
+            self.context.method_imported_globals.add(name)
             names.append( "$" + name )
         buf += ", ".join( names ) + ";" + self.eol
-            
-        return buf
 
-    def _backquote(self, node, current_klass):
-        return "pyjslib_repr(" + self.expr(node.expr, current_klass) + ")"
+        self.emit(buf)
+
+    def _joinedstr(self, node, current_klass):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                if value.format_spec is not None:
+                    raise TranslationError("unsupported format spec (in _joinedstr)", value)
+                part = self.expr(value.value, current_klass)
+                if value.conversion == ord("r"):
+                    part = "pyjslib_repr(" + part + ")"
+                elif value.conversion == ord("s"):
+                    part = "pyjslib_str(" + part + ")"
+                parts.append(part)
+            else:
+                parts.append(self.expr(value, current_klass))
+        return " . ".join(parts) or "''"
 
     def _genexpr(self, node, current_klass):
-        buf = "pyjslib_genexpr( function($__vars) { extract($__vars); "
-        buf += self._genexprcode(node.code, current_klass)
-        buf = buf + "}, get_defined_vars() )"
+        buf = "(function()%s { " % self._closure_use(node)
+        buf += self._compfor(node.generators, node.elt, current_klass, "yield %s;")
+        buf += "})()"
         return buf
-    
-    def _genexprcode(self, node, current_klass):
-        buf = ""
-        buf += self._genexprfor(node.quals[0], node.expr, node.quals, current_klass)
+
+    def _listcomp(self, node, current_klass):
+        var = self._temp("listcomp")
+        buf = "(function()%s { %s = []; " % (self._closure_use(node), var)
+        buf += self._compfor(node.generators, node.elt, current_klass, var + "[] = %s;")
+        buf += " return %s; })()" % var
         return buf
-    
-    def _genexprfor(self, node, expr, quals, current_klass):
+
+    def _compfor(self, generators, expr, current_klass, leaf):
+        """
+        Translate the for and if clauses of a list comprehension or
+        generator expression to nested foreach loops running leaf, with the
+        translated expr in place of its first %s.
+        """
+        node = generators[0]
         assign_name = ""
-        buf = u''
+        buf = ''
         dollar = '$'
 
         # based on Bob Ippolito's Iteration in Javascript code
-        if isinstance(node.assign, ast.AssName):
-            assign_name = node.assign.name
-        elif isinstance(node.assign, ast.AssTuple):
-            assign_name = self._asstuple(node.assign, current_klass)
+        if isinstance(node.target, ast.Name):
+            assign_name = node.target.id
+        elif isinstance(node.target, ast.Tuple):
+            assign_name = self._asstuple(node.target, current_klass)
             dollar = ''
         else:
-            raise TranslationError("unsupported type (in _genexprfor)", node.assign)
+            raise TranslationError("unsupported type (in _compfor)", node.target)
 
-        list_expr = self.expr(node.iter, current_klass)
-                
-        quals.pop(0)
-        buf += "foreach( pyjslib_list(%(list_expr)s) as %(dollar)s%(assign_name)s ) {" % locals()
+        list_expr = self._iterable(node.iter, self.expr(node.iter, current_klass))
+
+        buf += "foreach( %(list_expr)s as %(dollar)s%(assign_name)s ) {" % locals()
         for if_cond in node.ifs:
-            buf += self._genexprif(if_cond, current_klass)
+            buf += "if(" + self.expr(if_cond, current_klass) + ")"
             buf += " "
-            
-        if(len(quals)):
-            buf += self._genexprfor(quals[0], expr, quals, current_klass)
+
+        if len(generators) > 1:
+            buf += self._compfor(generators[1:], expr, current_klass, leaf)
         else:
-            buf += "yield " + self.expr(expr, current_klass) + ";"
-            
-        buf +=  "}"
-        return buf
+            buf += leaf.replace("%s", self.expr(expr, current_klass), 1)
 
-    def _genexprif(self, node, current_klass):
-        return "if(" + self.expr(node.test, current_klass) + ")"
-        
-    def _listcomp(self, node, current_klass):
-        buf = "pyjslib_listcomp( function($__vars) { extract($__vars); "
-        buf += self._listcompfor(node.quals[0], node.expr, node.quals, current_klass)
-        buf = buf + "}, get_defined_vars() )"
+        buf +=  "}"
         return buf
 
-    def _listcompfor(self, node, expr, quals, current_klass):
-        assign_name = ""
-        buf = u''
-        dollar = '$'
+    def _closure_use(self, node):
+        """
+        Return the use clause of the closure a comprehension is translated
+        to: the variables of the enclosing scope it reads, and by reference
+        the ones it assigns with :=.
+        """
+        loads, stores = self._comprehension_names(node)
+        names = []
+        for name in sorted(loads | stores):
+            var = self._name(ast.Name(name, ast.Load()), True)
+            if var and var.startswith("$") and var != "$this":
+                names.append(("&" if name in stores else "") + var)
+        if not names:
+            return ""
+        return " use (" + ", ".join(names) + ")"
+
+    def _comprehension_names(self, node):
+        """
+        Return the sets of free names a comprehension reads and assigns.
+        The names of functions and classes that are called are left out.
+        """
+        bound = comprehension_targets(node)
+        parts = [node.elt]
+        for i, generator in enumerate(node.generators):
+            parts.extend(generator.ifs)
+            if i:
+                parts.append(generator.iter)
+        loads, stores = self._free_names(parts)
+        # the first iterable is evaluated before the loop variables exist
+        first_loads, first_stores = self._free_names([node.generators[0].iter])
+        return (loads - bound) | first_loads, (stores - bound) | first_stores
+
+    def _free_names(self, nodes):
+        loads, stores = set(), set()
+        pending = list(nodes)
+        while pending:
+            child = pending.pop()
+            if isinstance(child, (ast.ListComp, ast.GeneratorExp)):
+                inner_loads, inner_stores = self._comprehension_names(child)
+                loads |= inner_loads
+                stores |= inner_stores
+                continue
+            if isinstance(child, ast.Lambda):
+                # lambdas don't see the enclosing scope in php
+                continue
+            if isinstance(child, ast.Call) and isinstance(child.func, ast.Name) \
+                    and not self._variable_call(child.func.id):
+                pending.extend(child.args)
+                pending.extend(child.keywords)
+                continue
+            if isinstance(child, ast.Name):
+                if isinstance(child.ctx, ast.Load):
+                    loads.add(child.id)
+                else:
+                    stores.add(child.id)
+            pending.extend(ast.iter_child_nodes(child))
+        return loads, stores
 
-        # based on Bob Ippolito's Iteration in Javascript code
-        if isinstance(node.assign, ast.AssName):
-            assign_name = node.assign.name
-        elif isinstance(node.assign, ast.AssTuple):
-            assign_name = self._asstuple(node.assign, current_klass)
-            dollar = ''
-        else:
-            raise TranslationError("unsupported type (in _listcompfor)", node.assign)
+    def _variable_call(self, name):
+        """
+        Whether _callfunc calls the function name through a php variable.
+        """
+        context = self.context
+        return not (name in context.top_level_functions or name in context.top_level_classes
+                    or name in context.imported_classes or name in ("super", "map", "filter")
+                    or name in PHP_BUILTINS or name in PYTHON_BUILTINS)
 
-        list_expr = self.expr(node.list, current_klass)
-        
-        quals.pop(0)
-        buf += "foreach( pyjslib_list(%(list_expr)s) as %(dollar)s%(assign_name)s ) {" % locals()
-        for if_cond in node.ifs:
-            buf += self._listcompif(if_cond, current_klass)
-            buf += " "
-            
-        if(len(quals)):
-            buf += self._listcompfor(quals[0], expr, quals, current_klass)
-        else:
-            buf += "yield " + self.expr(expr, current_klass) + ";"
-            
-        buf +=  "}"
+    def _reduction_call(self, node):
+        """
+        Recognize a reduction over a generator expression or a list
+        comprehension: sum(), min(), max(), any(), all() or the join() of a
+        string or any other separator.  Returns (kind, comprehension,
+        argument), where the argument is the start of sum() or the separator
+        of join(), or None.
+        """
+        if not isinstance(node, ast.Call) or not node.args \
+                or not isinstance(node.args[0], (ast.GeneratorExp, ast.ListComp)):
+            return None
+        comp = node.args[0]
+        if any(generator.is_async for generator in comp.generators):
+            return None
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in REDUCTIONS and not self._shadowed(func.id):
+            if func.id == "sum" and len(node.args) + len(node.keywords) == 2:
+                start = node.args[1] if len(node.args) == 2 else node.keywords[0].value
+                if (node.keywords and node.keywords[0].arg != "start") or not is_const(start) \
+                        or isinstance(start.value, str):
+                    return None
+                return "sum", comp, start
+            if len(node.args) == 1 and not node.keywords:
+                return func.id, comp, None
+        elif isinstance(func, ast.Attribute) and func.attr == "join" and len(node.args) == 1 and not node.keywords \
+                and (not isinstance(func.value, ast.Constant) or isinstance(func.value.value, str)):
+            return "join", comp, func.value
+        return None
+
+    def _shadowed(self, name):
+        context = self.context
+        return name in context.top_level_functions or name in context.top_level_vars \
+            or name in context.imported_classes or name in context.top_level_classes
+
+    def _reduction_code(self, kind, acc, arg, loops):
+        """
+        Return the code initializing the accumulator acc of a reduction,
+        the lines run for every element (the first one gets the element)
+        and the code checking the result.  arg is the translated argument of
+        _reduction_call(); a join() separator that is not a literal must
+        have been evaluated into a variable.  loops is the number of
+        foreach loops any() and all() break out of.
+        """
+        if kind == "sum":
+            return ["%s = %s;" % (acc, arg)], ["%s += %%s;" % acc], []
+        if kind in ("min", "max"):
+            # a flag rather than null marks the empty sequence, as null
+            # can be one of the elements.
+            op = "<" if kind == "min" else ">"
+            value = self._temp("value")
+            seen = self._temp("seen")
+            return (["%s = null;" % acc, "%s = false;" % seen],
+                    ["%s = %%s;" % value,
+                     "if (!%s || %s %s %s) { %s = %s; %s = true; }" % (seen, value, op, acc, acc, value, seen)],
+                    ["if (!%s) { throw new ValueError('%s() arg is an empty sequence'); }" % (seen, kind)])
+        brk = "break;" if loops == 1 else "break %d;" % loops
+        if kind == "any":
+            return ["%s = false;" % acc], ["if (%%s) { %s = true; %s }" % (acc, brk)], []
+        if kind == "all":
+            return ["%s = true;" % acc], ["if (!(%%s)) { %s = false; %s }" % (acc, brk)], []
+        if arg == "''":
+            return ["%s = '';" % acc], ["%s .= %%s;" % acc], []
+        sep = self._temp("sep")
+        return (["%s = '';" % acc, "%s = '';" % sep],
+                ["%s .= %s . %%s;" % (acc, sep), "%s = %s;" % (sep, arg)], [])
+
+    def _reduction_arg(self, kind, arg, current_klass):
+        """
+        Translate the argument of a reduction.  Returns the code to use in
+        _reduction_code() and the code of a join() separator that is not a
+        literal, which has to be evaluated into that variable first, as
+        python evaluates it once and before the iterable.
+        """
+        if arg is None:
+            return "0", None
+        code = self.expr(arg, current_klass)
+        if kind == "join" and not isinstance(arg, ast.Constant):
+            return self._temp("joiner"), code
+        return code, None
+
+    def _reduction(self, node, current_klass):
+        """
+        Translate a reduction recognized by _reduction_call() as a closure
+        called in place, running a single accumulating loop.
+        """
+        kind, comp, arg = self._reduction_call(node)
+        acc = self._temp(kind)
+        arg, value = self._reduction_arg(kind, arg, current_klass)
+        init, leaf, check = self._reduction_code(kind, acc, arg, len(comp.generators))
+        # the separator of join() is passed in, so it is evaluated first
+        buf = "(function(%s)%s { " % (arg if value else "", self._closure_use(comp))
+        buf += " ".join(init) + " "
+        buf += self._compfor(comp.generators, comp.elt, current_klass, " ".join(leaf))
+        buf += " " + " ".join(check + ["return %s; })(%s)" % (acc, value or "")])
         return buf
 
-    def _listcompif(self, node, current_klass):
-        return "if(" + self.expr(node.test, current_klass) + ")"
+    def _reduction_stmt(self, var, node, current_klass):
+        """
+        Emit a reduction recognized by _reduction_call() in statement
+        context as loops accumulating into the php variable var.
+        """
+        kind, comp, arg = self._reduction_call(node)
+        arg, value = self._reduction_arg(kind, arg, current_klass)
+        if value:
+            self.emit(self.ind() + arg + " = " + value + ";" + self.eol)
+        init, leaf, check = self._reduction_code(kind, var, arg, len(comp.generators))
+        for line in init:
+            self.emit(self.ind() + line + self.eol)
+        self._comprehension_stmt(comp, leaf, current_klass)
+        for line in check:
+            self.emit(self.ind() + line + self.eol)
+
+    def _inline_listcomp(self, node, var=None):
+        """
+        Whether the list comprehension node can be emitted as loops in the
+        current scope, filling the php variable var: python 3 gives its
+        loop variables a scope of their own, so they must not be used
+        outside of it, and var must not be used inside.
+        """
+        if any(generator.is_async for generator in node.generators):
+            return False
+        if self.scope is None:
+            return False
+        inside = set(ast.walk(node))
+        if var is not None and var[1:] in [child.id for child in inside if isinstance(child, ast.Name)]:
+            return False
+        index = self._scope_index()
+        for name in comprehension_targets(node):
+            if self._name(ast.Name(name, ast.Store())) != "$" + name:
+                return False
+            # other comprehensions over the same name don't count
+            if any(other not in inside for loop, other in index.names.get(name, ())):
+                return False
+        return True
+
+    def _listcomp_stmt(self, var, node, current_klass):
+        """
+        Emit a list comprehension in statement context as nested foreach
+        loops appending to the php variable var, without a closure.
+        """
+        self.emit(self.ind() + var + " = [];" + self.eol)
+        self._comprehension_stmt(node, [var + "[] = %s;"], current_klass)
+
+    def _comprehension_stmt(self, node, leaf, current_klass):
+        """
+        Emit the for and if clauses of a comprehension as nested foreach
+        loops around the lines of leaf, the first %s of which is replaced
+        by the translated element.
+        """
+        depth = self.depth
+        for generator in node.generators:
+            if isinstance(generator.target, ast.Name):
+                target = self._name(generator.target)
+            elif isinstance(generator.target, ast.Tuple):
+                target = self._asstuple(generator.target, current_klass)
+            else:
+                raise TranslationError("unsupported type (in _listcomp_stmt)", generator.target)
+            iterable = self._iterable(generator.iter, self.expr(generator.iter, current_klass))
+            self.emit(self.ind() + "foreach( %s as %s ) {" % (iterable, target) + self.eol)
+            self.depth += 1
+            for if_cond in generator.ifs:
+                self.emit(self.ind() + "if (" + self.expr(if_cond, current_klass) + ") {" + self.eol)
+                self.depth += 1
+        self.emit(self.ind() + leaf[0].replace("%s", self.expr(node.elt, current_klass), 1) + self.eol)
+        for line in leaf[1:]:
+            self.emit(self.ind() + line + self.eol)
+        while self.depth > depth:
+            self.depth -= 1
+            self.emit(self.ind() + "}" + self.eol)
 
     def _with(self, node, current_klass):
-        buf = '// py2php.fixme "with" unsupported.' + self.eol
-        return buf
+        self.emit('// py2php.fixme "with" unsupported.' + self.eol)
 
 
     def expr(self, node, current_klass):
         #print "NODER: " + str(node)
-        if isinstance(node, ast.Const):
-            return self._const(node)
-        # @@@ not sure if the parentheses should be here or in individual operator functions - JKT
-        elif isinstance(node, ast.Mul):
-            return self._mul(node, current_klass)
-        elif isinstance(node, ast.Add):
-            return self._add(node, current_klass)
-        elif isinstance(node, ast.Sub):
-            return self._sub(node, current_klass)
-        elif isinstance(node, ast.Div):
-            return self._div(node, current_klass)
-        elif isinstance(node, ast.FloorDiv):
-            return self._div(node, current_klass)        
-        elif isinstance(node, ast.Mod):
-            return self._mod(node, current_klass)
-        elif isinstance(node, ast.UnarySub):
-            return self._unarysub(node, current_klass)
-        elif isinstance(node, ast.UnaryAdd):
-            return self._unaryadd(node, current_klass)
-        elif isinstance(node, ast.Not):
-            return self._not(node, current_klass)
-        elif isinstance(node, ast.Or):
-            return self._or(node, current_klass)
-        elif isinstance(node, ast.And):
-            return self._and(node, current_klass)
-        elif isinstance(node, ast.Invert):
-            return self._invert(node, current_klass)
-        elif isinstance(node, ast.Bitand):
-            return self._bitand(node, current_klass)
-        elif isinstance(node, ast.Bitor):
-            return self._bitor(node, current_klass)
-        elif isinstance(node, ast.Bitxor):
-            return self._bitxor(node, current_klass)
-        elif isinstance(node, ast.Power):
-            return self._power(node, current_klass)                
-        elif isinstance(node, ast.LeftShift):
-            return self._leftshift(node, current_klass)
-        elif isinstance(node, ast.RightShift):
-            return self._rightshift(node, current_klass)                
-        elif isinstance(node, ast.Compare):
-            return self._compare(node, current_klass)
-        elif isinstance(node, ast.CallFunc):
-            return self._callfunc(node, current_klass)
-        elif isinstance(node, ast.Name):
-            return self._name(node)
-        elif isinstance(node, ast.Subscript):
-            return self._subscript(node, current_klass)
-        elif isinstance(node, ast.Getattr):
-            return self._getattr(node)
-        elif isinstance(node, ast.List):
-            return self._list(node, current_klass)
-        elif isinstance(node, ast.Dict):
-            return self._dict(node, current_klass)
-        elif isinstance(node, ast.Tuple):
-            return self._tuple(node, current_klass)
-        elif isinstance(node, ast.AssName):
-            return self._assname(node, current_klass)        
-        elif isinstance(node, ast.AssAttr):
-            return self._assattr(node, current_klass)        
-        elif isinstance(node, ast.Slice):
-            return self._slice(node, current_klass)
-        elif isinstance(node, ast.Sliceobj):
-            return self._sliceobj(node, current_klass)
-        elif isinstance(node, ast.Lambda):
-            return self._lambda(node, current_klass)        
-        elif isinstance(node, ast.IfExp):
-            return self._ifexp(node, current_klass)        
-        elif isinstance(node, ast.ListComp):
-            return self._listcomp(node, current_klass)
-        elif isinstance(node, ast.GenExpr):
-            return self._genexpr(node, current_klass)        
-        elif isinstance(node, ast.ListCompFor):
-            return self._listcompfor(node, current_klass)        
-        elif isinstance(node, ast.ListCompIf):
-            return self._listcompif(node, current_klass)        
-        elif isinstance(node, ast.AssTuple):
-            return self._asstuple(node, current_klass)
-        elif isinstance(node, ast.Class):
-            return self._class(node)
-        elif isinstance(node, ast.Backquote):
-            return self._backquote(node, current_klass)
-        elif isinstance(node, ast.Yield):
-            return self._yield(node, current_klass)
-        
-        else:
+        handler = self.expr_handlers.get(node.__class__)
+        if handler is None:
             raise TranslationError("unsupported type (in expr)", node)
+        return handler(self, node, current_klass)
+
+    def _stmts(self, nodes, current_klass):
+        for n in nodes:
+            self._stmt(n, current_klass)
+
+    # node type -> handler(self, node, current_klass), looked up by _stmt and
+    # expr.  Statements without an entry are translated as expressions.
+    stmt_handlers = {
+        ast.Assert: _assert,
+        ast.Return: _return,
+        ast.Break: _break,
+        ast.Continue: _continue,
+        ast.Assign: _assign,
+        ast.AnnAssign: _assign,
+        ast.AugAssign: _augassign,
+        ast.Expr: _discard,
+        ast.If: _if,
+        ast.For: _for,
+        ast.While: _while,
+        ast.Delete: _delete,
+        ast.Global: _global,
+        ast.Pass: lambda self, node, current_klass: None,
+        ast.FunctionDef: lambda self, node, current_klass: self._function(node, True),
+        ast.Try: _try,
+        ast.Raise: _raise,
+        ast.Import: lambda self, node, current_klass: self.emit(self._import(node)),
+        ast.With: _with,
+        ast.ImportFrom: lambda self, node, current_klass: self.emit(self._from(node)),
+    }
+
+    # @@@ not sure if the parentheses should be here or in individual operator functions - JKT
+    binop_handlers = {
+        ast.Mult: _mul,
+        ast.Add: _add,
+        ast.Sub: _sub,
+        ast.Div: _div,
+        ast.FloorDiv: _floordiv,
+        ast.Mod: _mod,
+        ast.BitAnd: _bitand,
+        ast.BitOr: _bitor,
+        ast.BitXor: _bitxor,
+        ast.Pow: _power,
+        ast.LShift: _leftshift,
+        ast.RShift: _rightshift,
+    }
+
+    unaryop_handlers = {
+        ast.USub: _unarysub,
+        ast.UAdd: _unaryadd,
+        ast.Not: _not,
+        ast.Invert: _invert,
+    }
+
+    expr_handlers = {
+        ast.Constant: lambda self, node, current_klass: self._const(node),
+        ast.BinOp: _binop,
+        ast.UnaryOp: _unaryop,
+        ast.BoolOp: _boolop,
+        ast.Compare: _compare,
+        ast.Call: _callfunc,
+        ast.Name: lambda self, node, current_klass: self._name(node) if isinstance(node.ctx, ast.Load) else self._assname(node, current_klass),
+        ast.Subscript: _subscript,
+        ast.Attribute: lambda self, node, current_klass: self._getattr(node) if isinstance(node.ctx, ast.Load) else self._assattr(node, current_klass),
+        ast.List: _list,
+        ast.Dict: _dict,
+        ast.Tuple: _tuple,
+        ast.Starred: _starred,
+        ast.Slice: _sliceobj,
+        ast.Lambda: _lambda,
+        ast.IfExp: _ifexp,
+        ast.NamedExpr: _namedexpr,
+        ast.ListComp: _listcomp,
+        ast.GeneratorExp: _genexpr,
+        ast.JoinedStr: _joinedstr,
+        ast.ClassDef: lambda self, node, current_klass: self._captured(self._class, node),
+        ast.Yield: _yield,
+    }
 
 
 
-import StringIO
-
 def translate(file_name, module_name):
-    output = StringIO.StringIO()
-    mod = compiler.parseFile(file_name)
+    output = io.StringIO()
+    mod = parse_file(file_name)
     t = Translator(module_name, mod, output)
     return output.getvalue()
 
@@ -1746,24 +3048,24 @@ class PlatformParser:
     def __init__(self, platform_dir = ""):
         self.platform_dir = platform_dir
         self.parse_cache = {}
+        self.name_index = weakref.WeakKeyDictionary()
         self.platform = ""
 
     def setPlatform(self, platform):
         self.platform = platform
         
     def parseModule(self, module_name, file_name):
-        if self.parse_cache.has_key(file_name):
+        if file_name in self.parse_cache:
             mod = self.parse_cache[file_name]
         else:
-            print "Importing " + module_name
-            mod = compiler.parseFile(file_name)
+            print("Importing " + module_name)
+            mod = parse_file(file_name)
             self.parse_cache[file_name] = mod
         
         platform_file_name = self.generatePlatformFilename(file_name)
         if self.platform and os.path.isfile(platform_file_name):
-            mod = copy.deepcopy(mod)
-            mod_override = compiler.parseFile(platform_file_name)
-            self.merge(mod, mod_override)
+            mod_override = parse_file(platform_file_name)
+            mod = self.merge(mod, mod_override)
 
         return mod
         
@@ -1774,51 +3076,123 @@ class PlatformParser:
         return os.path.join(os.path.dirname(file_name), self.platform_dir, platform_file_name)
 
     def merge(self, tree1, tree2):
-        for child in tree2.node:
-            if isinstance(child, ast.Function):
-                self.replaceFunction(tree1, child.name, child)
-            elif isinstance(child, ast.Class):
-                self.replaceClassMethods(tree1, child.name, child)
+        """
+        Return an overlay of tree1 with the functions and class methods
+        of tree2 swapped in.  The overlay shares every unchanged node with
+        the cached tree1, only the lists leading to a replaced function
+        are copied.
+        """
+        overlay = copy.copy(tree1)
+        overlay.body = list(tree1.body)
+        for child in tree2.body:
+            if isinstance(child, ast.FunctionDef):
+                self.replaceFunction(overlay, tree1, child.name, child)
+            elif isinstance(child, ast.ClassDef):
+                self.replaceClassMethods(overlay, tree1, child.name, child)
 
-        return tree1
-            
-    def replaceFunction(self, tree, function_name, function_node):
-        # find function to replace
-        for child in tree.node:
-            if isinstance(child, ast.Function) and child.name == function_name:
-                self.copyFunction(child, function_node)
-                return
-        raise TranslationError("function not found: " + function_name, function_node)
-
-    def replaceClassMethods(self, tree, class_name, class_node):
-        # find class to replace
-        old_class_node = None
-        for child in tree.node:
-            if isinstance(child, ast.Class) and child.name == class_name:
-                old_class_node = child
-                break
-        
-        if not old_class_node:
+        return overlay
+
+    def nameIndex(self, node):
+        """
+        Map (node type, name) of the definitions in node.body to their
+        position, built once per cached module or class.
+        """
+        index = self.name_index.get(node)
+        if index is None:
+            index = {}
+            for position, child in enumerate(node.body):
+                if isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                    index.setdefault((type(child), child.name), position)
+            self.name_index[node] = index
+        return index
+
+    def replaceFunction(self, overlay, tree, function_name, function_node):
+        position = self.nameIndex(tree).get((ast.FunctionDef, function_name))
+        if position is None:
+            raise TranslationError("function not found: " + function_name, function_node)
+        overlay.body[position] = self.copyFunction(tree.body[position], function_node)
+
+    def replaceClassMethods(self, overlay, tree, class_name, class_node):
+        position = self.nameIndex(tree).get((ast.ClassDef, class_name))
+        if position is None:
             raise TranslationError("class not found: " + class_name, class_node)
-        
-        # replace methods
-        for function_node in class_node.code:
-            if isinstance(function_node, ast.Function):
-                found = False
-                for child in old_class_node.code:
-                    if isinstance(child, ast.Function) and child.name == function_node.name:
-                        found = True
-                        self.copyFunction(child, function_node)
-                        break
 
-                if not found:
+        old_class_node = tree.body[position]
+        class_overlay = overlay.body[position]
+        if class_overlay is old_class_node:
+            class_overlay = copy.copy(old_class_node)
+            class_overlay.body = list(old_class_node.body)
+            overlay.body[position] = class_overlay
+
+        # replace methods
+        methods = self.nameIndex(old_class_node)
+        for function_node in class_node.body:
+            if isinstance(function_node, ast.FunctionDef):
+                method_position = methods.get((ast.FunctionDef, function_node.name))
+                if method_position is None:
                     raise TranslationError("class method not found: " + class_name + "::" + function_node.name, function_node)
+                class_overlay.body[method_position] = self.copyFunction(old_class_node.body[method_position], function_node)
 
     def copyFunction(self, target, source):
-        target.code = source.code
-        target.argnames = source.argnames
-        target.defaults = source.defaults
-        target.doc = source.doc # @@@ not sure we need to do this any more
+        function = copy.copy(target)
+        function.body = source.body # the docstring comes along with the body
+        function.args = source.args
+        return function
+
+
+class ModuleIndex:
+    """
+    Resolves file names against the current directory and the library
+    directories.  Every directory is listed once, on the first lookup, into
+    a dict mapping file names to paths, so resolving an import is a dict
+    lookup instead of a stat per directory.  invalidate() drops the index
+    for long running translators (watch mode, the server) that need to see
+    files appear or disappear.
+    """
+
+    def __init__(self, library_dirs):
+        self.library_dirs = library_dirs
+        self.local = None
+        self.library = None
+
+    def listFiles(self, directory):
+        try:
+            return [entry.name for entry in os.scandir(directory or ".") if entry.is_file()]
+        except OSError:
+            return []
+
+    def scan(self):
+        self.local = set(self.listFiles(""))
+        self.library = {}
+        for library_dir in self.library_dirs:
+            directory = os.path.join(os.path.dirname(__file__), library_dir)
+            for name in self.listFiles(directory):
+                # the first library directory providing a file wins
+                self.library.setdefault(name, os.path.join(directory, name))
+
+    def invalidate(self):
+        self.local = None
+        self.library = None
+
+    def find(self, file_name, local=True):
+        """
+        Returns the path of file_name, or None if it is not found.  The
+        current directory is only searched if local is set.
+        """
+        if os.path.dirname(file_name):
+            # paths are not indexed
+            if local and os.path.isfile(file_name):
+                return file_name
+            for library_dir in self.library_dirs:
+                full_file_name = os.path.join(os.path.dirname(__file__), library_dir, file_name)
+                if os.path.isfile(full_file_name):
+                    return full_file_name
+            return None
+        if self.library is None:
+            self.scan()
+        if local and file_name in self.local:
+            return file_name
+        return self.library.get(file_name)
 
 
 class AppTranslator:
@@ -1828,6 +3202,9 @@ class AppTranslator:
 
         self.library_modules = []
         self.library_dirs = library_dirs
+        self.modules = ModuleIndex(library_dirs)
+        # write a SourceMap next to every module of translateProject()
+        self.source_map = False
         
         if not parser:
             self.parser = PlatformParser()
@@ -1835,18 +3212,25 @@ class AppTranslator:
             self.parser = parser
 
     def findFile(self, file_name):
-        if os.path.isfile(file_name):
-            return file_name
+        path = self.modules.find(file_name)
+        if path:
+            return path
 
         if file_name[:8] == 'pyjamas.': # strip off library name
             if file_name != "pyjamas.py":
                 file_name = file_name[8:]
-        for library_dir in self.library_dirs:
-            full_file_name = os.path.join(os.path.dirname(__file__), library_dir, file_name)
-            if os.path.isfile(full_file_name):
-                return full_file_name
-        
+                path = self.modules.find(file_name, local=False)
+                if path:
+                    return path
+
         raise Exception("file not found: " + file_name)
+
+    def invalidateModules(self):
+        """
+        Forget the module index, the next import scans the library
+        directories again.
+        """
+        self.modules.invalidate()
     
     def translate(self, module_name, is_app=True):
 
@@ -1860,25 +3244,26 @@ class AppTranslator:
         else:
             module_name_translated = module_name
         
-        output = cStringIO.StringIO()
+        output = io.StringIO()
         
         mod = self.parser.parseModule(module_name, file_name)
         t = Translator(module_name_translated, mod, output)
         module_str = output.getvalue()
         
         imported_modules_str = ''
-        for module in t.imported_modules:
+        for module in t.context.imported_modules:
             if module not in self.library_modules:
                 imported_modules_str += self.translate(module, False)
-        for js in t.imported_js:
+        for js in t.context.imported_js:
            path = self.findFile(js)
            if os.path.isfile(path):
-              print 'Including', js
+              print('Including', js)
               imported_modules_str += '\n//\n// BEGIN '+js+'\n//\n'
-              imported_modules_str += file(path).read()
+              with open(path) as f:
+                  imported_modules_str += f.read()
               imported_modules_str += '\n//\n// END '+js+'\n//\n'
            else:
-              print >>sys.stderr, 'Warning: Unable to find imported javascript:', js
+              print('Warning: Unable to find imported javascript:', js, file=sys.stderr)
 
         if module_name == 'pyjamas':
             return imported_modules_str 
@@ -1893,146 +3278,1078 @@ class AppTranslator:
         
         return imported_modules_str
 
-def getstr_comp(line, func_name):
-    rep_dic = {"->zfill(": "str_pad('!#var#!', '!#args#!', '0', STR_PAD_LEFT)",
-               "->startswith(": "(strpos('!#var#!', '!#args#!') === 0)", 
-               "->endswith(": "(substr('!#var#!', -strlen('!#args#!')) === '!#args#!')", 
-               "->upper(": "strtoupper('!#var#!')", 
-               "->lower(": "strtolower('!#var#!')",
-               "->count(": "substr_count('!#var#!', '!#args#!')",
-               "->center(": "str_pad('!#var#!', '!#args#!', STR_PAD_BOTH)",
-               "->capitalize(": "ucfirst('!#var#!')", 
-               "->find(": "strpos('!#var#!', '!#args#!')",
-               "->rfind(": "strrpos('!#var#!', '!#args#!')",
-               "->index(": "strpos('!#var#!', '!#args#!')",
-               "->rindex(": "strrpos('!#var#!', '!#args#!')",
-               "->islower(": "ctype_lower('!#var#!')",
-               "->isupper(": "ctype_upper('!#var#!')",
-               "->isspace(": "ctype_space('!#var#!')",
-               "->isalnum(": "ctype_alnum('!#var#!')",
-               "->isalpha(": "ctype_alpha('!#var#!')",
-               "->isdigit(": "ctype_digit('!#var#!')",
-               "->join(": "join('!#var#!', '!#args#!')",
-               "->replace(": "str_replace('!#args#!', '!#var#!')",
-               "->split(": "explode('!#args#!', '!#var#!')",
-               "->splitlines(": "explode('!#dblsl_n#!', '!#var#!')",
-               "->strip(": "trim('!#var#!', '!#args#!')",
-               "->rstrip(": "rtrim('!#var#!', '!#args#!')",
-               "->lstrip(": "ltrim('!#var#!', '!#args#!')",
-               "->swapcase(": "strtr('!#var#!', 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz', 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')"
-               }
-    while func_name in line:
-        pos = line.find(func_name)
-        # find $ or ' or " backwards from pos
-        posvar = pos
-        while line[posvar]!="$" and line[posvar]!="'" and line[posvar]!='"':
-            posvar -= 1
-        if line[posvar]!="$":
-            if line[posvar]=="'":
-                posvar = line[:posvar].rfind("'")
-            else:
-                posvar = line[:posvar].rfind('"')
-        start = line[:posvar]
-        var = line[posvar:pos]
-        new_func = rep_dic[func_name]
-        # find the closing round bracket to the function
-        st1 = pos + len(func_name) - 1
-        st = st1
-        op = 0
-        cl = 0
-        while (op==0 and cl==0) or op!=cl:
-            if line[st] == "(": op += 1
-            if line[st] == ")": cl += 1
-            st = st + 1
-            if st>(line): break
-        args = line[st1+1:st-1]
-        end = line[st:]
-        line = start + new_func.replace("'!#var#!'", var).replace("'!#args#!'", args) + end
-        line = line.replace(", )", ")") # in case of strip()
-    return line
-
-def test_strfuncs(line):
-    string_functions = ["->zfill(", "->startswith(", "->endswith(", "->upper(", "->lower(", "->count(", "->center(", "->capitalize(", "->find(", "->rfind(", "->index(", "->rindex(", "->islower(", "->isupper(", "->isspace(", "->isalnum(", "->isalpha(", "->isdigit(", "->join(", "->replace(", "->split(", "->splitlines(", "->strip(", "->rstrip(", "->lstrip(", "->swapcase(" ]
-    for fun in string_functions:
-        if fun in line:
-            line = getstr_comp(line, fun)
-    return line
+    def outputFilename(self, module_name):
+        # the name _import() and _from() emit the require_once() for
+        return module_name.replace('.', '_') + ".php"
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) == 1:
-        print "Usage: py2php.py pythonscript.py\nThis will produce a php script called pythonscript.php"
-    else:
-        file_name = sys.argv[1]
-        output_filename = os.path.splitext(os.path.basename(file_name))[0] + ".php"
-        if len(sys.argv) > 2:
-            module_name = sys.argv[2]
+    def importGraph(self, module_name):
+        """
+        Parse the module and everything it imports, directly or not.
+        Returns a dict mapping every module found to the set of modules it
+        imports, and the set of imported modules that could not be found
+        (e.g. python's own library).
+        """
+        graph = {}
+        missing = set()
+        pending = [module_name]
+        while pending:
+            name = pending.pop()
+            if name in graph or name in missing:
+                continue
+            try:
+                file_name = self.findFile(name + self.extension)
+            except Exception:
+                if name == module_name:
+                    raise
+                missing.add(name)
+                continue
+            mod = self.parser.parseModule(name, file_name)
+            graph[name] = Translator.module_imports(mod)
+            pending.extend(graph[name])
+        for name in graph:
+            graph[name] = set([m for m in graph[name] if m in graph and m != name])
+        return graph, missing
+
+    def translateProject(self, module_name, output_dir=".", jobs=None, out=None):
+        """
+        Translate an application module and all the modules it imports,
+        each exactly once and into a php file of its own in output_dir.
+        The import graph is built first; the modules are then spread over
+        a pool of worker processes all at once, as translating a module
+        doesn't need the output of the modules it imports.  Returns the
+        list of (module_name, error) for the modules that failed.
+        """
+        out = out or sys.stdout
+        start = time.time()
+        graph, missing = self.importGraph(module_name)
+        modules = sorted(graph)
+        if not jobs:
+            jobs = multiprocessing.cpu_count()
+        jobs = max(1, min(jobs, len(modules)))
+
+        # the workers are forked after the graph was built, so they share
+        # the modules parsed so far instead of parsing them again.
+        results = []
+        pool = None
+        if jobs > 1:
+            pool = multiprocessing.get_context("fork").Pool(jobs, _project_init, (self, output_dir))
+        try:
+            if pool:
+                results = pool.map(_project_pool_worker, modules)
+            else:
+                results = [_project_worker(self, output_dir, m) for m in modules]
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        elapsed = time.time() - start
+
+        failed = [(m, error) for m, t, error in results if error]
+        print("Translated %d modules in %.2fs (%d jobs), %d failed" % (
+            len(results), elapsed, jobs, len(failed)), file=out)
+        if missing:
+            print("Not found, not translated: " + ", ".join(sorted(missing)), file=out)
+        for m, error in failed:
+            print("   %s: %s" % (m, error), file=out)
+        return failed
+
+# (AppTranslator, output_dir) of a --project worker process
+_project_job = None
+
+def _project_init(app_translator, output_dir):
+    global _project_job
+    _project_job = (app_translator, output_dir)
+
+def _project_pool_worker(module_name):
+    return _project_worker(_project_job[0], _project_job[1], module_name)
+
+def _project_worker(app_translator, output_dir, module_name):
+    start = time.time()
+    error = None
+    try:
+        file_name = app_translator.findFile(module_name + app_translator.extension)
+        mod = app_translator.parser.parseModule(module_name, file_name)
+        output_filename = os.path.join(output_dir, app_translator.outputFilename(module_name))
+        source_map = None
+        if app_translator.source_map:
+            source_map = source_map_for(file_name, output_filename)
+        save_file = open(output_filename, "w", encoding="utf-8")
+        try:
+            translate_module(mod, module_name, save_file, source_map=source_map)
+        finally:
+            save_file.close()
+        if source_map is not None:
+            source_map.save(output_filename + ".map")
+    except Exception as e:
+        error = "%s: %s" % (e.__class__.__name__, "; ".join(str(e).splitlines()))
+    return module_name, time.time() - start, error
+
+MATH_EXPRESSIONS_PHP = ["acosh", "acos", "asinh", "asin", "atan2", "atanh", "atan", "ceil", "cosh", "cos", "deg2rad", "expm1", "exp", "M_E", "floor", "fmod", "hypot", "is_infinite", "is_nan", "log10", "log1p", "log", "modf", "M_PI", "pow", "rad2deg", "sinh", "sin", "sqrt", "tanh", "tan"]
+MATH_EXPRESSIONS_PY = ['acosh', 'acos', 'asinh', 'asin', 'atan2', 'atanh', 'atan', 'ceil', 'cosh', 'cos', 'radians', 'expm1', 'exp', 'e',   'floor', 'fmod', 'hypot', 'isinf',       'isnan',  'log10', 'log1p', 'log', 'modf', 'pi',   'pow', 'degrees', 'sinh', 'sin', 'sqrt', 'tanh', 'tan']
+
+# escape sequences which must survive the round trip through the parser
+KEEP_STRS =     ['\\n', '\\t', '\\r']
+KEEP_STRS_REP = ['!#dblsl_n#!', '!#dblsl_t#!', '!#dblsl_r#!']
+
+# marks the Translator puts in front of the code of a python line when a
+# source map is written, see SourceMap.  "=" marks set the line the
+# following (relative) marks count from.
+SOURCE_MARK = "\uf8f0%s%d\uf8f1"
+SOURCE_MARK_RE = re.compile("\uf8f0(=?)(-?\\d+)\uf8f1")
+
+CODING_TAG = "# -*- coding:"
+
+class TranslationCache:
+    """
+    Persistent on-disk cache of translated files.
+
+    Entries are keyed by the python source, the module name, the translator
+    version and the libpy2php version, so a hit can be copied to the output
+    file without parsing or translating anything.  The least recently used
+    entries are removed by put() once the cache grows beyond max_size
+    bytes.  The size of the cache is kept in a file of its own, so that
+    the directory is only walked when something has to be removed.
+    """
+
+    def __init__(self, cache_dir=None, max_size=256 * 1024 * 1024):
+        if not cache_dir:
+            cache_dir = os.environ.get("PY2PHP_CACHE_DIR") or \
+                        os.path.join(os.path.expanduser("~"), ".cache", "py2php")
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.version = self.translatorVersion()
+        self.size_path = os.path.join(cache_dir, "size")
+
+    def translatorVersion(self):
+        # the digests make sure that a modified translator or php library
+        # never gets served stale entries, even if VERSION was not bumped.
+        digest = hashlib.sha1(VERSION.encode("ascii"))
+        translator_file = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+        lib_dir = os.path.join(os.path.dirname(translator_file), "libpy2php")
+        for file_name in [translator_file] + sorted(glob.glob(os.path.join(lib_dir, "*.php"))):
+            if os.path.isfile(file_name):
+                digest.update(open(file_name, "rb").read())
+        return digest.hexdigest()
+
+    def key(self, source, module_name=None):
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        digest = hashlib.sha1(self.version.encode("ascii"))
+        digest.update(("\0" + (module_name or "") + "\0").encode("utf-8"))
+        digest.update(source)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".php")
+
+    def get(self, key, output_filename):
+        """
+        Copy the cached translation for key to output_filename.  Returns
+        False if there is no such entry.
+        """
+        path = self.path(key)
+        try:
+            shutil.copyfile(path, output_filename)
+            os.utime(path, None)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def put(self, key, file_name):
+        path = self.path(key)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            # write to a private file first, concurrent batch workers may
+            # store the same entry at the same time.
+            size = self.readSize()
+            fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(path))
+            os.close(fd)
+            shutil.copyfile(file_name, tmp_name)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.rename(tmp_name, path)
+            size += os.path.getsize(path) - replaced
+        except (IOError, OSError):
+            return
+        if size > self.max_size:
+            self.evict()
         else:
-            module_name = None
-
-        math_expression_php = ["acosh", "acos", "asinh", "asin", "atan2", "atanh", "atan", "ceil", "cosh", "cos", "deg2rad", "expm1", "exp", "M_E", "floor", "fmod", "hypot", "is_infinite", "is_nan", "log10", "log1p", "log", "modf", "M_PI", "pow", "rad2deg", "sinh", "sin", "sqrt", "tanh", "tan"]
-        math_expressions_py = ['acosh', 'acos', 'asinh', 'asin', 'atan2', 'atanh', 'atan', 'ceil', 'cosh', 'cos', 'radians', 'expm1', 'exp', 'e',   'floor', 'fmod', 'hypot', 'isinf',       'isnan',  'log10', 'log1p', 'log', 'modf', 'pi',   'pow', 'degrees', 'sinh', 'sin', 'sqrt', 'tanh', 'tan']
-
-        # retrieve and keep the comments in the python file:
-        pythonfile = open(file_name, "rb")
-        lines = pythonfile.readlines()
-        pythonfile.close()
-        coding = ""
-        codetag = "# -*- coding:"
-        lc = len(codetag)
-        math_included = False
-        for line in lines:
-            if line.startswith(codetag):
-                end = line[lc:].find("-*-")
-                coding = line[lc:lc+end].strip(" ").lstrip(" ")
-                print "coding of the file:", coding
-            if "import math" in line:
-                math_included = True
-        if coding == "":
-            coding = "utf-8"
-        keep_strs =     ['\\n', '\\t', '\\r']
-        keep_strs_rep = ['!#dblsl_n#!', '!#dblsl_t#!', '!#dblsl_r#!']
-        for k, rep in enumerate(keep_strs):
-            for l, line in enumerate(lines):
-                lines[l] = line.replace(rep, keep_strs_rep[k])
-        new_lines = []
+            self.writeSize(size)
+
+    def readSize(self):
+        """
+        Return the size of the cache in bytes, walking it if it is not
+        known yet.
+        """
+        try:
+            with open(self.size_path) as f:
+                return int(f.read())
+        except (IOError, OSError, ValueError):
+            return self.evict()
+
+    def writeSize(self, size):
+        # concurrent batch workers may lose an update of each other, the
+        # walk of the next eviction corrects the total.
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "w") as f:
+                f.write(str(size))
+            os.rename(tmp_name, self.size_path)
+        except (IOError, OSError):
+            pass
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is no larger
+        than max_size bytes.  Returns the size of the cache.
+        """
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if path == self.size_path:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self.writeSize(total)
+        return total
+
+def inspect_source(source):
+    """
+    Return the coding declared in the source of a python script (None if
+    there is none) and whether the math module is imported.
+    """
+    coding = None
+    lc = len(CODING_TAG)
+    math_included = False
+    for line in source.splitlines():
+        if line.startswith(CODING_TAG):
+            end = line[lc:].find("-*-")
+            coding = line[lc:lc+end].strip(" ").lstrip(" ")
+        if "import math" in line:
+            math_included = True
+    return coding, math_included
+
+def collect_comments(source):
+    """
+    Return the full line comments of a python script as a dict that maps
+    their line numbers to the text following the '#'.
+    """
+    comments = {}
+    readline = io.StringIO(source).readline
+    try:
+        for tok_type, text, start, end, line in tokenize.generate_tokens(readline):
+            if tok_type == tokenize.COMMENT and not line[:start[1]].strip():
+                comments[start[0]] = text[1:].rstrip()
+    except (tokenize.TokenError, IndentationError):
+        pass
+    return comments
+
+class SourceMap:
+    """
+    Maps the lines of a php file to the lines of the python script it was
+    translated from.  The Translator marks the code of every statement and
+    comment with its python line; the PostProcessor strips the marks and
+    counts the php lines.  Lines without a mark belong to the python line
+    of the last mark before them.
+
+    The map is saved as JSON next to the php file (x.php.map), with the
+    python file relative to the map and a list holding the python line of
+    every php line (null for the lines before the first statement).
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+        self.lines = []
+        self.base = 0
+        self.lineno = None
+        self.first = None
+
+    def strip(self, line):
+        """
+        Return the line without its marks, remembering the python line of
+        the first statement on it.
+        """
+        if "\uf8f0" not in line:
+            self.first = self.lineno
+            return line
+        self.first = None
+        for match in SOURCE_MARK_RE.finditer(line):
+            if match.group(1):
+                self.base = int(match.group(2))
+            else:
+                self.lineno = self.base + int(match.group(2))
+                if self.first is None:
+                    self.first = self.lineno
+        if self.first is None:
+            self.first = self.lineno
+        return SOURCE_MARK_RE.sub("", line)
+
+    def add(self, count):
+        self.lines.extend([self.first] * count)
+
+    def as_dict(self):
+        return {"version": 1, "source": self.source, "lines": self.lines}
+
+    def save(self, file_name):
+        with open(file_name, "w") as f:
+            json.dump(self.as_dict(), f, separators=(",", ":"))
+
+    @staticmethod
+    def load(file_name):
+        """
+        Return the dict saved by save(), with the source relative to the
+        current directory instead of the map.
+        """
+        with open(file_name) as f:
+            source_map = json.load(f)
+        if source_map.get("source"):
+            source_map["source"] = os.path.normpath(os.path.join(os.path.dirname(file_name),
+                                                                 source_map["source"]))
+        return source_map
+
+class PostProcessor:
+    """
+    Output stream that applies the line based post-processing to the code
+    written by the Translator and passes every line on to stream as soon
+    as it is complete.
+    """
+
+    def __init__(self, stream, math_included=False, profile=None, source_map=None):
+        self.stream = stream
+        self.math_included = math_included
+        self.pending = ''
+        self.profile = profile
+        self.source_map = source_map
+
+    def write(self, text):
+        lines = (self.pending + text).split("\n")
+        self.pending = lines.pop()
         for line in lines:
-            if line.lstrip(" \t").startswith("#"):
-                tag = line.find("#")
-                line = line[:tag] + '"""' + line.strip()[tag+1:] + '"""\n'
-            new_lines.append(line.decode(coding))
-        pythonfile = open("tmp.py", "wb")
-        for line in new_lines:
-            pythonfile.write(line.encode(coding))
-        pythonfile.close()
-        # necessary for print unicode to non utf-8 output, eg redirect to file.
-        # python 2.x is crazy.
-        # see: https://wiki.python.org/moin/PrintFails
-        sys.stdout = codecs.getwriter(locale.getpreferredencoding())(sys.stdout);
-        
-        translated_code = "<?php " + translate("tmp.py", module_name),
-        # print translated_code, type(translated_code)
+            self.writeLine(line)
+
+    def close(self):
+        self.writeLine(self.pending)
+        self.pending = ''
+
+    def writeLine(self, line):
+        if self.source_map is not None:
+            line = self.source_map.strip(line)
+        if self.profile:
+            with self.profile.stage("post-pass"):
+                line = self.processLine(line)
+            with self.profile.stage("write"):
+                self.stream.write(line + "\n")
+        else:
+            line = self.processLine(line)
+            self.stream.write(line + "\n")
+        if self.source_map is not None:
+            # the math.php replacement turns one line into several
+            self.source_map.add(line.count("\n") + 1)
+
+    def processLine(self, line):
         mtagname = "math::"
-        save_file = open(output_filename, "wb")
-        for line in translated_code[0].split("\n"):
-            if math_included:
-                found = True
-                while mtagname in line and found:
-                    tag = line.find(mtagname)
-                    line_rest = line[tag+len(mtagname):]
-                    found = False
-                    for i, exp in enumerate(math_expressions_py):
-                        if line_rest.startswith(exp):
-                            line = line[:tag] + math_expression_php[i] + line_rest[len(exp):] 
-                            found = True
-                            break
-                if "require_once( 'math.php');" in line:
-                    line = """function modf($zahl) {
+        if self.math_included:
+            found = True
+            while mtagname in line and found:
+                tag = line.find(mtagname)
+                line_rest = line[tag+len(mtagname):]
+                found = False
+                for i, exp in enumerate(MATH_EXPRESSIONS_PY):
+                    if line_rest.startswith(exp):
+                        line = line[:tag] + MATH_EXPRESSIONS_PHP[i] + line_rest[len(exp):] 
+                        found = True
+                        break
+            if "require_once( 'math.php');" in line:
+                line = """function modf($zahl) {
         return [$zahl-pyjslib_int($zahl), pyjslib_int($zahl)];
     } """
-            line = test_strfuncs(line)
-            for k, rep in enumerate(keep_strs):
-                line = line.replace(keep_strs_rep[k], rep)
-            save_file.write(line.encode(coding)+"\n")
+        for k, rep in enumerate(KEEP_STRS):
+            line = line.replace(KEEP_STRS_REP[k], rep)
+        return line
+
+def translate_source(source, module_name=None, output=None, fragment_cache=None, profile=None,
+                     source_map=None):
+    """
+    Translate the source of a python script to php.  If an output stream
+    is given the code is written to it while it is generated, otherwise it
+    is returned.
+
+    Everything happens in memory: the comments are collected with the
+    tokenizer into a table indexed by line number, which the Translator
+    uses to put them back in place while emitting the code.
+
+    A TranslationProfile given as profile gets the time of every stage
+    and every Translator handler, a SourceMap given as source_map gets the
+    python line of every php line.
+    """
+    with profile_stage(profile, "parse"):
+        if isinstance(source, bytes):
+            coding = inspect_source(source.decode("latin-1"))[0]
+            source = source.decode(coding or "utf-8", "replace")
+        math_included = inspect_source(source)[1]
+        for k, rep in enumerate(KEEP_STRS):
+            source = source.replace(rep, KEEP_STRS_REP[k])
+        with profile_stage(profile, "comments"):
+            comments = collect_comments(source)
+        mod = parse(source)
+    return translate_module(mod, module_name, output, comments, math_included,
+                            fragment_cache, profile, source_map)
+
+def translate_module(mod, module_name=None, output=None, comments=None, math_included=None,
+                     fragment_cache=None, profile=None, source_map=None):
+    """
+    Translate an already parsed module to php.  If an output stream is
+    given the code is written to it while it is generated, otherwise it is
+    returned.
+    """
+    if math_included is None:
+        math_included = "math" in Translator.module_imports(mod)
+    stream = output
+    if output is None:
+        stream = io.StringIO()
+    post = PostProcessor(stream, math_included, profile, source_map)
+    with profile_stage(profile, "translate"):
+        post.write("<?php ")
+        Translator(module_name, mod, post, comments, fragment_cache, profile, source_map is not None)
+        post.close()
+    if output is None:
+        return stream.getvalue()
+
+def source_map_for(file_name, output_filename):
+    """
+    Return an empty SourceMap for the translation of file_name to
+    output_filename.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_filename))
+    return SourceMap(os.path.relpath(os.path.abspath(file_name), output_dir))
+
+def default_output_filename(file_name):
+    return os.path.splitext(os.path.basename(file_name))[0] + ".php"
+
+def translate_file(file_name, module_name=None, output_filename=None, cache=None, source=None,
+                   fragment_cache=None, profile=None, source_map=False):
+    """
+    Translate the python script file_name and write the php code to
+    output_filename.  If a TranslationCache is given, unchanged files are
+    copied from the cache instead of being translated again.  The source
+    is read from file_name unless it is given.  With source_map, a
+    SourceMap is written next to the php file and the cache is not used.
+    Returns the name of the file written and whether it came from the
+    cache.
+    """
+    if output_filename is None:
+        output_filename = default_output_filename(file_name)
+    if source is None:
+        with profile_stage(profile, "read"):
+            pythonfile = open(file_name, "rb")
+            source = pythonfile.read()
+            pythonfile.close()
+    sm = None
+    if source_map:
+        cache = None
+        sm = source_map_for(file_name, output_filename)
+    if cache:
+        key = cache.key(source, module_name)
+        if cache.get(key, output_filename):
+            return output_filename, True
+    # the code is streamed to a scratch file which replaces the output
+    # file once the translation succeeded.
+    tmp_name = "%s.%d.tmp" % (output_filename, os.getpid())
+    coding = inspect_source(source.decode("latin-1") if isinstance(source, bytes) else source)[0]
+    save_file = open(tmp_name, "w", encoding=coding or "utf-8")
+    try:
+        translate_source(source, module_name, save_file, fragment_cache, profile, sm)
+        with profile_stage(profile, "write"):
+            save_file.close()
+        os.rename(tmp_name, output_filename)
+        if sm is not None:
+            sm.save(output_filename + ".map")
+    except:
         save_file.close()
-        print "File written to:", output_filename
+        os.remove(tmp_name)
+        raise
+    if cache:
+        cache.put(key, output_filename)
+    return output_filename, False
+
+def find_python_files(paths):
+    """
+    Expand a list of files, directories and glob patterns into the list of
+    python files they contain.
+    """
+    files = []
+    for pattern in paths:
+        matches = glob.glob(pattern) or [pattern]
+        for path in sorted(matches):
+            if os.path.isdir(path):
+                for dirpath, dirnames, filenames in os.walk(path):
+                    dirnames.sort()
+                    for name in sorted(filenames):
+                        if name.endswith(".py"):
+                            files.append(os.path.join(dirpath, name))
+            elif path.endswith(".py") or path == pattern:
+                files.append(path)
+    seen = set()
+    return [f for f in files if not (f in seen or seen.add(f))]
+
+def batch_output_filename(file_name, output_dir=None):
+    """
+    Return the php file a batch translation writes file_name to: next to
+    its source, or in output_dir if one is given.
+    """
+    if output_dir is None:
+        return os.path.splitext(file_name)[0] + ".php"
+    return os.path.join(output_dir, default_output_filename(file_name))
+
+def _batch_worker(cache, source_map, output_dir, file_name):
+    start = time.time()
+    error = None
+    cached = False
+    try:
+        cached = translate_file(file_name, None, batch_output_filename(file_name, output_dir), cache,
+                                source_map=source_map)[1]
+    except Exception as e:
+        error = "%s: %s" % (e.__class__.__name__, "; ".join(str(e).splitlines()))
+    return file_name, time.time() - start, error, cached
+
+def translate_batch(files, jobs=None, out=None, slowest=10, cache=None, source_map=False,
+                    output_dir=None, results_filename=None):
+    """
+    Translate many python files, spread over a pool of worker processes.
+    Every file is written next to its source with a .php extension, or
+    into output_dir.  Failed files don't stop the run; a summary is printed
+    at the end, and with results_filename the outcome of every file is
+    written to it as JSON.  Returns the list of (file_name, error) for the
+    files that failed.
+    """
+    out = out or sys.stdout
+    worker = functools.partial(_batch_worker, cache, source_map, output_dir)
+    if not jobs:
+        jobs = multiprocessing.cpu_count()
+    jobs = max(1, min(jobs, len(files)))
+
+    start = time.time()
+    if jobs == 1:
+        results = [worker(f) for f in files]
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            chunksize = max(1, len(files) // (jobs * 8))
+            results = list(pool.imap_unordered(worker, files, chunksize))
+        finally:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - start
+
+    failed = [(f, error) for f, t, error, cached in results if error]
+    cached = len([r for r in results if r[3]])
+    rate = len(results) / elapsed if elapsed > 0 else 0.0
+    print("Translated %d files in %.2fs (%.1f files/sec, %d jobs), %d from cache, %d failed" % (
+        len(results), elapsed, rate, jobs, cached, len(failed)), file=out)
+    if failed:
+        print("Failed:", file=out)
+        for f, error in sorted(failed):
+            print("   %s: %s" % (f, error), file=out)
+    if slowest and results:
+        print("Slowest files:", file=out)
+        for f, t, error, cached in sorted(results, key=lambda r: -r[1])[:slowest]:
+            print("   %7.3fs  %s" % (t, f), file=out)
+    if results_filename:
+        with open(results_filename, "w") as f:
+            json.dump([{"file": file_name, "output": batch_output_filename(file_name, output_dir),
+                        "error": error} for file_name, t, error, cached in sorted(results)], f, indent=1)
+    return failed
+
+class Watcher:
+    """
+    Polls a source tree and re-translates the python files whose content
+    changed since the last poll.  Every file is written next to its source
+    with a .php extension, like in a batch translation.
+    """
+
+    def __init__(self, paths, cache=None, out=None, source_map=False):
+        self.paths = paths
+        self.cache = cache
+        self.out = out or sys.stdout
+        self.source_map = source_map
+        self.stats = {}
+        self.hashes = {}
+        self.fragments = FragmentCache()
+
+    def poll(self, report=True):
+        """
+        Translate the files that changed and report the time each one took.
+        Returns the list of (file_name, seconds, error) for those files.
+        """
+        results = []
+        files = find_python_files(self.paths)
+        for file_name in set(self.stats) - set(files):
+            del self.stats[file_name]
+            self.hashes.pop(file_name, None)
+        for file_name in files:
+            # the stat check keeps polling cheap, only files that were
+            # touched are read and hashed.
+            try:
+                st = os.stat(file_name)
+            except OSError:
+                continue
+            stat = (st.st_mtime, st.st_size)
+            if self.stats.get(file_name) == stat:
+                continue
+            self.stats[file_name] = stat
+            try:
+                pythonfile = open(file_name, "rb")
+                source = pythonfile.read()
+                pythonfile.close()
+            except IOError:
+                continue
+            digest = hashlib.sha1(source).hexdigest()
+            if self.hashes.get(file_name) == digest:
+                continue
+            self.hashes[file_name] = digest
+
+            start = time.time()
+            error = None
+            try:
+                output_filename = translate_file(file_name, None, os.path.splitext(file_name)[0] + ".php",
+                                                 self.cache, source, self.fragments,
+                                                 source_map=self.source_map)[0]
+            except Exception as e:
+                error = "%s: %s" % (e.__class__.__name__, "; ".join(str(e).splitlines()))
+            elapsed = time.time() - start
+            results.append((file_name, elapsed, error))
+            if report:
+                if error:
+                    print("failed %s: %s" % (file_name, error), file=self.out)
+                else:
+                    print("%s -> %s in %.1f ms" % (file_name, output_filename, elapsed * 1000), file=self.out)
+                self.out.flush()
+        return results
+
+    def run(self, interval=1.0):
+        results = self.poll(report=False)
+        failed = [r for r in results if r[2]]
+        print("Watching %d python files, %d translated, %d failed" % (
+            len(self.stats), len(results) - len(failed), len(failed)), file=self.out)
+        for file_name, elapsed, error in failed:
+            print("failed %s: %s" % (file_name, error), file=self.out)
+        self.out.flush()
+        while True:
+            time.sleep(interval)
+            self.poll()
+
+def translation_job(job, cache=None, fragment_cache=None):
+    """
+    Run a single translation job for the translation server.
+
+    A job is a dict with either a "path" to a python file or the "source"
+    text itself, and optionally a "module_name".  If "output" is given the
+    php code is written to that file, otherwise it is returned as "php".
+    Failures are returned as an "error" with the exception type, the
+    message and the line number if it is known.  A FragmentCache shared by
+    the jobs spares retranslating the unchanged definitions of a file.
+    """
+    result = {}
+    if "id" in job:
+        result["id"] = job["id"]
+    module_name = job.get("module_name")
+    try:
+        if "source" in job:
+            php_code = translate_source(job["source"], module_name, None, fragment_cache)
+            if job.get("output"):
+                save_file = open(job["output"], "wb")
+                save_file.write(php_code.encode("utf-8"))
+                save_file.close()
+                result["output"] = job["output"]
+            else:
+                result["php"] = php_code
+        elif "path" in job:
+            if job.get("output"):
+                result["output"], result["cached"] = translate_file(job["path"], module_name, job["output"], cache,
+                                                                    None, fragment_cache)
+            else:
+                pythonfile = open(job["path"], "rb")
+                result["php"] = translate_source(pythonfile.read(), module_name, None, fragment_cache)
+                pythonfile.close()
+        else:
+            raise ValueError("job needs a 'path' or a 'source'")
+    except Exception as e:
+        result["error"] = {"type": e.__class__.__name__,
+                           "message": str(e),
+                           "lineno": getattr(e, "lineno", None)}
+    return result
+
+def serve(infile, outfile, cache=None, fragment_cache=None):
+    """
+    Read translation jobs as JSON lines from infile and write one JSON
+    result line per job to outfile, until infile is exhausted.
+    """
+    if fragment_cache is None:
+        fragment_cache = FragmentCache()
+    while True:
+        line = infile.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("a job must be a JSON object")
+        except ValueError as e:
+            result = {"error": {"type": "ValueError", "message": str(e), "lineno": None}}
+        else:
+            result = translation_job(job, cache, fragment_cache)
+        outfile.write(json.dumps(result) + "\n")
+        outfile.flush()
+
+class TranslationRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        infile = io.TextIOWrapper(self.rfile, encoding="utf-8")
+        outfile = io.TextIOWrapper(self.wfile, encoding="utf-8")
+        serve(infile, outfile, self.server.cache, self.server.fragments)
+
+def serve_unix_socket(socket_path, cache=None):
+    """
+    Serve translation jobs on a unix socket.  Every connection is a stream
+    of JSON lines, handled like the jobs of serve().
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socketserver.UnixStreamServer(socket_path, TranslationRequestHandler)
+    server.cache = cache
+    server.fragments = FragmentCache()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+class ProfileRemapper:
+    """
+    Rewrites the php files and lines of a profile into the python files
+    and lines recorded in the source maps of the translated files.  Folded
+    stacks (one "frame;frame;... count" line per stack, as written by
+    Excimer or the flamegraph stackcollapse scripts) and callgrind files
+    (Xdebug) are understood.  Frames of files without a source map are left
+    alone; function names need no rewriting, they are the python ones.
+    """
+
+    FRAME_LOCATION_RE = re.compile(r"([^;\s()]+\.php)(?::(\d+)|\((\d+)\))")
+    CALLGRIND_FILE_RE = re.compile(r"^(fl|fi|fe|cfi|cfl)=(?:\((\d+)\))?\s*(.*)$")
+    CALLGRIND_HEADER_RE = re.compile(r"^(# callgrind format|version:|creator:|cmd:|pid:|events:|positions:)")
+
+    def __init__(self, map_dirs=()):
+        self.map_dirs = list(map_dirs)
+        self.maps = {}
+
+    def sourceMap(self, php_file):
+        """
+        Return the source map of php_file, looked up next to it and then in
+        the map_dirs, or None.
+        """
+        if php_file not in self.maps:
+            source_map = None
+            map_name = os.path.basename(php_file) + ".map"
+            for map_file in [php_file + ".map"] + [os.path.join(d, map_name) for d in self.map_dirs]:
+                if os.path.isfile(map_file):
+                    source_map = SourceMap.load(map_file)
+                    break
+            self.maps[php_file] = source_map
+        return self.maps[php_file]
+
+    def pythonFile(self, php_file):
+        source_map = self.sourceMap(php_file)
+        if source_map is None:
+            return None
+        return source_map["source"]
+
+    def pythonLine(self, php_file, line):
+        """
+        Return the python line of a php line, or None if it is not mapped.
+        """
+        source_map = self.sourceMap(php_file)
+        if source_map is None:
+            return None
+        lines = source_map["lines"]
+        if 1 <= line <= len(lines):
+            return lines[line - 1]
+        return None
+
+    def remap(self, infile, outfile):
+        lines = infile.readlines()
+        for line in lines:
+            if line.strip():
+                if self.CALLGRIND_HEADER_RE.match(line):
+                    self.remapCallgrind(lines, outfile)
+                else:
+                    self.remapFolded(lines, outfile)
+                return
+        outfile.writelines(lines)
+
+    def remapFrame(self, match):
+        php_file = match.group(1)
+        python_file = self.pythonFile(php_file)
+        python_line = self.pythonLine(php_file, int(match.group(2) or match.group(3)))
+        if python_file is None or python_line is None:
+            return match.group(0)
+        return "%s:%d" % (python_file, python_line)
+
+    def remapFolded(self, lines, outfile):
+        for line in lines:
+            stack, sep, count = line.rstrip("\n").rpartition(" ")
+            if not sep:
+                stack, count = count, ""
+            outfile.write(self.FRAME_LOCATION_RE.sub(self.remapFrame, stack) + sep + count + "\n")
+
+    def remapCallgrind(self, lines, outfile):
+        # positions are mapped to absolute python lines; relative ones
+        # ("+2", "-1", "*") are resolved against the last php position.
+        names = {}
+        files = {"fl": None, "fi": None, "cfi": None}
+        line_index = 0
+        last = 0
+        calls = False
+        for line in lines:
+            text = line.rstrip("\n")
+            match = self.CALLGRIND_FILE_RE.match(text)
+            if match:
+                kind, file_id, name = match.groups()
+                if name:
+                    if file_id:
+                        names[file_id] = name
+                    python_file = self.pythonFile(name)
+                    if python_file:
+                        text = "%s=%s%s" % (kind, "(%s) " % file_id if file_id else "", python_file)
+                else:
+                    name = names.get(file_id)
+                kind = {"fe": "fi", "cfl": "cfi"}.get(kind, kind)
+                files[kind] = name
+                if kind == "fl":
+                    files["fi"] = name
+            elif text.startswith("positions:"):
+                positions = text.split(":", 1)[1].split()
+                if "line" in positions:
+                    line_index = positions.index("line")
+            elif text.startswith("calls="):
+                count, sep, target = text[len("calls="):].partition(" ")
+                target = target.split()
+                if len(target) > line_index:
+                    # without a cfi= line the call goes to the current file
+                    target[line_index] = self.callgrindLine(files["cfi"] or files["fi"], target[line_index], last)[0]
+                text = "calls=" + count + sep + " ".join(target)
+                calls = True
+            elif text[:1].isdigit() or text[:1] in "+-*":
+                fields = text.split()
+                if len(fields) > line_index:
+                    fields[line_index], last = self.callgrindLine(files["fi"], fields[line_index], last)
+                text = " ".join(fields)
+                if calls:
+                    # the cost line of a call ends the call
+                    files["cfi"] = None
+                    calls = False
+            outfile.write(text + "\n")
+
+    def callgrindLine(self, php_file, position, last):
+        """
+        Return the python line for a callgrind position in php_file and the
+        absolute php line it stands for.
+        """
+        if position == "*":
+            line = last
+        elif position[:1] in "+-":
+            line = last + int(position)
+        else:
+            try:
+                line = int(position, 0)
+            except ValueError:
+                return position, last
+        python_line = None
+        if php_file is not None and self.pythonFile(php_file):
+            python_line = self.pythonLine(php_file, line) or 0
+        if python_line is None:
+            return str(line), line
+        return str(python_line), line
+
+def main(argv):
+    usage = "Usage: py2php.py pythonscript.py\nThis will produce a php script called pythonscript.php"
+    arg_parser = argparse.ArgumentParser(usage="%(prog)s [options] pythonscript.py [module_name]\n"
+                                               "       %(prog)s --batch [-j N] [-o DIR] [--results FILE] PATH...\n"
+                                               "       %(prog)s --server [--socket PATH]\n"
+                                               "       %(prog)s --watch [--interval SECONDS] PATH...\n"
+                                               "       %(prog)s --project [-j N] [-o DIR] [-L DIR] app.py\n"
+                                               "       %(prog)s --remap-profile [--map-dir DIR] [PROFILE...]")
+    arg_parser.add_argument("args", nargs="*", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--batch", action="store_true",
+                            help="translate all python files in the given directories, "
+                                 "files and glob patterns; each file is written next to its source, "
+                                 "or into -o DIR")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None,
+                            help="number of worker processes for --batch (default: number of cores)")
+    arg_parser.add_argument("--server", action="store_true",
+                            help="keep running and translate the jobs read as JSON lines from "
+                                 "stdin (or from --socket), one JSON result line per job")
+    arg_parser.add_argument("--socket", default=None,
+                            help="unix socket to serve translation jobs on, implies --server")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="keep running and re-translate the python files in the given "
+                                 "directories, files and glob patterns whenever their content changes")
+    arg_parser.add_argument("--interval", type=float, default=1.0,
+                            help="seconds between two polls of the source tree for --watch (default: 1)")
+    arg_parser.add_argument("--project", action="store_true",
+                            help="translate the application and every module it imports, "
+                                 "each into a php file of its own")
+    arg_parser.add_argument("-o", "--output-dir", default=None,
+                            help="directory the --project modules (default: .) or the --batch "
+                                 "files (default: next to their sources) are written to")
+    arg_parser.add_argument("--results", default=None, metavar="FILE",
+                            help="write the output file or the error of every --batch file "
+                                 "to FILE as JSON")
+    arg_parser.add_argument("-L", "--library-dir", action="append", default=[],
+                            help="directory to search imported modules in for --project, "
+                                 "in addition to the one of the application (repeatable)")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="time the stages of the translation and every translator handler, "
+                                 "print them as a table and dump them as JSON; implies --no-cache")
+    arg_parser.add_argument("--profile-json", default=None, metavar="FILE",
+                            help="file the --profile JSON is written to "
+                                 "(default: the output file with a .profile.json extension)")
+    arg_parser.add_argument("--source-map", action="store_true",
+                            help="write a .map file next to every php file, mapping its lines to "
+                                 "the python lines (see --remap-profile); implies --no-cache")
+    arg_parser.add_argument("--remap-profile", action="store_true",
+                            help="print the given folded stack or callgrind profiles (default: stdin) "
+                                 "with the php files and lines replaced by the python ones of their .map files")
+    arg_parser.add_argument("--map-dir", action="append", default=[],
+                            help="directory to look for the .map files of --remap-profile in, when they "
+                                 "are not next to the php files of the profile (repeatable)")
+    arg_parser.add_argument("--no-cache", dest="cache", action="store_false",
+                            help="always translate, don't use the translation cache")
+    arg_parser.add_argument("--cache-dir", default=None,
+                            help="directory of the translation cache "
+                                 "(default: $PY2PHP_CACHE_DIR or ~/.cache/py2php)")
+    arg_parser.add_argument("--cache-size", type=int, default=256,
+                            help="maximum size of the translation cache in MB (default: 256)")
+    options = arg_parser.parse_args(argv[1:])
+
+    if options.profile_json:
+        options.profile = True
+    if options.profile:
+        if options.batch or options.server or options.socket or options.watch or options.project:
+            arg_parser.error("--profile works on a single python script")
+        options.cache = False
+    if options.source_map:
+        if options.server or options.socket:
+            arg_parser.error("--source-map does not work with --server")
+        options.cache = False
+
+    if options.remap_profile:
+        remapper = ProfileRemapper(options.map_dir)
+        if not options.args:
+            remapper.remap(sys.stdin, sys.stdout)
+        for profile_filename in options.args:
+            with open(profile_filename) as f:
+                remapper.remap(f, sys.stdout)
+        return 0
+
+    cache = None
+    if options.cache:
+        cache = TranslationCache(options.cache_dir, options.cache_size * 1024 * 1024)
+
+    if options.socket:
+        try:
+            serve_unix_socket(options.socket, cache)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if options.server:
+        serve(sys.stdin, sys.stdout, cache)
+        return 0
+
+    if options.watch:
+        if not options.args:
+            options.args = ["."]
+        try:
+            Watcher(options.args, cache, source_map=options.source_map).run(options.interval)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if options.project:
+        if len(options.args) != 1:
+            arg_parser.error("--project needs exactly one application module")
+        app_file = options.args[0]
+        module_name = os.path.splitext(os.path.basename(app_file))[0]
+        library_dirs = [os.path.abspath(os.path.dirname(app_file))]
+        library_dirs += [os.path.abspath(d) for d in options.library_dir]
+        options.output_dir = options.output_dir or "."
+        if not os.path.isdir(options.output_dir):
+            os.makedirs(options.output_dir)
+        app_translator = AppTranslator(library_dirs)
+        app_translator.source_map = options.source_map
+        failed = app_translator.translateProject(module_name, options.output_dir, options.jobs)
+        return 1 if failed else 0
+
+    if options.batch:
+        files = find_python_files(options.args)
+        if not files:
+            print("No python files found.")
+            return 1
+        if options.output_dir and not os.path.isdir(options.output_dir):
+            os.makedirs(options.output_dir)
+        failed = translate_batch(files, options.jobs, cache=cache, source_map=options.source_map,
+                                 output_dir=options.output_dir, results_filename=options.results)
+        return 1 if failed else 0
+
+    if not options.args:
+        print(usage)
+        return 0
+
+    file_name = options.args[0]
+    if len(options.args) > 1:
+        module_name = options.args[1]
+    else:
+        module_name = None
+
+    pythonfile = open(file_name, "rb")
+    coding = inspect_source(pythonfile.read().decode("latin-1"))[0]
+    pythonfile.close()
+    if coding:
+        print("coding of the file:", coding)
+
+    profile = None
+    if options.profile:
+        profile = TranslationProfile()
+    output_filename = translate_file(file_name, module_name, cache=cache, profile=profile,
+                                     source_map=options.source_map)[0]
+    print("File written to:", output_filename)
+    if options.source_map:
+        print("Source map written to:", output_filename + ".map")
+    if profile:
+        profile.report()
+        profile_filename = options.profile_json or os.path.splitext(output_filename)[0] + ".profile.json"
+        with open(profile_filename, "w") as f:
+            json.dump(profile.as_dict(), f, indent=2, sort_keys=True)
+        print("Profile written to:", profile_filename)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
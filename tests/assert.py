@@ -1,3 +1,3 @@
 assert 5 > 2, "logic error"
 
-print "OK"
\ No newline at end of file
+print("OK")
\ No newline at end of file
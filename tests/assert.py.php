@@ -1,6 +1,6 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 assert((5 > 2), 'logic error');
 pyjslib_printnl('OK');
 
+
@@ -4,8 +4,8 @@ idx = 0
 idx += 3
 idx -= 1
 idx *= 4
-idx /= 3
+idx //= 3
 
 arr[idx] += 1
 
-print idx, arr[idx]
\ No newline at end of file
+print(idx, arr[idx])
\ No newline at end of file
@@ -2,6 +2,6 @@
 
 a = [1,2,3,4,5]
 
-print repr(a)
+print(repr(a))
 
-print `a`
\ No newline at end of file
+print(repr(a))
\ No newline at end of file
@@ -17,4 +17,4 @@ b.deposit(50)
 b.withdraw(10)
 balance = a.withdraw(10)
 
-print "balance:", balance
+print("balance:", balance)
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 class BankAccount {
     function __construct() {
@@ -10,7 +9,7 @@ class BankAccount {
         return $this->balance;
     }
     function deposit($amount) {
-        $this->balance += $amount;
+        $this->balance = pyjslib_add($this->balance, $amount);
         return $this->balance;
     }
 }
@@ -22,3 +21,4 @@ $b->withdraw(10);
 $balance = $a->withdraw(10);
 pyjslib_printnl(['balance:', $balance], true);
 
+
@@ -1,8 +1,10 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
+/* note: object is python base object, like stdObject in php.*/
+/* inherititng from it is redundant, but should not break translated php.*/
 class myclass extends stdClass {
     function __construct() {
     }
 }
 
+
@@ -15,4 +15,4 @@ m = a == b
 n = a == b == c
 o = a == b == c > h
 
-print a,b,c,d,e,f,g,h,i,j,k,l,m,o
+print(a,b,c,d,e,f,g,h,i,j,k,l,m,o)
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 $a = (1 == 1);
 $b = (1 < 2);
@@ -18,3 +17,4 @@ $n = ($a == $b) && ($b == $c);
 $o = ($a == $b) && ($b == $c) && ($c > $h);
 pyjslib_printnl([$a, $b, $c, $d, $e, $f, $g, $h, $i, $j, $k, $l, $m, $o], true);
 
+
@@ -4,4 +4,4 @@ del foo
 bar = [1,2,3]
 del bar[1]
 
-print bar
+print(bar)
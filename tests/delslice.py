@@ -2,20 +2,20 @@
 
 l = [1,2,3,4,5,6]
 del l[2:5]
-print l
+print(l)
 
 
 
 l = [1,2,3,4,5,6]
 del l[:5]
-print l
+print(l)
 
 l = [1,2,3,4,5,6]
 del l[2:]
-print l
+print(l)
 
 
 l = [1,2,3,4,5,6]
 del l[:]
-print l
+print(l)
 
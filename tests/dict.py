@@ -6,7 +6,7 @@ e = dict({'three': 3, 'one': 1, 'two': 2})
 f = dict()
 
 def print_dict(d):
-    print d["one"], d["two"], d["three"]
+    print(d["one"], d["two"], d["three"])
 
 print_dict(a)
 print_dict(b)
@@ -14,4 +14,4 @@ print_dict(c)
 print_dict(d)
 print_dict(e)
 
-print a == b == c == d == e
+print(a == b == c == d == e)
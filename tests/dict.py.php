@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 $a = py2php_kwargs_function_call('pyjslib_dict', [], ["one" => 1,"two" => 2,"three" => 3]);
 $b = ['one' => 1, 'two' => 2, 'three' => 3];
@@ -17,3 +16,4 @@ print_dict($d);
 print_dict($e);
 pyjslib_printnl(($a == $b) && ($b == $c) && ($c == $d) && ($d == $e));
 
+
@@ -1,8 +1,7 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 function find($ordered_list,$element_to_find) {
-    foreach( pyjslib_list($ordered_list) as $element ) {
+    foreach( pyjslib_iter($ordered_list) as $element ) {
         if (($element == $element_to_find)) {
             return true;
         }
@@ -15,3 +14,4 @@ pyjslib_printnl(find($l, 10));
 pyjslib_printnl(find($l, -1));
 pyjslib_printnl(find($l, 2));
 
+
@@ -5,7 +5,7 @@ class ValidationException(Exception):
     pass
 
 try:
-    print 'hi'
+    print('hi')
 except ZeroDivisionError:
     pass
 
@@ -20,14 +20,14 @@ def div(x,y):
         result = x / y
         
     except ZeroDivisionException:
-        print "division by zero!"
+        print("division by zero!")
     except ValidationException:
-        print "Values must be greater than 0!"
+        print("Values must be greater than 0!")
 #   else clause not supported in PHP or py2php
 #    else:
 #        print "result is", result
     finally:
-        print "executing finally clause"
+        print("executing finally clause")
         
 div(-1,3)
 div(4,0)
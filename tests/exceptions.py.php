@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 class ZeroDivisionException extends Exception {
 }
@@ -27,6 +26,9 @@ function div($x,$y) {
                 pyjslib_printnl('Values must be greater than 0!');
     }
     finally {
+        /*   else clause not supported in PHP or py2php*/
+        /*    else:*/
+        /*        print "result is", result*/
         pyjslib_printnl('executing finally clause');
     }
 }
@@ -34,3 +36,4 @@ div(-1, 3);
 div(4, 0);
 div(0, 4);
 
+
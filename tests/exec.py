@@ -3,15 +3,15 @@ b = "6"
 c = 7
 """)
 
-print a
+print(a)
 
 exec( 'd = 8' )
 
-exec( 'print c + d' )
+exec( 'print(c + d)' )
 
 
 def myfunc(a,b):
-    print a+b
+    print(a+b)
 
 code = 'myfunc(1,6);'
 exec(code)
@@ -1,11 +1,11 @@
 def sum(a, b):
     return a + b
 values = (1, 2)
-print sum(*values)
+print(sum(*values))
 
 
 values = { 'a': 1, 'b': 2 }
-print sum(**values)
+print(sum(**values))
 
 
 def sum2(a, b, c, d):
@@ -23,7 +23,7 @@ def sum3(*values):
         s = s + v
     return s
 
-print sum3(1, 2, 3, 4, 5)
+print(sum3(1, 2, 3, 4, 5))
 
 # This test is not working yet. PHP variadic params are ordered - only.
 #
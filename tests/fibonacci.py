@@ -14,4 +14,4 @@ def gen_fib(count):
 
     return fib
 
-print gen_fib(10)
+print(gen_fib(10))
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 function gen_fib($count) {
     $i = 1;
@@ -15,7 +14,7 @@ function gen_fib($count) {
     else if (($count > 2)) {
         $fib = [1, 1];
         while (($i < ($count - 1))) {
-            $fib[] = ($fib[$i] + $fib[($i - 1)]);
+            $fib[] = pyjslib_add($fib[$i], $fib[($i - 1)]);
             $i += 1;
         }
     }
@@ -23,3 +22,4 @@ function gen_fib($count) {
 }
 pyjslib_printnl(gen_fib(10));
 
+
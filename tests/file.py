@@ -7,23 +7,23 @@ f_out = open(outfile, 'w')
 lines = f_in.readlines()
 f_out.writelines(lines[:4])
 
-print f_out.closed
+print(f_out.closed)
 
 f_in.close()
 f_out.close()
 
-print f_out.closed
+print(f_out.closed)
 
-print "---"
+print("---")
 
 f_iter = open('/tmp/file.py.test')
 
 for line in f_iter:
-    print line ,
+    print(line, end=' ')
 
-print "---"
+print("---")
     
 f_iter.seek(20)
-print f_iter.read(10)
+print(f_iter.read(10))
 
 os.remove( outfile )
\ No newline at end of file
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 require_once( 'os.php');
 $f_in = pyjslib_open('file.py');
@@ -13,7 +12,7 @@ $f_out->close();
 pyjslib_printnl($f_out->closed);
 pyjslib_printnl('---');
 $f_iter = pyjslib_open('/tmp/file.py.test');
-foreach( pyjslib_list($f_iter) as $line ) {
+foreach( pyjslib_iter($f_iter) as $line ) {
     pyjslib_print($line);
 }
 pyjslib_printnl('---');
@@ -21,3 +20,4 @@ $f_iter->seek(20);
 pyjslib_printnl($f_iter->read(10));
 os::remove($outfile);
 
+
@@ -1,9 +1,10 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 $map = ['fname' => 'woody', 'lname' => 'woodpecker', 'species' => 'bird', 'gender' => 'male'];
 $map2 = [];
-foreach( pyjslib_list($map) as $k => $v ) {
+/* python dicts are unsorted, so if we just print inside the foreach*/
+/* then php output will differ.*/
+foreach( pyjslib_iter($map) as $k => $v ) {
     $map2[$k] = $v;
 }
 pyjslib_printnl($map2['fname']);
@@ -11,7 +12,7 @@ pyjslib_printnl($map2['lname']);
 pyjslib_printnl($map2['species']);
 pyjslib_printnl($map2['gender']);
 $map2 = [];
-foreach( pyjslib_list($map) as $k => $v ) {
+foreach( pyjslib_iter($map) as $k => $v ) {
     $map2[$k] = $v;
 }
 pyjslib_printnl($map2['fname']);
@@ -19,3 +20,4 @@ pyjslib_printnl($map2['lname']);
 pyjslib_printnl($map2['species']);
 pyjslib_printnl($map2['gender']);
 
+
@@ -1,5 +1,5 @@
 a = [[1,[2,3]], [4,[5,6]],[7,[8,9]]]
 
 for b, (c, d) in a:
-    print b, c, d
+    print(b, c, d)
 
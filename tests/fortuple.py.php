@@ -1,8 +1,8 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 $a = [[1, [2, 3]], [4, [5, 6]], [7, [8, 9]]];
-foreach( pyjslib_list($a) as list($b, list($c, $d)) ) {
+foreach( $a as list($b, list($c, $d)) ) {
     pyjslib_printnl([$b, $c, $d], true);
 }
 
+
@@ -1,9 +1,8 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 function mul_string($str,$size) {
     $buf = '';
-    foreach( pyjslib_list(pyjslib_range($size)) as $x ) {
+    for ($x = 0; $x < $size; $x++) {
         $buf = $buf . $str;
     }
     return $buf;
@@ -15,9 +14,10 @@ function print_vert_line($size) {
     pyjslib_printnl(mul_string('|    ', ($size + 1)));
 }
 $board_size = 6;
-foreach( pyjslib_list(pyjslib_range($board_size)) as $index ) {
+for ($index = 0; $index < $board_size; $index++) {
     print_horiz_line($board_size);
     print_vert_line($board_size);
 }
 print_horiz_line($board_size);
 
+
@@ -1,38 +1,47 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list([1, 2, 3]) as $x ) {yield ($x * 2);}}, get_defined_vars() )));
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {yield ($x * 2);}}, get_defined_vars() )));
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {yield ($x * 2);}}, get_defined_vars() )));
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(3)) as $i ) {yield 'Bom dia ' . pyjslib_str($i);}}, get_defined_vars() )) as $x ) {
+pyjslib_printnl((function() { $__sum1 = 0; foreach( [1, 2, 3] as $x ) {$__sum1 += ($x * 2);} return $__sum1; })());
+pyjslib_printnl((function() { $__sum2 = 0; foreach( pyjslib_range(10) as $x ) {$__sum2 += ($x * 2);} return $__sum2; })());
+pyjslib_printnl((function() { $__sum3 = 0; foreach( pyjslib_range(10) as $x ) {$__sum3 += ($x * 2);} return $__sum3; })());
+foreach( (function() { foreach( pyjslib_range(3) as $i ) {yield 'Bom dia ' . pyjslib_str($i);}})() as $x ) {
     pyjslib_printnl($x);
 }
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list('abc') as $x ) {yield $x;}}, get_defined_vars() )) as $y ) {
+foreach( (function() { foreach( pyjslib_iter_str('abc') as $x ) {yield $x;}})() as $y ) {
     pyjslib_printnl($y);
 }
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(4)) as $x ) {if((($x % 2) == 0)) yield $x;}}, get_defined_vars() )));
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(4)) as $x ) {if((($x % 2) == 0)) foreach( pyjslib_list(pyjslib_range(8)) as $y ) {if((($y % 2) != 0)) foreach( pyjslib_list(pyjslib_range(16)) as $z ) {if((($z % 3) == 0)) yield $x;}}}}, get_defined_vars() )));
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {yield pow($x, 2);}}, get_defined_vars() )));
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {if((($x % 2) == 0)) yield pow($x, 2);}}, get_defined_vars() )));
-pyjslib_printnl(pyjslib_sum(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {if(!((($x % 2) == 0))) yield pow($x, 2);}}, get_defined_vars() )));
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list([1, 2, 3]) as $x ) {foreach( pyjslib_list('abc') as $y ) {foreach( pyjslib_list('xyz') as $z ) {yield [$x, $y, $z];}}}}, get_defined_vars() )) as $a ) {
+pyjslib_printnl((function() { $__sum4 = 0; foreach( pyjslib_range(4) as $x ) {if((($x % 2) == 0)) $__sum4 += $x;} return $__sum4; })());
+pyjslib_printnl((function() { $__sum5 = 0; foreach( pyjslib_range(4) as $x ) {if((($x % 2) == 0)) foreach( pyjslib_range(8) as $y ) {if((($y % 2) != 0)) foreach( pyjslib_range(16) as $z ) {if((($z % 3) == 0)) $__sum5 += $x;}}} return $__sum5; })());
+pyjslib_printnl((function() { $__sum6 = 0; foreach( pyjslib_range(10) as $x ) {$__sum6 += pow($x, 2);} return $__sum6; })());
+/* single conditional*/
+pyjslib_printnl((function() { $__sum7 = 0; foreach( pyjslib_range(10) as $x ) {if((($x % 2) == 0)) $__sum7 += pow($x, 2);} return $__sum7; })());
+/* single not conditional*/
+pyjslib_printnl((function() { $__sum8 = 0; foreach( pyjslib_range(10) as $x ) {if(!((($x % 2) == 0))) $__sum8 += pow($x, 2);} return $__sum8; })());
+/* nested for*/
+foreach( (function() { foreach( [1, 2, 3] as $x ) {foreach( pyjslib_iter_str('abc') as $y ) {foreach( pyjslib_iter_str('xyz') as $z ) {yield [$x, $y, $z];}}}})() as $a ) {
     pyjslib_printnl($a);
 }
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list([1, 2, 3]) as $x ) {foreach( pyjslib_list([3, 1, 4]) as $y ) {if(($x != $y)) yield [$x, $y];}}}, get_defined_vars() )) as $a ) {
+/* nested for with conditional*/
+foreach( (function() { foreach( [1, 2, 3] as $x ) {foreach( [3, 1, 4] as $y ) {if(($x != $y)) yield [$x, $y];}}})() as $a ) {
     pyjslib_printnl($a);
 }
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(100)) as $y ) {if((($y % 2) == 0)) if((($y % 5) == 0)) foreach( pyjslib_list('ab') as $z ) {yield [$y, $z];}}}, get_defined_vars() )) as $a ) {
+/* nested conditionals*/
+foreach( (function() { foreach( pyjslib_range(100) as $y ) {if((($y % 2) == 0)) if((($y % 5) == 0)) foreach( pyjslib_iter_str('ab') as $z ) {yield [$y, $z];}}})() as $a ) {
     pyjslib_printnl($a);
 }
+/* nested list comprehension*/
 $matrix = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]];
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(4)) as $i ) {yield pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list($matrix) as $row ) {yield $row[$i];}}, get_defined_vars() );}}, get_defined_vars() )) as $x ) {
-    foreach( pyjslib_list($x) as $y ) {
+/* this presently fails because matrix is defined outside generator function.*/
+foreach( (function() use ($matrix) { foreach( pyjslib_range(4) as $i ) {yield (function() use ($i, $matrix) { foreach( $matrix as $row ) {yield $row[$i];}})();}})() as $x ) {
+    foreach( pyjslib_iter($x) as $y ) {
         pyjslib_printnl($y);
     }
 }
-foreach( pyjslib_list(pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(4)) as $i ) {yield pyjslib_genexpr( function($__vars) { extract($__vars); foreach( pyjslib_list([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]]) as $row ) {yield $row[$i];}}, get_defined_vars() );}}, get_defined_vars() )) as $x ) {
-    foreach( pyjslib_list($x) as $y ) {
+/* this presently fails because i is defined in generator function 1, and row[i]*/
+/* is used in generator function 2, where i is undefined.*/
+foreach( (function() { foreach( pyjslib_range(4) as $i ) {yield (function() use ($i) { foreach( [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]] as $row ) {yield $row[$i];}})();}})() as $x ) {
+    foreach( pyjslib_iter($x) as $y ) {
         pyjslib_printnl($y);
     }
 }
 
+
@@ -8,5 +8,5 @@ class foo:
     
 
 f = foo()
-print hasattr( f, "bar" )
-print hasattr( f, "talk" )
\ No newline at end of file
+print(hasattr( f, "bar" ))
+print(hasattr( f, "talk" ))
\ No newline at end of file
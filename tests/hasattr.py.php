@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 class foo {
     function __construct() {
@@ -12,3 +11,4 @@ $f = new foo();
 pyjslib_printnl(method_exists($f, 'bar'));
 pyjslib_printnl(method_exists($f, 'talk'));
 
+
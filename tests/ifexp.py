@@ -5,4 +5,4 @@ c = 1+2 if a else 3 + 4
 
 d = (1+2 if a else 3 + 4) if ('Sally' if a else 'Mary') else 'Other'
 
-print b,c,d
+print(b,c,d)
@@ -0,0 +1,28 @@
+def letters(word):
+    for c in word:
+        print(c)
+
+letters("abc")
+# an empty string has no characters
+letters("")
+
+def upto(n):
+    i = 0
+    while i < n:
+        yield i
+        i += 1
+
+# a generator is iterated as it yields
+for i in upto(3):
+    print(i)
+
+d = {"a": 1}
+for key in d:
+    print(key)
+
+for x in [4, 5]:
+    print(x)
+
+print([c + "!" for c in "xy"])
+print([i * 2 for i in upto(3)])
+print(sum(i for i in range(4)))
@@ -0,0 +1,33 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function letters($word) {
+    foreach( pyjslib_iter($word) as $c ) {
+        pyjslib_printnl($c);
+    }
+}
+letters('abc');
+/* an empty string has no characters*/
+letters('');
+function upto($n) {
+    $i = 0;
+    while (($i < $n)) {
+        yield($i);
+        $i += 1;
+    }
+}
+/* a generator is iterated as it yields*/
+foreach( pyjslib_iter(upto(3)) as $i ) {
+    pyjslib_printnl($i);
+}
+$d = ['a' => 1];
+foreach( array_keys($d) as $key ) {
+    pyjslib_printnl($key);
+}
+foreach( [4, 5] as $x ) {
+    pyjslib_printnl($x);
+}
+pyjslib_printnl((function() { $__listcomp1 = []; foreach( pyjslib_iter_str('xy') as $c ) {$__listcomp1[] = $c . '!';} return $__listcomp1; })());
+pyjslib_printnl((function() { $__listcomp2 = []; foreach( pyjslib_iter(upto(3)) as $i ) {$__listcomp2[] = ($i * 2);} return $__listcomp2; })());
+pyjslib_printnl((function() { $__sum3 = 0; foreach( pyjslib_range(4) as $i ) {$__sum3 += $i;} return $__sum3; })());
+
+
@@ -0,0 +1,42 @@
+def info(text1, text2="World", spacing=10, collapse=False):
+    print(text1 + " " + text2 + " " + str(spacing) + " " + str(collapse))
+
+def shout(text):
+    print("shout " + text)
+    return text.upper()
+
+# keyword arguments in order, and defaults filled in between
+info("a", collapse=True)
+info(spacing=3, text1="b")
+# more than one keyword argument with side effects in a new order: helper
+info(text2=shout("x"), text1=shout("y"))
+
+
+class Greeter(object):
+    def __init__(self, name="nobody", loud=False):
+        self.name = name
+        self.loud = loud
+
+    def greet(self, greeting="hello", times=1):
+        print(greeting + " " + self.name + " " + str(times) + " " + str(self.loud))
+
+
+class LoudGreeter(Greeter):
+    def greet(self, greeting="HELLO", times=2):
+        print(greeting + "! " + self.name + " " + str(times))
+
+
+def local_instances():
+    g = Greeter(loud=True)
+    g.greet(times=3)
+    # the subclass is known exactly too
+    h = LoudGreeter(name="bob")
+    h.greet(times=5)
+    # bound to either class: the helper decides at run time
+    k = g
+    if h.name == "bob":
+        k = h
+    k.greet(greeting="hi")
+
+
+local_instances()
@@ -0,0 +1,44 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function info($text1,$text2='World',$spacing=10,$collapse=false) {
+    pyjslib_printnl($text1 . ' ' . $text2 . ' ' . pyjslib_str($spacing) . ' ' . pyjslib_str($collapse));
+}
+function shout($text) {
+    pyjslib_printnl('shout ' . $text);
+    return strtoupper($text);
+}
+/* keyword arguments in order, and defaults filled in between*/
+info('a', 'World', 10, true);
+info('b', 'World', 3);
+/* more than one keyword argument with side effects in a new order: helper*/
+py2php_kwargs_function_call('info', [], ["text2" => shout('x'),"text1" => shout('y')]);
+class Greeter extends stdClass {
+    function __construct($name='nobody',$loud=false) {
+        $this->name = $name;
+        $this->loud = $loud;
+    }
+    function greet($greeting='hello',$times=1) {
+        pyjslib_printnl($greeting . ' ' . $this->name . ' ' . pyjslib_str($times) . ' ' . pyjslib_str($this->loud));
+    }
+}
+class LoudGreeter extends Greeter {
+    function greet($greeting='HELLO',$times=2) {
+        pyjslib_printnl($greeting . '! ' . $this->name . ' ' . pyjslib_str($times));
+    }
+}
+function local_instances() {
+    $g = new Greeter('nobody', true);
+    $g->greet('hello', 3);
+    /* the subclass is known exactly too*/
+    $h = new LoudGreeter('bob');
+    $h->greet('HELLO', 5);
+    /* bound to either class: the helper decides at run time*/
+    $k = $g;
+    if (($h->name == 'bob')) {
+        $k = $h;
+    }
+    py2php_kwargs_method_call($k, null, 'greet', [], ["greeting" => 'hi']);
+}
+local_instances();
+
+
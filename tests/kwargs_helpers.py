@@ -0,0 +1,33 @@
+def describe(name, title="Mr", suffix="!"):
+    print(str(title) + " " + name + str(suffix))
+
+
+class Shape(object):
+    def __init__(self, sides=4, name="square"):
+        self.sides = sides
+        self.name = name
+
+    def show(self, prefix="shape", upper=False):
+        text = prefix + " " + self.name + " " + str(self.sides)
+        if upper:
+            text = text.upper()
+        print(text)
+
+
+class Triangle(Shape):
+    def show(self, prefix="triangle", upper=True):
+        print(prefix + " " + str(upper))
+
+
+# ** arguments always go through the helpers; a None value is passed
+# through instead of being replaced by the default
+options = {"title": None, "name": "smith"}
+describe(**options)
+describe(**{"name": "jones"})
+describe(**{"name": "brown"})
+
+shapes = [Shape(**{"sides": 3, "name": "tri"}), Triangle(**{"name": "t"})]
+for shape in shapes:
+    # the same method of two classes, each with its own defaults
+    shape.show(**{"upper": False})
+    shape.show(**{"prefix": "again"})
@@ -0,0 +1,37 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function describe($name,$title='Mr',$suffix='!') {
+    pyjslib_printnl(pyjslib_str($title) . ' ' . $name . pyjslib_str($suffix));
+}
+class Shape extends stdClass {
+    function __construct($sides=4,$name='square') {
+        $this->sides = $sides;
+        $this->name = $name;
+    }
+    function show($prefix='shape',$upper=false) {
+        $text = $prefix . ' ' . $this->name . ' ' . pyjslib_str($this->sides);
+        if ($upper) {
+            $text = strtoupper($text);
+        }
+        pyjslib_printnl($text);
+    }
+}
+class Triangle extends Shape {
+    function show($prefix='triangle',$upper=true) {
+        pyjslib_printnl($prefix . ' ' . pyjslib_str($upper));
+    }
+}
+/* ** arguments always go through the helpers; a None value is passed*/
+/* through instead of being replaced by the default*/
+$options = ['title' => null, 'name' => 'smith'];
+py2php_kwargs_function_call('describe', [], $options);
+py2php_kwargs_function_call('describe', [], ['name' => 'jones']);
+py2php_kwargs_function_call('describe', [], ['name' => 'brown']);
+$shapes = [py2php_kwargs_function_call('new Shape', [], ['sides' => 3, 'name' => 'tri']), py2php_kwargs_function_call('new Triangle', [], ['name' => 't'])];
+foreach( $shapes as $shape ) {
+    /* the same method of two classes, each with its own defaults*/
+    py2php_kwargs_method_call($shape, null, 'show', [], ['upper' => false]);
+    py2php_kwargs_method_call($shape, null, 'show', [], ['prefix' => 'again']);
+}
+
+
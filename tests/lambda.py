@@ -1,5 +1,5 @@
 result = lambda x: x*2
-print result(2)
+print(result(2))
 
-print (lambda x: x*2)(3)
+print((lambda x: x*2)(3))
 
@@ -1,5 +1,5 @@
-print list( "abc" )
-print list( [1,2,3] )
-print list( ('x', 'y', 'z' ) )
-print list( )
+print(list( "abc" ))
+print(list( [1,2,3] ))
+print(list( ('x', 'y', 'z' ) ))
+print(list( ))
 
@@ -1,15 +1,24 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {yield pow($x, 2);}}, get_defined_vars() ));
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {if((($x % 2) == 0)) yield pow($x, 2);}}, get_defined_vars() ));
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(10)) as $x ) {if(!((($x % 2) == 0))) yield pow($x, 2);}}, get_defined_vars() ));
-foreach( pyjslib_list(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list([1, 2, 3]) as $x ) {foreach( pyjslib_list('abc') as $y ) {foreach( pyjslib_list('xyz') as $z ) {yield [$x, $y, $z];}}}}, get_defined_vars() )) as $a ) {
+pyjslib_printnl((function() { $__listcomp1 = []; foreach( pyjslib_range(10) as $x ) {$__listcomp1[] = pow($x, 2);} return $__listcomp1; })());
+/* single conditional*/
+pyjslib_printnl((function() { $__listcomp2 = []; foreach( pyjslib_range(10) as $x ) {if((($x % 2) == 0)) $__listcomp2[] = pow($x, 2);} return $__listcomp2; })());
+/* single not conditional*/
+pyjslib_printnl((function() { $__listcomp3 = []; foreach( pyjslib_range(10) as $x ) {if(!((($x % 2) == 0))) $__listcomp3[] = pow($x, 2);} return $__listcomp3; })());
+/* nested for*/
+foreach( (function() { $__listcomp4 = []; foreach( [1, 2, 3] as $x ) {foreach( pyjslib_iter_str('abc') as $y ) {foreach( pyjslib_iter_str('xyz') as $z ) {$__listcomp4[] = [$x, $y, $z];}}} return $__listcomp4; })() as $a ) {
     pyjslib_printnl($a);
 }
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list([1, 2, 3]) as $x ) {foreach( pyjslib_list([3, 1, 4]) as $y ) {if(($x != $y)) yield [$x, $y];}}}, get_defined_vars() ));
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(100)) as $y ) {if((($y % 2) == 0)) if((($y % 5) == 0)) foreach( pyjslib_list('ab') as $z ) {yield [$y, $z];}}}, get_defined_vars() ));
+/* nested for with conditional*/
+pyjslib_printnl((function() { $__listcomp5 = []; foreach( [1, 2, 3] as $x ) {foreach( [3, 1, 4] as $y ) {if(($x != $y)) $__listcomp5[] = [$x, $y];}} return $__listcomp5; })());
+/* nested conditionals*/
+pyjslib_printnl((function() { $__listcomp6 = []; foreach( pyjslib_range(100) as $y ) {if((($y % 2) == 0)) if((($y % 5) == 0)) foreach( pyjslib_iter_str('ab') as $z ) {$__listcomp6[] = [$y, $z];}} return $__listcomp6; })());
+/* nested list comprehension*/
 $matrix = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]];
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(4)) as $i ) {yield pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list($matrix) as $row ) {yield $row[$i];}}, get_defined_vars() );}}, get_defined_vars() ));
-pyjslib_printnl(pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list(pyjslib_range(4)) as $i ) {yield pyjslib_listcomp( function($__vars) { extract($__vars); foreach( pyjslib_list([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]]) as $row ) {yield $row[$i];}}, get_defined_vars() );}}, get_defined_vars() ));
+/* this is a tricky case because matrix is defined outside generator function.*/
+pyjslib_printnl((function() use ($matrix) { $__listcomp7 = []; foreach( pyjslib_range(4) as $i ) {$__listcomp7[] = (function() use ($i, $matrix) { $__listcomp8 = []; foreach( $matrix as $row ) {$__listcomp8[] = $row[$i];} return $__listcomp8; })();} return $__listcomp7; })());
+/* this presently is a simpler case, but still tricky because i is defined in*/
+/* generator function 1, and row[i] is used in generator function 2, where i is undefined.*/
+pyjslib_printnl((function() { $__listcomp9 = []; foreach( pyjslib_range(4) as $i ) {$__listcomp9[] = (function() use ($i) { $__listcomp10 = []; foreach( [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]] as $row ) {$__listcomp10[] = $row[$i];} return $__listcomp10; })();} return $__listcomp9; })());
+
 
@@ -2,14 +2,14 @@
 class gabby:
     @staticmethod
     def talk(arg):
-        print arg
+        print(arg)
 
 
 def talk(arg):
-    print arg
+    print(arg)
 
 def talk2(arg1, arg2):
-    print arg1, arg2
+    print(arg1, arg2)
 
 l = [1,2,3,4,5,6]
 l2 = ['a', 'b', 'c']
@@ -27,7 +27,7 @@ def add(arg1, arg2):
         return None
     return arg1 + arg2
 
-print map(add, [1,2,3,4,5], [1,2,3,4,5,6,7,8])
+print(map(add, [1,2,3,4,5], [1,2,3,4,5,6,7,8]))
 
 
 
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 class gabby {
     static function talk($arg) {
@@ -23,7 +22,8 @@ function add($arg1,$arg2) {
     if (($arg1 == null) || ($arg2 == null)) {
         return;
     }
-    return ($arg1 + $arg2);
+    return pyjslib_add($arg1, $arg2);
 }
 pyjslib_printnl(pyjslib_map('add', [1, 2, 3, 4, 5], [1, 2, 3, 4, 5, 6, 7, 8]));
 
+
@@ -0,0 +1,49 @@
+def calls(n):
+    print("called")
+    return n
+
+def ranges(x, lo, items):
+    print(x in range(10))
+    print(x in range(lo, 10, 3))
+    print(x not in range(len(items)))
+    print(x in range(10, -1, -2))
+    # a bound with side effects is evaluated as range() would: once
+    print(x in range(calls(lo), 10))
+    print(x in range(lo, calls(10)))
+
+ranges(4, 1, [1, 2])
+ranges(5, 6, [])
+ranges(-1, 0, [1])
+
+def others(s):
+    print(2.5 in range(5))
+    print(s in range(5))
+    n = 3
+    print(n in range(5))
+
+others("2")
+
+def values(*items):
+    # python finds True and 1.0 in a range, but not 2.5 or "1"
+    for item in items:
+        print(item in range(3))
+
+values(1.0, True, 2.5, "1", False, 3.0)
+
+def containers(key, value):
+    d = {"a": 1, "b": 2}
+    print(key in d)
+    print(value in d.keys())
+    print(key in "abc")
+    print(value in [1, "b"])
+
+containers("a", "b")
+containers("z", 1)
+
+def unknown(container, item):
+    # the type of container is unknown
+    return item in container
+
+print(unknown("hello", "ell"))
+print(unknown([1, 2], 2))
+print(unknown((3, 4), 5))
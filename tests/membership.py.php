@@ -0,0 +1,50 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function calls($n) {
+    pyjslib_printnl('called');
+    return $n;
+}
+function ranges($x,$lo,$items) {
+    pyjslib_printnl(pyjslib_in_range($x, 0, 10));
+    pyjslib_printnl(pyjslib_in_range($x, $lo, 10, 3));
+    pyjslib_printnl(!pyjslib_in_range($x, 0, pyjslib_len($items)));
+    pyjslib_printnl(pyjslib_in_range($x, 10, -1, -2));
+    /* a bound with side effects is evaluated as range() would: once*/
+    pyjslib_printnl(in_array($x, pyjslib_range(calls($lo), 10)));
+    pyjslib_printnl(in_array($x, pyjslib_range($lo, calls(10))));
+}
+ranges(4, 1, [1, 2]);
+ranges(5, 6, []);
+ranges(-1, 0, [1]);
+function others($s) {
+    pyjslib_printnl(pyjslib_in_range(2.5, 0, 5));
+    pyjslib_printnl(pyjslib_in_range($s, 0, 5));
+    $n = 3;
+    pyjslib_printnl(($n >= 0 && $n < 5));
+}
+others('2');
+function values(...$items) {
+    /* python finds True and 1.0 in a range, but not 2.5 or "1"*/
+    foreach( $items as $item ) {
+        pyjslib_printnl(pyjslib_in_range($item, 0, 3));
+    }
+}
+values(1.0, true, 2.5, '1', false, 3.0);
+function containers($key,$value) {
+    $d = ['a' => 1, 'b' => 2];
+    pyjslib_printnl(array_key_exists($key, $d));
+    pyjslib_printnl(array_key_exists($value, $d));
+    pyjslib_printnl((strpos('abc', $key) !== false));
+    pyjslib_printnl(in_array($value, [1, 'b']));
+}
+containers('a', 'b');
+containers('z', 1);
+function unknown($container,$item) {
+    /* the type of container is unknown*/
+    return pyjslib_in($item, $container);
+}
+pyjslib_printnl(unknown('hello', 'ell'));
+pyjslib_printnl(unknown([1, 2], 2));
+pyjslib_printnl(unknown([3, 4], 5));
+
+
@@ -1,12 +1,12 @@
 
 def info(text1, text2="World", spacing=10, collapse=False):
-    print text1,
+    print(text1, end=' ')
     
     if not collapse:
         for i in range(1,spacing):
-            print " ",
+            print(" ", end=' ')
             
-    print text2    
+    print(text2)    
     
 info("hello")
 info("hullo", "Mars", 12)
@@ -23,23 +23,23 @@ class foo(object):
             self.info(text1, text2, spacing, collapse)        
         
     def info(self, text1, text2="World", spacing=10, collapse=False):
-        print text1,
+        print(text1, end=' ')
         
         if not collapse:
             for i in range(1,spacing):
-                print " ",
+                print(" ", end=' ')
                 
-        print text2
+        print(text2)
         
     @staticmethod
     def staticinfo(text1, text2="World", spacing=10, collapse=False):
-        print text1,
+        print(text1, end=' ')
         
         if not collapse:
             for i in range(1,spacing):
-                print " ",
+                print(" ", end=' ')
                 
-        print text2    
+        print(text2)    
         
 
 f = foo()
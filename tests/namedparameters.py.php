@@ -1,10 +1,9 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 function info($text1,$text2='World',$spacing=10,$collapse=false) {
     pyjslib_print($text1);
     if (!($collapse)) {
-        foreach( pyjslib_list(pyjslib_range(1, $spacing)) as $i ) {
+        for ($i = 1; $i < $spacing; $i++) {
             pyjslib_print(' ');
         }
     }
@@ -12,8 +11,8 @@ function info($text1,$text2='World',$spacing=10,$collapse=false) {
 }
 info('hello');
 info('hullo', 'Mars', 12);
-py2php_kwargs_function_call('info', ['hey'], ["collapse" => true]);
-py2php_kwargs_function_call('info', [], ["spacing" => 15,"text1" => 'hello']);
+info('hey', 'World', 10, true);
+info('hello', 'World', 15);
 $kwargs = ['text1' => 'silly', 'text2' => 'goose'];
 py2php_kwargs_function_call('info', [], $kwargs);
 class foo extends stdClass {
@@ -25,7 +24,7 @@ class foo extends stdClass {
     function info($text1,$text2='World',$spacing=10,$collapse=false) {
         pyjslib_print($text1);
         if (!($collapse)) {
-            foreach( pyjslib_list(pyjslib_range(1, $spacing)) as $i ) {
+            for ($i = 1; $i < $spacing; $i++) {
                 pyjslib_print(' ');
             }
         }
@@ -34,7 +33,7 @@ class foo extends stdClass {
     static function staticinfo($text1,$text2='World',$spacing=10,$collapse=false) {
         pyjslib_print($text1);
         if (!($collapse)) {
-            foreach( pyjslib_list(pyjslib_range(1, $spacing)) as $i ) {
+            for ($i = 1; $i < $spacing; $i++) {
                 pyjslib_print(' ');
             }
         }
@@ -44,10 +43,10 @@ class foo extends stdClass {
 $f = new foo();
 $f->info('foo.hello');
 $f->info('foo.hullo', 'Mars', 12);
-py2php_kwargs_method_call($f, null, 'info', ['foo.hey'], ["collapse" => true]);
-py2php_kwargs_method_call($f, null, 'info', [], ["spacing" => 15,"text1" => 'foo.hello']);
+$f->info('foo.hey', 'World', 10, true);
+$f->info('foo.hello', 'World', 15);
 py2php_kwargs_method_call($f, null, 'info', [], $kwargs);
-$fg = py2php_kwargs_function_call('new foo', [], ["text1" => 'kwarg constructor',"collapse" => false]);
+$fg = new foo('kwarg constructor', null, 6, false);
 py2php_kwargs_method_call('foo', null, 'staticinfo', ['foo.static.hey'], ["collapse" => true]);
 py2php_kwargs_method_call('foo', null, 'staticinfo', [], $kwargs);
 class foosub extends foo {
@@ -58,3 +57,4 @@ class foosub extends foo {
 }
 $fs = new foosub();
 
+
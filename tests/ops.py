@@ -7,9 +7,9 @@ e = 2^5
 f = 2*6
 g = 2**8
 
-print a,b,c,d,e,f,g
+print(a,b,c,d,e,f,g)
 
 a |= 2
 b &= 2
 
-print a,b
\ No newline at end of file
+print(a,b)
\ No newline at end of file
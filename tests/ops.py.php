@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 $a = 6 << 2;
 $b = 6 >> 2;
@@ -13,3 +12,4 @@ $a |= 2;
 $b &= 2;
 pyjslib_printnl([$a, $b], true);
 
+
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 require_once( 'os_path.php');
 $dir = os_path::realpath('.');
@@ -28,3 +27,4 @@ pyjslib_printnl(os_path::samefile($path, $path));
 $parts = os_path::splitext($path);
 pyjslib_printnl([$parts[0], $parts[1]], true);
 
+
@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 require_once( 'os.php');
 $name = '/tmp/os.py.test1';
@@ -13,7 +12,8 @@ os::symlink($name, $linkname);
 $fd = os::open($linkname, os::O_RDONLY);
 $buf = os::read($fd, 1000);
 os::close($fd);
-pyjslib_printnl($buf);
+pyjslib_printnl(($buf == 'Hello from python os module.'));
 os::unlink($linkname);
 os::unlink($name);
 
+
@@ -0,0 +1,44 @@
+def total(n):
+    s = 0
+    for i in range(n):
+        s += i
+    return s
+
+print(total(5))
+
+# negative step counts down
+for i in range(10, 0, -3):
+    print(i)
+
+# a bound computed once, even if the list grows in the body
+items = [1, 2, 3]
+for i in range(len(items)):
+    items.append(i)
+print(len(items))
+
+# the loop variable is assigned in the body: foreach
+for i in range(3):
+    print(i)
+    i = 10
+
+# the loop variable is read after the loop: foreach, i keeps the last value
+for j in range(1, 4):
+    pass
+print(j)
+
+# the loop variable appears in the bounds: foreach
+k = 2
+for k in range(k, k + 3):
+    print(k)
+
+# nested loops over the same name
+for m in range(2):
+    for m in range(3):
+        print(m)
+    print(m)
+
+# empty ranges
+for i in range(5, 0):
+    print("never")
+for i in range(0, 5, -1):
+    print("never")
@@ -0,0 +1,50 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function total($n) {
+    $s = 0;
+    for ($i = 0; $i < $n; $i++) {
+        $s += $i;
+    }
+    return $s;
+}
+pyjslib_printnl(total(5));
+/* negative step counts down*/
+for ($i = 10; $i > 0; $i -= 3) {
+    pyjslib_printnl($i);
+}
+/* a bound computed once, even if the list grows in the body*/
+$items = [1, 2, 3];
+for ($i = 0, $__i_end = count($items); $i < $__i_end; $i++) {
+    $items[] = $i;
+}
+pyjslib_printnl(count($items));
+/* the loop variable is assigned in the body: foreach*/
+foreach( pyjslib_range(3) as $i ) {
+    pyjslib_printnl($i);
+    $i = 10;
+}
+/* the loop variable is read after the loop: foreach, i keeps the last value*/
+foreach( pyjslib_range(1, 4) as $j ) {
+}
+pyjslib_printnl($j);
+/* the loop variable appears in the bounds: foreach*/
+$k = 2;
+foreach( pyjslib_range($k, ($k + 3)) as $k ) {
+    pyjslib_printnl($k);
+}
+/* nested loops over the same name*/
+foreach( pyjslib_range(2) as $m ) {
+    foreach( pyjslib_range(3) as $m ) {
+        pyjslib_printnl($m);
+    }
+    pyjslib_printnl($m);
+}
+/* empty ranges*/
+for ($i = 5; $i < 0; $i++) {
+    pyjslib_printnl('never');
+}
+for ($i = 0; $i > 5; $i--) {
+    pyjslib_printnl('never');
+}
+
+
@@ -0,0 +1,49 @@
+def stats(values):
+    total = sum(v * 2 for v in values)
+    low = min(v for v in values)
+    high = max(v for v in values)
+    print(total)
+    print(low)
+    print(high)
+
+stats([3, 1, 2])
+
+def pairs(rows):
+    # any() and all() over two loops break out of both
+    found = any(x == y for x in rows for y in rows if x != 2)
+    every = all(x < 3 for row in [rows] for x in row)
+    return found, every
+
+found, every = pairs([1, 2, 3])
+print(found)
+print(every)
+
+def first_none():
+    # the only element is None: no empty sequence error
+    return min(x for x in [None])
+
+print(first_none())
+
+def largest(values):
+    try:
+        return max(v for v in values)
+    except ValueError:
+        return "empty"
+
+print(largest([]))
+
+def joined(sep, words):
+    line = sep.join(w.upper() for w in words)
+    return line + "|" + sep.join([w for w in words])
+
+print(joined("-", ["a", "b", "c"]))
+print(", ".join(str(i) for i in range(3)))
+print(sum((i for i in range(4)), 10))
+
+def shadowed(__listcomp, __sum):
+    # parameters named like the accumulators of older translations
+    doubled = [x * 2 for x in __listcomp]
+    print(doubled)
+    return sum(x + __sum for x in __listcomp)
+
+print(shadowed([1, 2], 10))
@@ -0,0 +1,104 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function stats($values) {
+    $total = 0;
+    foreach( pyjslib_iter($values) as $v ) {
+        $total += ($v * 2);
+    }
+    $low = null;
+    $__seen2 = false;
+    foreach( pyjslib_iter($values) as $v ) {
+        $__value1 = $v;
+        if (!$__seen2 || $__value1 < $low) { $low = $__value1; $__seen2 = true; }
+    }
+    if (!$__seen2) { throw new ValueError('min() arg is an empty sequence'); }
+    $high = null;
+    $__seen4 = false;
+    foreach( pyjslib_iter($values) as $v ) {
+        $__value3 = $v;
+        if (!$__seen4 || $__value3 > $high) { $high = $__value3; $__seen4 = true; }
+    }
+    if (!$__seen4) { throw new ValueError('max() arg is an empty sequence'); }
+    pyjslib_printnl($total);
+    pyjslib_printnl($low);
+    pyjslib_printnl($high);
+}
+stats([3, 1, 2]);
+function pairs($rows) {
+    /* any() and all() over two loops break out of both*/
+    $found = false;
+    foreach( pyjslib_iter($rows) as $x ) {
+        foreach( pyjslib_iter($rows) as $y ) {
+            if (($x != 2)) {
+                if (($x == $y)) { $found = true; break 2; }
+            }
+        }
+    }
+    $every = true;
+    foreach( [$rows] as $row ) {
+        foreach( pyjslib_iter($row) as $x ) {
+            if (!(($x < 3))) { $every = false; break 2; }
+        }
+    }
+    return [$found, $every];
+}
+list($found, $every) = pairs([1, 2, 3]);
+pyjslib_printnl($found);
+pyjslib_printnl($every);
+function first_none() {
+    /* the only element is None: no empty sequence error*/
+    $__min1 = null;
+    $__seen3 = false;
+    foreach( [null] as $x ) {
+        $__value2 = $x;
+        if (!$__seen3 || $__value2 < $__min1) { $__min1 = $__value2; $__seen3 = true; }
+    }
+    if (!$__seen3) { throw new ValueError('min() arg is an empty sequence'); }
+    return $__min1;
+}
+pyjslib_printnl(first_none());
+function largest($values) {
+    try {
+        $__max1 = null;
+        $__seen3 = false;
+        foreach( pyjslib_iter($values) as $v ) {
+            $__value2 = $v;
+            if (!$__seen3 || $__value2 > $__max1) { $__max1 = $__value2; $__seen3 = true; }
+        }
+        if (!$__seen3) { throw new ValueError('max() arg is an empty sequence'); }
+        return $__max1;
+    }
+    catch(ValueError $e) {
+                return 'empty';
+    }
+}
+pyjslib_printnl(largest([]));
+function joined($sep,$words) {
+    $__joiner1 = $sep;
+    $line = '';
+    $__sep2 = '';
+    foreach( pyjslib_iter($words) as $w ) {
+        $line .= $__sep2 . strtoupper($w);
+        $__sep2 = $__joiner1;
+    }
+    return $line . '|' . (function($__joiner4) use ($words) { $__join3 = ''; $__sep5 = ''; foreach( pyjslib_iter($words) as $w ) {$__join3 .= $__sep5 . $w; $__sep5 = $__joiner4;} return $__join3; })($sep);
+}
+pyjslib_printnl(joined('-', ['a', 'b', 'c']));
+pyjslib_printnl((function() { $__join1 = ''; $__sep2 = ''; foreach( pyjslib_range(3) as $i ) {$__join1 .= $__sep2 . pyjslib_str($i); $__sep2 = ', ';} return $__join1; })());
+pyjslib_printnl((function() { $__sum3 = 10; foreach( pyjslib_range(4) as $i ) {$__sum3 += $i;} return $__sum3; })());
+function shadowed($__listcomp,$__sum) {
+    /* parameters named like the accumulators of older translations*/
+    $doubled = [];
+    foreach( pyjslib_iter($__listcomp) as $x ) {
+        $doubled[] = ($x * 2);
+    }
+    pyjslib_printnl($doubled);
+    $__sum1 = 0;
+    foreach( pyjslib_iter($__listcomp) as $x ) {
+        $__sum1 += pyjslib_add($x, $__sum);
+    }
+    return $__sum1;
+}
+pyjslib_printnl(shadowed([1, 2], 10));
+
+
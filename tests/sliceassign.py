@@ -2,13 +2,13 @@
 a = [0,1,2,3,4,5,6,7,8,9]
 
 a[2:5] = ['a', 'b', 'c']
-print a
+print(a)
 
 a[3:] = ["red", "green", "blue"]
-print a
+print(a)
 
 a[:] = [10,9,8,7,6,5,4]
-print a
+print(a)
 
 a[:2] = [20,30,40]
-print a
+print(a)
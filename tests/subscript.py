@@ -1,7 +1,7 @@
 a = dict()
 a["fname"], a["lname"] = ["John", "Smith"]
 
-print a['fname']
-print a['lname']
+print(a['fname'])
+print(a['lname'])
 
 a["fname", "lname"] = "Jim", "Jones"
@@ -1,3 +1,3 @@
 (a, b, c) = ('python', 'to', 'php')
 
-print a, b, c
\ No newline at end of file
+print(a, b, c)
\ No newline at end of file
@@ -0,0 +1,47 @@
+def numbers(a, b):
+    # nothing is known about a and b: the helper decides when it runs, the
+    # 1 added to the result is a number
+    total = a + b
+    total += 1
+    return total
+
+print(numbers(2, 3))
+
+def strings(words):
+    line = ""
+    for w in words:
+        line += w + " "
+    return line + "!"
+
+print(strings(["a", "b"]))
+
+def lists(n):
+    items = []
+    for i in range(n):
+        items += [i]
+    return items + [n]
+
+print(lists(3))
+
+def doubled(value, flag):
+    # value is a string in one place and unknown in the other: the helper
+    # decides when it runs
+    if flag:
+        value = "x"
+    value += value
+    return value + value
+
+print(doubled(2, False))
+print(doubled(2, True))
+
+def lengths(s, unknown):
+    text = "abc" + s
+    items = [1, 2]
+    table = {"a": 1}
+    print(len(text))
+    print(len(items))
+    print(len(table))
+    print(len(unknown))
+
+lengths("d", [1])
+lengths("", "xy")
@@ -0,0 +1,50 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function numbers($a,$b) {
+    /* nothing is known about a and b: the helper decides when it runs, the*/
+    /* 1 added to the result is a number*/
+    $total = pyjslib_add($a, $b);
+    $total += 1;
+    return $total;
+}
+pyjslib_printnl(numbers(2, 3));
+function strings($words) {
+    $line = '';
+    foreach( pyjslib_iter($words) as $w ) {
+        $line .= $w . ' ';
+    }
+    return $line . '!';
+}
+pyjslib_printnl(strings(['a', 'b']));
+function lists($n) {
+    $items = [];
+    for ($i = 0; $i < $n; $i++) {
+        $items = array_merge($items, [$i]);
+    }
+    return array_merge($items, [$n]);
+}
+pyjslib_printnl(lists(3));
+function doubled($value,$flag) {
+    /* value is a string in one place and unknown in the other: the helper*/
+    /* decides when it runs*/
+    if ($flag) {
+        $value = 'x';
+    }
+    $value = pyjslib_add($value, $value);
+    return pyjslib_add($value, $value);
+}
+pyjslib_printnl(doubled(2, false));
+pyjslib_printnl(doubled(2, true));
+function lengths($s,$unknown) {
+    $text = 'abc' . $s;
+    $items = [1, 2];
+    $table = ['a' => 1];
+    pyjslib_printnl(strlen($text));
+    pyjslib_printnl(count($items));
+    pyjslib_printnl(count($table));
+    pyjslib_printnl(pyjslib_len($unknown));
+}
+lengths('d', [1]);
+lengths('', 'xy');
+
+
@@ -0,0 +1,24 @@
+def double(x):
+    return x * 2
+
+data = [1, 2, 3, 4]
+
+# the comprehension assigns y in the enclosing scope
+big = [y for x in data if (y := double(x)) > 4]
+print(big)
+print(y)
+
+def last_total(values):
+    totals = [(total := v * 10) for v in values]
+    return totals, total
+
+totals, total = last_total([1, 2])
+print(totals)
+print(total)
+
+n = 3
+while (n := n - 1) > 0:
+    print(n)
+
+if (m := len(data)) > 2:
+    print(m)
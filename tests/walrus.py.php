@@ -0,0 +1,29 @@
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+require_once('libpy2php.php');
+function double($x) {
+    return ($x * 2);
+}
+$data = [1, 2, 3, 4];
+/* the comprehension assigns y in the enclosing scope*/
+$big = (function() use ($data, &$y) { $__listcomp1 = []; foreach( $data as $x ) {if((($y = double($x)) > 4)) $__listcomp1[] = $y;} return $__listcomp1; })();
+pyjslib_printnl($big);
+pyjslib_printnl($y);
+function last_total($values) {
+    $totals = [];
+    foreach( pyjslib_iter($values) as $v ) {
+        $totals[] = ($total = ($v * 10));
+    }
+    return [$totals, $total];
+}
+list($totals, $total) = last_total([1, 2]);
+pyjslib_printnl($totals);
+pyjslib_printnl($total);
+$n = 3;
+while ((($n = ($n - 1)) > 0)) {
+    pyjslib_printnl($n);
+}
+if ((($m = count($data)) > 2)) {
+    pyjslib_printnl($m);
+}
+
+
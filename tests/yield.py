@@ -6,4 +6,4 @@ def firstn(n):
         num += 1
 
 for n in firstn(100):
-    print n
\ No newline at end of file
+    print(n)
\ No newline at end of file
@@ -1,6 +1,6 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
+/* a generator that yields items instead of returning a list*/
 function firstn($n) {
     $num = 0;
     while (($num < $n)) {
@@ -8,7 +8,8 @@ function firstn($n) {
         $num += 1;
     }
 }
-foreach( pyjslib_list(firstn(100)) as $n ) {
+foreach( pyjslib_iter(firstn(100)) as $n ) {
     pyjslib_printnl($n);
 }
 
+
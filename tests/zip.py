@@ -8,8 +8,8 @@ z2 = zip(['one', 'two', 'three'], [1, 2, 3])
 def print_zip(x):
     for y in x:
         for z in y:
-            print z,
-    print ''
+            print(z, end=' ')
+    print('')
     
 print_zip(z1)
 print_zip(z2)
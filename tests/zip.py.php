@@ -1,5 +1,4 @@
-<?php
-set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
+<?php set_include_path(get_include_path() . PATH_SEPARATOR . dirname(__FILE__) . DIRECTORY_SEPARATOR . 'libpy2php');
 require_once('libpy2php.php');
 $x = [1, 2, 3];
 $y = [4, 5, 6];
@@ -7,8 +6,8 @@ $z = [7, 8, 9];
 $z1 = pyjslib_zip($x, $y, $z);
 $z2 = pyjslib_zip(['one', 'two', 'three'], [1, 2, 3]);
 function print_zip($x) {
-    foreach( pyjslib_list($x) as $y ) {
-        foreach( pyjslib_list($y) as $z ) {
+    foreach( pyjslib_iter($x) as $y ) {
+        foreach( pyjslib_iter($y) as $z ) {
             pyjslib_print($z);
         }
     }
@@ -17,3 +16,4 @@ function print_zip($x) {
 print_zip($z1);
 print_zip($z2);
 
+